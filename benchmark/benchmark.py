@@ -0,0 +1,371 @@
+"""
+End-to-end benchmark of the data_provider and the dashboard_service.
+
+Generates a seeded synthetic dataset of bookings and cancellations, ingests it into the data_provider at a target
+rate, waits until the dashboard_service reflects it and finally requests dashboards. The results are written as
+one JSON document:
+
+    python benchmark/benchmark.py --events 20000 --rate 2000 --start-services --output results.json
+
+The services are driven over local HTTP, either already running ones (see --provider-url and --dashboard-url) or,
+with --start-services, fresh instances started in a temporary directory with empty databases.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+import httpx
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# starts the src.main module of a service directory in the current working directory, which holds its databases
+RUN_SERVICE = "import runpy, sys; sys.path.insert(0, sys.argv[1]); runpy.run_module('src.main', run_name='__main__')"
+
+
+def generate_events(
+    count: int,
+    seed: int,
+    hotels: int,
+    skew: float,
+    cancellation_ratio: float,
+    year: int,
+    min_cancellation_gap: int,
+) -> list[dict]:
+    """
+    Generate a reproducible stream of bookings and cancellations.
+
+    The hotels are drawn from a Zipf-like distribution, hotel n gets a share proportional to 1 / n^skew, so a few
+    hotels receive most of the bookings. Every room is booked for one night of the year. A booking is cancelled
+    with the probability cancellation_ratio, the cancellation follows its booking after at least
+    min_cancellation_gap other bookings.
+
+    Args:
+        count (int): The number of bookings, the cancellations are added to them.
+        seed (int): The seed of the random generator, the same seed generates the same events.
+        hotels (int): The number of hotels.
+        skew (float): The exponent of the hotel distribution, 0 distributes the bookings evenly.
+        cancellation_ratio (float): The share of bookings which are cancelled.
+        year (int): The year of the nights of stay.
+        min_cancellation_gap (int): The minimum number of events between a booking and its cancellation.
+
+    Returns:
+        list[dict]: The events in sending order, as JSON bodies of `POST /events`.
+    """
+    rng = random.Random(seed)
+    hotel_ids = list(range(1, hotels + 1))
+    weights = [1 / hotel_id**skew for hotel_id in hotel_ids]
+    first_night = date(year, 1, 1)
+    nights = (date(year + 1, 1, 1) - first_night).days
+    timestamp = datetime(year - 1, 1, 1, tzinfo=timezone.utc)
+
+    ordered_events = []
+    for i, hotel_id in enumerate(rng.choices(hotel_ids, weights=weights, k=count)):
+        booking = {
+            "hotel_id": hotel_id,
+            "timestamp": (timestamp + timedelta(seconds=i)).isoformat(),
+            "rpg_status": 1,
+            "room_id": f"{rng.getrandbits(64):016x}",
+            "night_of_stay": (first_night + timedelta(days=rng.randrange(nights))).isoformat(),
+        }
+        ordered_events.append((i, 0, booking))
+        if rng.random() < cancellation_ratio:
+            cancellation = {**booking, "rpg_status": 2}
+            gap = rng.randint(min_cancellation_gap, 2 * min_cancellation_gap + 1)
+            ordered_events.append((i + gap, 1, cancellation))
+    ordered_events.sort(key=lambda item: item[:2])
+    return [event for _, _, event in ordered_events]
+
+
+def get_percentiles(latencies: list[float]) -> dict[str, float]:
+    """
+    Summarize latencies in seconds as nearest-rank percentiles in milliseconds.
+    """
+    if not latencies:
+        return {}
+    latencies = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        return round(latencies[max(0, int(len(latencies) * p / 100 + 0.5) - 1)] * 1000, 3)
+
+    return {"p50": percentile(50), "p95": percentile(95), "p99": percentile(99), "max": percentile(100)}
+
+
+async def run_at_rate(requests: list, send, rate: float, concurrency: int) -> tuple[list[float], float]:
+    """
+    Send requests with at most `concurrency` in flight, starting request i not before i / rate seconds.
+
+    The latency of a request is measured from the time it was scheduled, so requests delayed by a slow
+    service are counted with their waiting time instead of being omitted. Without a rate the requests
+    are sent as fast as possible and measured from their start.
+
+    Args:
+        requests (list): The requests, passed to send.
+        send: The coroutine function sending a request.
+        rate (float): The target number of requests per second, 0 for no limit.
+        concurrency (int): The maximum number of requests in flight.
+
+    Returns:
+        tuple[list[float], float]: The latency of every request and the elapsed time, both in seconds.
+    """
+    latencies = []
+    pending = iter(enumerate(requests))
+    started = time.perf_counter()
+
+    async def worker() -> None:
+        for i, request in pending:
+            scheduled = started + i / rate if rate else time.perf_counter()
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            await send(request)
+            latencies.append(time.perf_counter() - scheduled)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - started
+
+
+async def ingest(
+    client: httpx.AsyncClient, events: list[dict], rate: float, concurrency: int, batch_size: int
+) -> tuple[dict, dict[int, int]]:
+    """
+    Ingest the events with `POST /events`, or with `POST /events/batch` if batch_size is larger than 1.
+    A cancellation is sent once the request of its booking was answered, as a client would do.
+
+    Returns:
+        tuple[dict, dict[int, int]]: The ingest results and the net number of applied bookings per hotel.
+    """
+    statuses: dict[str, int] = {}
+    booking_counts: dict[int, int] = {}
+    # set once the booking of a room was answered
+    answered: dict[str, asyncio.Event] = {}
+
+    def get_answered(event: dict) -> asyncio.Event:
+        return answered.setdefault(event["room_id"], asyncio.Event())
+
+    def count(event: dict, status: str) -> None:
+        statuses[status] = statuses.get(status, 0) + 1
+        if status in ("201", "created", "cancelled"):
+            delta = 1 if event["rpg_status"] == 1 else -1
+            booking_counts[event["hotel_id"]] = booking_counts.get(event["hotel_id"], 0) + delta
+
+    async def send_event(event: dict) -> None:
+        if event["rpg_status"] == 2:
+            await get_answered(event).wait()
+        response = await client.post("/events", json=event)
+        count(event, str(response.status_code))
+        get_answered(event).set()
+
+    async def send_batch(batch: list[dict]) -> None:
+        rooms = {event["room_id"] for event in batch if event["rpg_status"] == 1}
+        for event in batch:
+            if event["rpg_status"] == 2 and event["room_id"] not in rooms:
+                await get_answered(event).wait()
+        response = await client.post("/events/batch", json=batch)
+        for event, result in zip(batch, response.json() if response.status_code == 200 else []):
+            count(event, result["status"])
+        if response.status_code != 200:
+            for event in batch:
+                count(event, str(response.status_code))
+        for event in batch:
+            get_answered(event).set()
+
+    if batch_size > 1:
+        batches = [events[i : i + batch_size] for i in range(0, len(events), batch_size)]
+        latencies, elapsed = await run_at_rate(batches, send_batch, rate / batch_size, concurrency)
+    else:
+        latencies, elapsed = await run_at_rate(events, send_event, rate, concurrency)
+    result = {
+        "events": len(events),
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "events_per_sec": round(len(events) / elapsed, 1),
+        "latency_ms": get_percentiles(latencies),
+        "statuses": statuses,
+    }
+    return result, booking_counts
+
+
+async def get_dashboard_total(client: httpx.AsyncClient, hotel_id: int, year: int) -> int | None:
+    response = await client.get("/dashboard", params={"hotel_id": hotel_id, "period": "month", "year": year})
+    if response.status_code != 200:
+        return None
+    return sum(response.json().values())
+
+
+async def wait_for_sync(
+    client: httpx.AsyncClient, booking_counts: dict[int, int], year: int, timeout: float
+) -> float | None:
+    """
+    Wait until the dashboards of the hotels show the ingested bookings.
+
+    Returns:
+        float | None: The seconds until every dashboard was up to date, None if the timeout was reached.
+    """
+    started = time.perf_counter()
+    pending = dict(booking_counts)
+    while pending:
+        totals = await asyncio.gather(*(get_dashboard_total(client, hotel_id, year) for hotel_id in pending))
+        for hotel_id, total in zip(list(pending), totals):
+            if total == pending[hotel_id]:
+                del pending[hotel_id]
+        if time.perf_counter() - started > timeout:
+            return None
+        if pending:
+            await asyncio.sleep(0.05)
+    return round(time.perf_counter() - started, 3)
+
+
+async def query_dashboards(
+    client: httpx.AsyncClient, count: int, seed: int, hotels: int, year: int, concurrency: int
+) -> dict:
+    """
+    Request `count` dashboards of random hotels and periods of the year as fast as possible.
+    """
+    rng = random.Random(seed)
+    periods = ["quarter", "month", "week", "day"]
+    queries = [
+        {"hotel_id": rng.randint(1, hotels), "period": rng.choice(periods), "year": year} for _ in range(count)
+    ]
+    statuses: dict[str, int] = {}
+
+    async def send(params: dict) -> None:
+        response = await client.get("/dashboard", params=params)
+        statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    latencies, elapsed = await run_at_rate(queries, send, 0, concurrency)
+    return {
+        "requests": count,
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(count / elapsed, 1),
+        "latency_ms": get_percentiles(latencies),
+        "statuses": statuses,
+    }
+
+
+async def wait_until_up(url: str, path: str, timeout: float) -> None:
+    async with httpx.AsyncClient(base_url=url) as client:
+        deadline = time.perf_counter() + timeout
+        while True:
+            try:
+                if (await client.get(path)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"{url}{path} is not reachable")
+            await asyncio.sleep(0.2)
+
+
+def start_services(workdir: str, provider_url: str) -> list[subprocess.Popen]:
+    """
+    Start the data_provider and the dashboard_service with empty databases in workdir.
+    """
+    processes = []
+    for service, env in [
+        ("data_provider", {}),
+        ("dashboard_service", {"DATA_PROVIDER_URL": provider_url}),
+    ]:
+        service_workdir = os.path.join(workdir, service)
+        os.makedirs(service_workdir)
+        processes.append(
+            subprocess.Popen(
+                [sys.executable, "-c", RUN_SERVICE, os.path.join(ROOT_DIR, service)],
+                cwd=service_workdir,
+                env={**os.environ, **env},
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        )
+    return processes
+
+
+async def run(args: argparse.Namespace) -> dict:
+    events = generate_events(
+        count=args.events,
+        seed=args.seed,
+        hotels=args.hotels,
+        skew=args.skew,
+        cancellation_ratio=args.cancellation_ratio,
+        year=args.year,
+        min_cancellation_gap=args.cancellation_gap,
+    )
+    await wait_until_up(args.provider_url, "/changes", args.timeout)
+    await wait_until_up(args.dashboard_url, "/dashboard/cache", args.timeout)
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with (
+        httpx.AsyncClient(base_url=args.provider_url, limits=limits, timeout=args.timeout) as provider,
+        httpx.AsyncClient(base_url=args.dashboard_url, limits=limits, timeout=args.timeout) as dashboard,
+    ):
+        # the dashboards of the hotels before the ingest, for running against services with data
+        initial_totals = await asyncio.gather(
+            *(get_dashboard_total(dashboard, hotel_id, args.year) for hotel_id in range(1, args.hotels + 1))
+        )
+        ingest_result, booking_counts = await ingest(
+            provider, events, args.rate, args.concurrency, args.batch_size
+        )
+        expected_totals = {
+            hotel_id: (initial_total or 0) + booking_counts.get(hotel_id, 0)
+            for hotel_id, initial_total in zip(range(1, args.hotels + 1), initial_totals)
+        }
+        sync_lag = await wait_for_sync(dashboard, expected_totals, args.year, args.timeout)
+        dashboard_result = await query_dashboards(
+            dashboard, args.dashboard_requests, args.seed, args.hotels, args.year, args.concurrency
+        )
+    return {
+        "config": vars(args),
+        "ingest": ingest_result,
+        "sync_lag_seconds": sync_lag,
+        "dashboard": dashboard_result,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=10000, help="number of bookings to ingest")
+    parser.add_argument("--seed", type=int, default=42, help="seed of the generated dataset")
+    parser.add_argument("--hotels", type=int, default=50, help="number of hotels")
+    parser.add_argument("--skew", type=float, default=1.1, help="exponent of the Zipf-like hotel distribution")
+    parser.add_argument("--cancellation-ratio", type=float, default=0.1, help="share of cancelled bookings")
+    parser.add_argument(
+        "--cancellation-gap", type=int, default=100, help="minimum number of bookings before a cancellation"
+    )
+    parser.add_argument("--year", type=int, default=2024, help="year of the nights of stay")
+    parser.add_argument("--rate", type=float, default=0, help="target events per second, 0 for no limit")
+    parser.add_argument("--concurrency", type=int, default=16, help="maximum number of requests in flight")
+    parser.add_argument("--batch-size", type=int, default=1, help="events per POST /events/batch, 1 for POST /events")
+    parser.add_argument("--dashboard-requests", type=int, default=2000, help="number of dashboard requests")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for the services and the sync")
+    parser.add_argument("--provider-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--dashboard-url", default="http://127.0.0.1:8001")
+    parser.add_argument(
+        "--start-services",
+        action="store_true",
+        help="start both services with empty databases instead of using running ones",
+    )
+    parser.add_argument("--output", help="file to write the results to, by default they are printed")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        processes = start_services(workdir, args.provider_url) if args.start_services else []
+        try:
+            results = asyncio.run(run(args))
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait()
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
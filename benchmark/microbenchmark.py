@@ -0,0 +1,128 @@
+"""
+Harness of the microbenchmarks of the data_provider and the dashboard_service.
+
+Each service defines its cases in `src/microbenchmark.py` and runs them with `main`, which times every case on
+the given numbers of rows and compares the timings to the baseline stored next to the service:
+
+    cd data_provider
+    python -m src.microbenchmark                  # compare to the baseline
+    python -m src.microbenchmark --save-baseline  # store the timings of this machine as baseline
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+# differences below this number of seconds are noise and not reported as regression
+MIN_REGRESSION_SECONDS = 0.001
+
+
+@dataclass
+class Case:
+    """
+    Represents a timed call of a hot path on generated data.
+
+    Attributes:
+        name (str): The name of the case, the timings are stored as `<name>[<size>]`.
+        setup (Callable[[int], Any]): Builds the input of the given number of rows, not timed.
+        run (Callable[[Any], Any]): The timed call on the input.
+        fresh_setup (bool): Whether the call changes its input, so every repetition gets a new one.
+    """
+
+    name: str
+    setup: Callable[[int], Any]
+    run: Callable[[Any], Any]
+    fresh_setup: bool = False
+
+
+def time_case(case: Case, size: int, repeats: int) -> float:
+    """
+    Time a case on `size` rows.
+
+    Returns:
+        float: The fastest of `repeats` runs in seconds, which is the least disturbed by other processes.
+    """
+    timings = []
+    state = None
+    for _ in range(repeats):
+        if state is None or case.fresh_setup:
+            state = case.setup(size)
+        started = time.perf_counter()
+        case.run(state)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def find_regressions(
+    results: dict[str, float], baseline: dict[str, float], threshold: float
+) -> list[str]:
+    """
+    Compare the timings to the baseline.
+
+    Args:
+        results (dict[str, float]): The timings of this run in seconds.
+        baseline (dict[str, float]): The stored timings in seconds, timings without a baseline are not compared.
+        threshold (float): The tolerated slowdown, e.g. 0.25 for 25%.
+
+    Returns:
+        list[str]: A description of every timing slower than the baseline by more than the threshold.
+    """
+    return [
+        f"{key}: {timing:.4f}s, baseline {baseline[key]:.4f}s"
+        for key, timing in results.items()
+        if key in baseline
+        and timing > baseline[key] * (1 + threshold)
+        and timing - baseline[key] > MIN_REGRESSION_SECONDS
+    ]
+
+
+def main(cases: list[Case], baseline_path: str, description: str) -> None:
+    """
+    Time the cases and compare the timings to the stored baseline.
+    Exits with status 1 if a timing regressed past the threshold.
+
+    Args:
+        cases (list[Case]): The cases of the service.
+        baseline_path (str): The default file of the stored timings.
+        description (str): The description of the command line.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma separated numbers of rows")
+    parser.add_argument("--repeats", type=int, default=3, help="runs per case and size, the fastest is kept")
+    parser.add_argument("--threshold", type=float, default=0.25, help="tolerated slowdown, 0.25 for 25%%")
+    parser.add_argument("--filter", default="", help="only run the cases whose name contains this text")
+    parser.add_argument("--baseline", default=baseline_path, help="file of the stored timings")
+    parser.add_argument("--save-baseline", action="store_true", help="store the timings as the new baseline")
+    args = parser.parse_args()
+
+    results = {}
+    for size in map(int, args.sizes.split(",")):
+        for case in cases:
+            if args.filter in case.name:
+                key = f"{case.name}[{size}]"
+                results[key] = time_case(case, size, args.repeats)
+                print(f"{key}: {results[key]:.4f}s")
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as file:
+                baseline = json.load(file)
+        with open(args.baseline, "w") as file:
+            json.dump({**baseline, **results}, file, indent=2, sort_keys=True)
+        print(f"Stored {len(results)} timings in {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, store one with --save-baseline")
+        return
+    with open(args.baseline) as file:
+        regressions = find_regressions(results, json.load(file), args.threshold)
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    if regressions:
+        sys.exit(1)
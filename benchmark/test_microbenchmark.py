@@ -0,0 +1,24 @@
+from microbenchmark import Case, find_regressions, time_case
+
+
+def test_time_case():
+    """
+    Test function for timing a case, the input is built once unless the case changes it.
+    """
+    setups = []
+    case = Case("append", setup=lambda size: setups.append(size) or [], run=lambda rows: rows.append(1))
+    assert time_case(case, size=10, repeats=3) >= 0
+    assert setups == [10]
+
+    case.fresh_setup = True
+    time_case(case, size=10, repeats=3)
+    assert setups == [10] * 4
+
+
+def test_find_regressions():
+    """
+    Test function for comparing timings to the baseline, only slowdowns past the threshold are regressions.
+    """
+    baseline = {"a[10]": 1.0, "b[10]": 1.0, "c[10]": 0.0001}
+    results = {"a[10]": 1.2, "b[10]": 1.3, "c[10]": 0.0005, "d[10]": 5.0}
+    assert find_regressions(results, baseline, threshold=0.25) == ["b[10]: 1.3000s, baseline 1.0000s"]
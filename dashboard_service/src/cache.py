@@ -0,0 +1,166 @@
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import date
+from src import config, enums
+
+# key of a cached dashboard: (hotel_id, start_date, end_date, period)
+CacheKey = tuple[int, date, date, enums.DashboardPeriod]
+
+
+class DashboardCache:
+    """
+    In-process LRU cache of the dashboard responses keyed by (hotel_id, start_date, end_date, period).
+
+    Every (hotel_id, year) partition has a version which is advanced whenever the data of the partition changes.
+    A response is only stored if the versions of the partitions it covers did not change while it was computed,
+    so a response computed from data older than the latest invalidation is never cached.
+    The cache is shared between the REST API and the data fetcher thread and therefore guarded by a lock.
+
+    The versions also serve as ETag of the dashboards, prefixed with an ID of the cache instance
+    because the versions start over after a restart. `clear` advances a generation shared by all partitions,
+    which is part of the versions, so it invalidates the ETags of all dashboards, e.g. after a backfill.
+
+    Attributes:
+        max_entries (int): The maximum number of cached responses.
+        hits (int): The number of requests answered from the cache.
+        misses (int): The number of requests which had to be computed.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[CacheKey, dict] = OrderedDict()
+        self._keys_by_partition: dict[tuple[int, int], set[CacheKey]] = {}
+        self._versions: dict[tuple[int, int], int] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._instance_id = uuid.uuid4().hex[:12]
+
+    @staticmethod
+    def _partitions(key: CacheKey) -> list[tuple[int, int]]:
+        hotel_id, start_date, end_date, _ = key
+        return [(hotel_id, year) for year in range(start_date.year, end_date.year + 1)]
+
+    def get_versions(self, hotel_id: int, start_date: date, end_date: date) -> tuple[int, ...]:
+        """
+        Returns the current generation and versions of the partitions covered by a date range.
+
+        Args:
+            hotel_id (int): The ID of the hotel.
+            start_date (date): The first day of the range.
+            end_date (date): The last day of the range.
+
+        Returns:
+            tuple[int, ...]: The generation followed by the version of each year of the range,
+            0 for years which never changed.
+        """
+        with self._lock:
+            return self._generation, *(
+                self._versions.get((hotel_id, year), 0)
+                for year in range(start_date.year, end_date.year + 1)
+            )
+
+    def get_etag(self, versions: tuple[int, ...]) -> str:
+        """
+        Returns the ETag of a dashboard for the versions of its partitions.
+
+        Args:
+            versions (tuple[int, ...]): The versions of the partitions.
+
+        Returns:
+            str: The quoted entity tag.
+        """
+        return f'"{self._instance_id}-{".".join(map(str, versions))}"'
+
+    def get(self, key: CacheKey) -> dict | None:
+        """
+        Returns a cached response and marks it as recently used.
+
+        Args:
+            key (CacheKey): The hotel ID, date range and period of the dashboard.
+
+        Returns:
+            dict | None: The cached response, or None if it is not cached.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: CacheKey, value: dict, versions: tuple[int, ...]) -> None:
+        """
+        Stores a response unless its partitions changed since the given versions, evicting the least recently used.
+
+        Args:
+            key (CacheKey): The hotel ID, date range and period of the dashboard.
+            value (dict): The response.
+            versions (tuple[int, ...]): The versions of the partitions read before the response was computed.
+        """
+        if self.max_entries <= 0:
+            return
+        partitions = self._partitions(key)
+        with self._lock:
+            current_versions = (self._generation, *(self._versions.get(partition, 0) for partition in partitions))
+            if current_versions != versions:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            for partition in partitions:
+                self._keys_by_partition.setdefault(partition, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                for partition in self._partitions(evicted_key):
+                    self._keys_by_partition[partition].discard(evicted_key)
+
+    def invalidate(self, partitions: set[tuple[int, int]]) -> None:
+        """
+        Advances the version of the changed partitions and drops the cached responses covering them.
+
+        Args:
+            partitions (set[tuple[int, int]]): The changed (hotel_id, year) partitions.
+        """
+        with self._lock:
+            for partition in partitions:
+                self._versions[partition] = self._versions.get(partition, 0) + 1
+                for key in self._keys_by_partition.pop(partition, set()):
+                    self._entries.pop(key, None)
+                    # a range over several years is also listed in the other partitions
+                    for other_partition in self._partitions(key):
+                        if other_partition != partition:
+                            self._keys_by_partition[other_partition].discard(key)
+
+    def clear(self) -> None:
+        """
+        Drops all cached responses, invalidates the ETags of all dashboards and resets the counters.
+        """
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._keys_by_partition.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the counters of the cache for tuning its size.
+
+        Returns:
+            dict[str, int]: The hits, misses, number of entries and maximum number of entries.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+
+# cache shared by the REST API and the data fetcher
+dashboard_cache = DashboardCache(max_entries=config.DASHBOARD_CACHE_SIZE)
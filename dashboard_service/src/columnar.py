@@ -0,0 +1,43 @@
+from datetime import date, datetime
+import msgpack
+from src import schemas
+from src.enums import RPGStatus
+
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+
+def decode_events(content: bytes) -> list[schemas.ReadEvent]:
+    """
+    Decode a MessagePack encoded batch of event columns of the data provider.
+
+    The columns are converted to the field types once per column and the events are built without
+    validating every field again, which avoids most of the per event work of parsing JSON objects.
+
+    Args:
+        content (bytes): The MessagePack encoded column batch.
+
+    Returns:
+        list[schemas.ReadEvent]: The decoded events.
+    """
+    columns = msgpack.unpackb(content)
+    rows = zip(
+        columns["id"],
+        columns["seq"],
+        columns["hotel_id"],
+        map(datetime.fromisoformat, columns["timestamp"]),
+        map(RPGStatus, columns["rpg_status"]),
+        columns["room_id"],
+        map(date.fromordinal, columns["night_of_stay"]),
+    )
+    return [
+        schemas.ReadEvent.model_construct(
+            id=event_id,
+            seq=seq,
+            hotel_id=hotel_id,
+            timestamp=timestamp,
+            rpg_status=rpg_status,
+            room_id=room_id,
+            night_of_stay=night_of_stay,
+        )
+        for event_id, seq, hotel_id, timestamp, rpg_status, room_id, night_of_stay in rows
+    ]
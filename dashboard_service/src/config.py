@@ -2,4 +2,38 @@
 import os
 
 
-DATA_PROVIDER_URL = os.getenv("DATA_PROVIDER_URL", "http://data-provider:8000")
\ No newline at end of file
+DATA_PROVIDER_URL = os.getenv("DATA_PROVIDER_URL", "http://data-provider:8000")
+
+# seconds the data_provider holds a request on GET /changes open until new changes arrive, 0 disables the long-poll
+LONG_POLL_WAIT = float(os.getenv("LONG_POLL_WAIT", "25"))
+# seconds between two requests if the long-poll is disabled or the data_provider is unavailable
+POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", "5"))
+# maximum number of changes fetched per request
+CHANGE_PAGE_SIZE = int(os.getenv("CHANGE_PAGE_SIZE", "1000"))
+
+# maximum number of (hotel_id, year, period) dashboard responses kept in memory, 0 disables the cache
+DASHBOARD_CACHE_SIZE = int(os.getenv("DASHBOARD_CACHE_SIZE", "1024"))
+
+# timeouts in seconds of the requests to the data_provider
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "2"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "5"))
+# retries of a failed request to the data_provider, the n-th retry waits HTTP_RETRY_BACKOFF * 2^(n-1) seconds
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.5"))
+# maximum number of pooled connections to the data_provider
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "10"))
+
+# keep the synchronized events, if disabled only the aggregated booking counts are stored
+STORE_RAW_EVENTS = os.getenv("STORE_RAW_EVENTS", "true").lower() == "true"
+
+# number of event seq ranges fetched from the data_provider on a cold start, 0 replays the change log instead
+BACKFILL_PARTITIONS = int(os.getenv("BACKFILL_PARTITIONS", "8"))
+# maximum number of partitions fetched at the same time
+BACKFILL_CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", "4"))
+# maximum number of events fetched per request
+BACKFILL_PAGE_SIZE = int(os.getenv("BACKFILL_PAGE_SIZE", "5000"))
+
+# number of recent sync cycles kept for GET /sync
+SYNC_HISTORY_SIZE = int(os.getenv("SYNC_HISTORY_SIZE", "100"))
+# seconds the dashboard may lag behind the data_provider before GET /ready fails
+SYNC_MAX_LAG_SECONDS = float(os.getenv("SYNC_MAX_LAG_SECONDS", "60"))
@@ -1,64 +1,344 @@
-from sqlalchemy import extract
+from datetime import date, datetime, timezone
+from itertools import groupby
+from typing import Iterator
+from sqlalchemy import func, select, text, update
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.orm import Session
-from src import models, schemas, enums
+from src import config, models, schemas, enums
 
+# SQLite limits the number of bound parameters per statement
+IN_CLAUSE_CHUNK_SIZE = 500
 
-def get_booking_events_for_year(
-    db: Session,
-    hotel_id: int,
-    year: int,
-) -> list[schemas.ReadEvent]:
+
+def rebuild_booking_counts(db: Session) -> None:
+    """
+    Rebuild the aggregate table from the booking events with a single grouped INSERT ... SELECT.
+    Used to seed the aggregate table of a database which already contains events.
+
+    Args:
+        db (Session): The database session.
+    """
+    db.query(models.DailyBookingCount).delete()
+    counts = select(models.Event.hotel_id, models.Event.night_of_stay, func.count())
+    counts = counts.where(models.Event.rpg_status == enums.RPGStatus.BOOKING)
+    counts = counts.group_by(models.Event.hotel_id, models.Event.night_of_stay)
+    db.execute(
+        insert(models.DailyBookingCount).from_select(
+            ["hotel_id", "night_of_stay", "booking_count"], counts
+        )
+    )
+    db.commit()
+
+
+def has_booking_counts(db: Session) -> bool:
+    """
+    Check if the aggregate table contains any rows.
+
+    Args:
+        db (Session): The database session.
+
+    Returns:
+        bool: True if there are booking counts, False otherwise.
+    """
+    return db.query(models.DailyBookingCount).first() is not None
+
+
+def get_booking_counts(
+    db: Session, hotel_id: int, start_date: date, end_date: date
+) -> dict[date, int]:
     """
-    Retrieve booking events for a specific hotel and year.
+    Retrieve the number of bookings per night of stay for a specific hotel and date range from the aggregate table.
+    The query reads at most one row per day of the range, independent of the number of bookings.
 
     Args:
         db (Session): The database session.
         hotel_id (int): The ID of the hotel.
-        year (int): The year for which to retrieve booking events.
+        start_date (date): The first night of stay of the range.
+        end_date (date): The last night of stay of the range.
 
     Returns:
-        list[schemas.ReadEvent]: A list of booking events for the specified hotel and year.
+        dict[date, int]: The number of bookings per night of stay, nights without bookings may be missing.
     """
+    query = db.query(models.DailyBookingCount).filter(
+        models.DailyBookingCount.hotel_id == hotel_id
+    )
+    query = query.filter(models.DailyBookingCount.night_of_stay.between(start_date, end_date))
+    return {row.night_of_stay: row.booking_count for row in query.all()}
 
-    query = db.query(models.Event).filter(models.Event.hotel_id == hotel_id)
-    query = query.filter(models.Event.rpg_status == enums.RPGStatus.BOOKING)
-    query = query.filter(extract("year", models.Event.night_of_stay) == year)
-    results = []
-    for event in query.all():
-        results.append(schemas.ReadEvent.model_validate(event))
-    return results
 
+def get_booking_counts_for_year(db: Session, hotel_id: int, year: int) -> dict[date, int]:
+    """
+    Retrieve the number of bookings per night of stay for a specific hotel and year from the aggregate table.
+
+    Args:
+        db (Session): The database session.
+        hotel_id (int): The ID of the hotel.
+        year (int): The year for which to retrieve the booking counts.
 
-def get_newest_booking(db: Session) -> schemas.ReadEvent | None:
+    Returns:
+        dict[date, int]: The number of bookings per night of stay, nights without bookings may be missing.
     """
-    Retrieve the newest booking from the database.
+    return get_booking_counts(db, hotel_id, date(year, 1, 1), date(year, 12, 31))
+
+
+def iter_booking_counts_for_hotels(
+    db: Session, hotel_ids: list[int], start_date: date, end_date: date
+) -> Iterator[tuple[int, dict[date, int]]]:
+    """
+    Retrieve the number of bookings per night of stay for many hotels from the aggregate table.
+    The hotels are read with one query per chunk of hotel IDs in primary key order, so the rows are streamed
+    from the cursor and grouped by hotel without holding the counts of all hotels in memory.
+
+    Args:
+        db (Session): The database session.
+        hotel_ids (list[int]): The IDs of the hotels.
+        start_date (date): The first night of stay of the range.
+        end_date (date): The last night of stay of the range.
+
+    Yields:
+        tuple[int, dict[date, int]]: The ID of each requested hotel in ascending order and its number of bookings
+        per night of stay, nights without bookings may be missing.
+    """
+    sorted_hotel_ids = sorted(set(hotel_ids))
+    for i in range(0, len(sorted_hotel_ids), IN_CLAUSE_CHUNK_SIZE):
+        chunk = sorted_hotel_ids[i : i + IN_CLAUSE_CHUNK_SIZE]
+        query = db.query(
+            models.DailyBookingCount.hotel_id,
+            models.DailyBookingCount.night_of_stay,
+            models.DailyBookingCount.booking_count,
+        )
+        query = query.filter(models.DailyBookingCount.hotel_id.in_(chunk))
+        query = query.filter(models.DailyBookingCount.night_of_stay.between(start_date, end_date))
+        query = query.order_by(
+            models.DailyBookingCount.hotel_id, models.DailyBookingCount.night_of_stay
+        )
+        rows = groupby(query.yield_per(1000), key=lambda row: row.hotel_id)
+        hotel_id, hotel_rows = next(rows, (None, None))
+        for requested_hotel_id in chunk:
+            if requested_hotel_id != hotel_id:
+                # hotel without bookings in the range
+                yield requested_hotel_id, {}
+                continue
+            yield hotel_id, {row.night_of_stay: row.booking_count for row in hotel_rows}
+            hotel_id, hotel_rows = next(rows, (None, None))
+
+
+def get_checkpoint(db: Session, shard: int = 0) -> models.SyncCheckpoint | None:
+    """
+    Retrieve the sync checkpoint of a shard of the data provider with a primary key lookup.
 
     Args:
         db (Session): The database session.
+        shard (int, optional): The index of the shard. Defaults to 0.
 
     Returns:
-        schemas.ReadEvent | None: The newest booking as a ReadEvent object, or None if no booking is found.
+        models.SyncCheckpoint | None: The checkpoint, or None if no change of the shard was applied yet.
     """
-    query = db.query(models.Event).order_by(models.Event.timestamp.desc())
-    event = query.first()
-    if event:
-        return schemas.ReadEvent.model_validate(event)
-    return None
+    return db.get(models.SyncCheckpoint, shard)
 
 
-def create_event(db: Session, event: schemas.CreateEvent) -> models.Event:
+def get_checkpoint_seqs(db: Session) -> dict[int, int]:
     """
-    Create a new event in the database.
+    Retrieve the seq of the last applied change of every shard of the data provider.
 
-    Parameters:
-    - db (Session): The database session.
-    - event (CreateEvent): The event data to be created.
+    Args:
+        db (Session): The database session.
 
     Returns:
-    - Event: The created event object.
+        dict[int, int]: The seq of the last applied change by shard, empty if no change was applied yet.
+    """
+    return {checkpoint.shard: checkpoint.change_seq for checkpoint in db.query(models.SyncCheckpoint)}
+
+
+def get_events_by_room_ids(db: Session, room_ids: set[str]) -> dict[str, list[models.Event]]:
+    """
+    Retrieve the events for a set of room IDs with one query per chunk of room IDs.
+
+    Args:
+        db (Session): The database session.
+        room_ids (set[str]): The room IDs to look up.
+
+    Returns:
+        dict[str, list[models.Event]]: The matched events of every hotel and night keyed by their room ID.
+    """
+    room_id_list = list(room_ids)
+    matched_events: dict[str, list[models.Event]] = {}
+    for i in range(0, len(room_id_list), IN_CLAUSE_CHUNK_SIZE):
+        chunk = room_id_list[i : i + IN_CLAUSE_CHUNK_SIZE]
+        for db_event in db.query(models.Event).filter(models.Event.room_id.in_(chunk)):
+            matched_events.setdefault(db_event.room_id, []).append(db_event)
+    return matched_events
+
+
+def apply_changes(
+    db: Session, changes: list[schemas.ReadChange], last_seq: int, shard: int = 0
+) -> set[tuple[int, int]]:
+    """
+    Apply a page of changes of the data_provider to the events and the aggregate table in a single transaction.
+
+    Changes up to the seq of the sync checkpoint of the shard are skipped and the checkpoint is advanced to last_seq
+    in the same transaction, so every change is applied exactly once even if a page is redelivered or the service restarts.
+    The events of all rooms of the page are loaded with one query and the changes are resolved in sequence order
+    against them. A booking of a booked room night and a cancellation of a room night which is not booked are skipped.
+    The new bookings are then inserted with one INSERT ... ON CONFLICT DO NOTHING, the cancellations and the
+    net changes of the booking counts are written with one statement each and everything is committed once.
+    If the raw events are not stored, the booking counts are updated from the changes alone.
+
+    Args:
+        db (Session): The database session.
+        changes (list[schemas.ReadChange]): The changes in sequence order.
+        last_seq (int): The seq up to which the change log has been read, including skipped changes.
+        shard (int, optional): The shard of the data provider the changes were read from. Defaults to 0.
+
+    Returns:
+        set[tuple[int, int]]: The (hotel_id, year) partitions whose booking counts changed.
+    """
+    checkpoint = get_checkpoint(db, shard)
+    if checkpoint is None:
+        checkpoint = models.SyncCheckpoint(shard=shard, change_seq=0)
+        db.add(checkpoint)
+    changes = [change for change in changes if change.seq > checkpoint.change_seq]
+
+    if config.STORE_RAW_EVENTS:
+        count_deltas = write_events(db, changes)
+    else:
+        # the data_provider only logs a cancellation for a booking it cancelled
+        count_deltas = {}
+        for change in changes:
+            key = (change.hotel_id, change.night_of_stay)
+            count_deltas[key] = count_deltas.get(key, 0) + (
+                1 if change.rpg_status == enums.RPGStatus.BOOKING else -1
+            )
+
+    count_deltas = {key: delta for key, delta in count_deltas.items() if delta != 0}
+    if count_deltas:
+        statement = insert(models.DailyBookingCount)
+        statement = statement.on_conflict_do_update(
+            index_elements=[models.DailyBookingCount.hotel_id, models.DailyBookingCount.night_of_stay],
+            set_={
+                "booking_count": models.DailyBookingCount.booking_count
+                + statement.excluded.booking_count
+            },
+        )
+        db.execute(
+            statement,
+            [
+                {"hotel_id": hotel_id, "night_of_stay": night_of_stay, "booking_count": delta}
+                for (hotel_id, night_of_stay), delta in count_deltas.items()
+            ],
+        )
+    checkpoint.change_seq = max(checkpoint.change_seq, last_seq)
+    checkpoint.last_cycle_at = datetime.now(timezone.utc)
+    db.commit()
+    return {(hotel_id, night_of_stay.year) for hotel_id, night_of_stay in count_deltas}
+
+
+def write_events(db: Session, changes: list[schemas.ReadChange]) -> dict[tuple[int, date], int]:
+    """
+    Write the bookings and cancellations of a page of changes to the events without committing.
+    A room is booked once per hotel and night, a booking of a booked room night and a cancellation of a
+    room night which is not booked are skipped.
+
+    Args:
+        db (Session): The database session.
+        changes (list[schemas.ReadChange]): The changes in sequence order.
+
+    Returns:
+        dict[tuple[int, date], int]: The change of the number of bookings per (hotel_id, night_of_stay).
+    """
+    # the active bookings keyed by (hotel_id, room_id, night_of_stay)
+    bookings: dict[tuple[int, str, date], models.Event | dict] = {
+        (db_event.hotel_id, db_event.room_id, db_event.night_of_stay): db_event
+        for room_events in get_events_by_room_ids(db, {change.room_id for change in changes}).values()
+        for db_event in room_events
+        if db_event.rpg_status == enums.RPGStatus.BOOKING
+    }
+
+    new_events: list[dict] = []
+    cancelled_ids: set[int] = set()
+    count_deltas: dict[tuple[int, date], int] = {}
+    for change in changes:
+        booking_key = (change.hotel_id, change.room_id, change.night_of_stay)
+        if change.rpg_status == enums.RPGStatus.BOOKING:
+            if booking_key in bookings:
+                continue
+            bookings[booking_key] = schemas.CreateEvent(**change.model_dump()).model_dump()
+            new_events.append(bookings[booking_key])
+        else:
+            booked_event = bookings.pop(booking_key, None)
+            if booked_event is None:
+                continue
+            if isinstance(booked_event, dict):
+                # booked and cancelled within this page
+                booked_event["rpg_status"] = enums.RPGStatus.CANCELLATION
+            else:
+                cancelled_ids.add(booked_event.id)
+        key = (change.hotel_id, change.night_of_stay)
+        count_deltas[key] = count_deltas.get(key, 0) + (
+            1 if change.rpg_status == enums.RPGStatus.BOOKING else -1
+        )
+
+    # the cancellations first, a cancelled room night can be booked again within the page
+    cancelled_id_list = list(cancelled_ids)
+    for i in range(0, len(cancelled_id_list), IN_CLAUSE_CHUNK_SIZE):
+        db.execute(
+            update(models.Event)
+            .where(models.Event.id.in_(cancelled_id_list[i : i + IN_CLAUSE_CHUNK_SIZE]))
+            .values(rpg_status=enums.RPGStatus.CANCELLATION),
+            execution_options={"synchronize_session": False},
+        )
+    if new_events:
+        db.execute(
+            insert(models.Event).on_conflict_do_nothing(
+                index_elements=[models.Event.hotel_id, models.Event.room_id, models.Event.night_of_stay],
+                index_where=text("rpg_status = 'BOOKING'"),
+            ),
+            new_events,
+        )
+    return count_deltas
+
+
+def clear_events(db: Session) -> None:
+    """
+    Delete all events and booking counts before a backfill, so an interrupted backfill is started over.
+
+    Args:
+        db (Session): The database session.
+    """
+    db.query(models.Event).delete()
+    db.query(models.DailyBookingCount).delete()
+    db.commit()
+
+
+def load_events(db: Session, events: list[schemas.CreateEvent]) -> None:
+    """
+    Bulk-load a page of events with one INSERT and commit it.
+    The aggregate table is not updated, it is rebuilt once the backfill is finished.
+
+    Args:
+        db (Session): The database session.
+        events (list[schemas.CreateEvent]): The current state of the events.
+    """
+    if events:
+        fields = set(schemas.CreateEvent.model_fields)
+        db.execute(insert(models.Event), [event.model_dump(include=fields) for event in events])
+    db.commit()
+
+
+def finish_backfill(db: Session, change_seqs: dict[int, int]) -> None:
+    """
+    Rebuild the aggregate table from the loaded events and set the sync checkpoints to the seqs of the change logs
+    read before the backfill started. The changes after them are applied by the data fetcher afterwards,
+    the ones already contained in the loaded events are skipped.
+
+    Args:
+        db (Session): The database session.
+        change_seqs (dict[int, int]): The head seq of the change log of every shard before the first event was fetched.
     """
-    db_event = models.Event(**event.model_dump())
-    db.add(db_event)
+    rebuild_booking_counts(db)
+    for shard, change_seq in change_seqs.items():
+        checkpoint = get_checkpoint(db, shard) or models.SyncCheckpoint(shard=shard)
+        checkpoint.change_seq = change_seq
+        checkpoint.last_cycle_at = datetime.now(timezone.utc)
+        db.add(checkpoint)
     db.commit()
-    db.refresh(db_event)
-    return db_event
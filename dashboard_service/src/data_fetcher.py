@@ -1,90 +1,382 @@
 import asyncio
-from datetime import datetime, timedelta
-import requests
+import threading
+import time
+from typing import Any, Callable
+from datetime import datetime, timezone
+import httpx
 from sqlalchemy.orm import Session
 from src import config, schemas, crud
+from src.columnar import MSGPACK_MEDIA_TYPE, decode_events
+from src.cache import dashboard_cache
 from src.database import get_db
+from src.sync_monitor import sync_monitor
 
+# SQLite allows only one writer, the writes of all shards and partitions are applied one after another
+write_lock = threading.Lock()
 
-def fetch_events(
-    start_timestamp: datetime, end_timestamp: datetime
+
+def with_write_lock(function: Callable[..., Any], *args: Any) -> Any:
+    """
+    Calls a function writing to the database while holding the write lock, to be run in a worker thread.
+    """
+    with write_lock:
+        return function(*args)
+
+
+def create_client() -> httpx.AsyncClient:
+    """
+    Creates the HTTP client for the data provider API.
+    The client keeps a pool of keep-alive connections, so consecutive requests reuse the same connection.
+    It asks for events as MessagePack encoded columns and for gzip compressed responses.
+
+    Returns:
+        httpx.AsyncClient: The client, to be closed by the caller.
+    """
+    return httpx.AsyncClient(
+        base_url=config.DATA_PROVIDER_URL,
+        headers={"Accept": f"{MSGPACK_MEDIA_TYPE}, application/json", "Accept-Encoding": "gzip"},
+        timeout=httpx.Timeout(config.HTTP_READ_TIMEOUT, connect=config.HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_CONNECTIONS,
+        ),
+    )
+
+
+async def get_with_retry(
+    client: httpx.AsyncClient, path: str, params: dict, read_timeout: float | None = None
+) -> httpx.Response:
+    """
+    Sends a GET request to the data provider API, retrying with exponential backoff on connection errors,
+    timeouts and server errors.
+
+    Args:
+        client (httpx.AsyncClient): The HTTP client.
+        path (str): The path of the endpoint.
+        params (dict): The query parameters.
+        read_timeout (float | None, optional): The read timeout of this request instead of the default one. Defaults to None.
+
+    Raises:
+        httpx.HTTPError: If the request still fails after the last retry or fails with a client error.
+
+    Returns:
+        httpx.Response: The successful response.
+    """
+    timeout = client.timeout
+    if read_timeout is not None:
+        timeout = httpx.Timeout(read_timeout, connect=config.HTTP_CONNECT_TIMEOUT)
+    for attempt in range(config.HTTP_MAX_RETRIES + 1):
+        try:
+            response = await client.get(path, params=params, timeout=timeout)
+            if response.is_server_error and attempt < config.HTTP_MAX_RETRIES:
+                print(f"Request to {path} failed with {response.status_code}, retrying ...")
+            else:
+                if response.is_error:
+                    print(f"Failed to fetch {path}: {response.text}")
+                response.raise_for_status()
+                return response
+        except httpx.TransportError as e:
+            if attempt == config.HTTP_MAX_RETRIES:
+                raise
+            print(f"Request to {path} failed with {e!r}, retrying ...")
+        await asyncio.sleep(config.HTTP_RETRY_BACKOFF * 2**attempt)
+
+
+def parse_events(response: httpx.Response) -> list[schemas.ReadEvent]:
+    """
+    Parses the events of a response of the data provider API, either MessagePack encoded columns or a JSON array.
+
+    Args:
+        response (httpx.Response): The response of GET /events.
+
+    Returns:
+        list[schemas.ReadEvent]: The events of the response.
+    """
+    if response.headers.get("content-type") == MSGPACK_MEDIA_TYPE:
+        return decode_events(response.content)
+    return [schemas.ReadEvent(**event) for event in response.json()]
+
+
+async def fetch_changes(
+    client: httpx.AsyncClient, since: int, wait: float = 0, shard: int = 0
+) -> schemas.ChangePage:
+    """
+    Fetches the changes after a sequence number from the change log of a shard of the data provider API.
+    With wait the data provider holds the request open until new changes are committed (long-poll).
+
+    Args:
+        client (httpx.AsyncClient): The HTTP client.
+        since (int): The seq of the last change already applied.
+        wait (float, optional): The maximum time in seconds the data provider waits for new changes. Defaults to 0.
+        shard (int, optional): The shard of the change log. Defaults to 0.
+
+    Returns:
+        schemas.ChangePage: The page of changes after since.
+    """
+    response = await request_changes(client, since, wait, shard)
+    return schemas.ChangePage(**response.json())
+
+
+async def request_changes(
+    client: httpx.AsyncClient, since: int, wait: float = 0, shard: int = 0
+) -> httpx.Response:
+    """
+    Requests the changes after a sequence number, see `fetch_changes`, without decoding the response.
+    """
+    return await get_with_retry(
+        client,
+        "/changes",
+        params={"since": since, "limit": config.CHANGE_PAGE_SIZE, "wait": wait, "shard": shard},
+        # the long-poll holds the response back for up to wait seconds
+        read_timeout=wait + config.HTTP_READ_TIMEOUT,
+    )
+
+
+async def fetch_event_page(
+    client: httpx.AsyncClient, after_seq: int, limit: int, shard: int = 0
 ) -> list[schemas.ReadEvent]:
     """
-    Fetches events from the data provider API within the specified time range.
+    Fetches a page of events of a shard sorted by their ingestion sequence from the data provider API.
 
     Args:
-        start_timestamp (datetime): The start timestamp of the time range.
-        end_timestamp (datetime): The end timestamp of the time range.
+        client (httpx.AsyncClient): The HTTP client.
+        after_seq (int): The seq of the last event already fetched.
+        limit (int): The maximum number of events of the page.
+        shard (int, optional): The shard of the events. Defaults to 0.
 
     Returns:
-        list[schemas.ReadEvent]: A list of ReadEvent objects representing the fetched events.
+        list[schemas.ReadEvent]: The events after after_seq.
+    """
+    response = await get_with_retry(
+        client, "/events", params={"after_seq": after_seq, "limit": limit, "shard": shard}
+    )
+    return parse_events(response)
+
+
+async def fetch_head_seqs(client: httpx.AsyncClient) -> dict[int, int]:
     """
-    print(f"Fetching events from {start_timestamp} to {end_timestamp}")
+    Fetches the seq of the last change in the change log of every shard of the data provider API.
+    The number of shards is returned with the change log of the first shard.
 
-    response = requests.get(
-        f"{config.DATA_PROVIDER_URL}/events",
-        params={
-            "updated__gte": start_timestamp.isoformat(),
-            "updated__lte": end_timestamp.isoformat(),
-        },
-        timeout=5,
+    Args:
+        client (httpx.AsyncClient): The HTTP client.
+
+    Returns:
+        dict[int, int]: The head seq of the change log by shard.
+    """
+
+    async def fetch_head_page(shard: int) -> schemas.ChangePage:
+        response = await get_with_retry(
+            client, "/changes", params={"since": 0, "limit": 1, "shard": shard}
+        )
+        return schemas.ChangePage(**response.json())
+
+    first_page = await fetch_head_page(0)
+    pages = [first_page] + await asyncio.gather(
+        *(fetch_head_page(shard) for shard in range(1, first_page.shard_count))
     )
+    return {shard: page.head_seq for shard, page in enumerate(pages)}
+
+
+def get_partition_bounds(head_seq: int, partitions: int) -> list[tuple[int, int | None]]:
+    """
+    Splits the event seqs up to head_seq into ranges of about the same size.
+    Every event was recorded as a change, so no event seq exceeds the head seq of the change log
+    when it was read. The last range is open, so events ingested in the meantime are fetched as well.
+
+    Args:
+        head_seq (int): The head seq of the change log.
+        partitions (int): The number of ranges.
+
+    Returns:
+        list[tuple[int, int | None]]: The (after_seq, last_seq) bounds of the ranges, last_seq is None for the last one.
+    """
+    partitions = max(1, min(partitions, head_seq))
+    bounds = [head_seq * i // partitions for i in range(partitions + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(partitions - 1)] + [(bounds[-2], None)]
+
+
+async def backfill(db: Session, client: httpx.AsyncClient, head_seqs: dict[int, int]) -> None:
+    """
+    Loads the current state of all events of the data provider into an empty database.
+
+    The event seqs of every shard, counted per shard, are split into BACKFILL_PARTITIONS ranges, which are paged
+    through concurrently with at most BACKFILL_CONCURRENCY requests in flight. Each page is bulk-loaded as soon
+    as it arrives, the writes are serialized as SQLite allows only one writer.
+    Finally the aggregate table is rebuilt and the sync checkpoints are set to the head seqs read before,
+    so the extraction loop continues with the changes from that point onwards.
+
+    Args:
+        db (Session): The database session.
+        client (httpx.AsyncClient): The HTTP client.
+        head_seqs (dict[int, int]): The head seq of the change log of every shard, read before the backfill.
+    """
+    bounds = [
+        (shard, after_seq, last_seq)
+        for shard, head_seq in head_seqs.items()
+        for after_seq, last_seq in get_partition_bounds(head_seq, config.BACKFILL_PARTITIONS)
+    ]
+    semaphore = asyncio.Semaphore(config.BACKFILL_CONCURRENCY)
+    loaded_events = 0
+    finished_partitions = 0
+    started = time.monotonic()
+    print(f"Starting backfill of {len(head_seqs)} shards in {len(bounds)} partitions ...")
+    # the events of an interrupted backfill are loaded again
+    await asyncio.to_thread(with_write_lock, crud.clear_events, db)
+
+    async def load_partition(shard: int, after_seq: int, last_seq: int | None) -> None:
+        nonlocal loaded_events, finished_partitions
+        async with semaphore:
+            while True:
+                events = await fetch_event_page(client, after_seq, config.BACKFILL_PAGE_SIZE, shard)
+                page_full = len(events) == config.BACKFILL_PAGE_SIZE
+                if last_seq is not None:
+                    page_full = page_full and events[-1].seq < last_seq
+                    events = [event for event in events if event.seq <= last_seq]
+                await asyncio.to_thread(with_write_lock, crud.load_events, db, events)
+                loaded_events += len(events)
+                if not page_full:
+                    break
+                after_seq = events[-1].seq
+        finished_partitions += 1
+        print(
+            f"Backfill: {finished_partitions}/{len(bounds)} partitions, {loaded_events} events loaded "
+            f"in {time.monotonic() - started:.1f}s"
+        )
 
-    if not response.ok:
-        print(f"Failed to fetch events: {response.text}")
-        response.raise_for_status()
-    event_list = response.json()
+    await asyncio.gather(*(load_partition(*partition) for partition in bounds))
+    await asyncio.to_thread(with_write_lock, crud.finish_backfill, db, head_seqs)
+    dashboard_cache.clear()
+    print(f"Finished backfill of {loaded_events} events in {time.monotonic() - started:.1f}s")
 
-    return [schemas.ReadEvent(**event) for event in event_list]
 
+def apply_changes(db: Session, page: schemas.ChangePage, shard: int = 0) -> None:
+    """
+    Apply a page of changes of the data provider and advance the sync checkpoint in a single transaction.
+    Afterwards the cached dashboards of the changed hotels and years are invalidated.
+
+    Args:
+        db (Session): The database session.
+        page (schemas.ChangePage): The page of changes to apply.
+        shard (int, optional): The shard of the data provider the page was read from. Defaults to 0.
+    """
+    changed_partitions = crud.apply_changes(
+        db=db, changes=page.changes, last_seq=page.last_seq, shard=shard
+    )
+    # invalidate after the commit, so a dashboard computed in between is not kept
+    dashboard_cache.invalidate(changed_partitions)
 
-def update_data(db: Session, start_timestamp: datetime) -> datetime:
+
+async def update_data(
+    db: Session, client: httpx.AsyncClient, since: int, wait: float = 0, shard: int = 0
+) -> schemas.ChangePage:
     """
-    Update data in the database from a given start timestamp.
+    Update data in the database with the changes of a shard after a given sequence number.
+    The times of fetching, decoding and applying the page are recorded by the sync monitor.
 
     Args:
         db (Session): The database session.
-        start_timestamp (datetime): The start timestamp to fetch events from.
+        client (httpx.AsyncClient): The HTTP client.
+        since (int): The seq of the last change already applied.
+        wait (float, optional): The maximum time in seconds to wait for new changes. Defaults to 0.
+        shard (int, optional): The shard of the data provider. Defaults to 0.
 
     Returns:
-        datetime: The end timestamp of the data update.
+        schemas.ChangePage: The applied page of changes, its last_seq is the since of the next update.
+
+    """
+    started_at = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    response = await request_changes(client, since, wait, shard)
+    fetched = time.perf_counter()
+    page = schemas.ChangePage(**response.json())
+    decoded = time.perf_counter()
+    # the database writes run outside of the event loop
+    await asyncio.to_thread(with_write_lock, apply_changes, db, page, shard)
+    sync_monitor.record_cycle(
+        shard,
+        page,
+        started_at=started_at,
+        fetch_seconds=fetched - started,
+        decode_seconds=decoded - fetched,
+        apply_seconds=time.perf_counter() - decoded,
+    )
+    return page
+
 
+async def follow_changes(db: Session, client: httpx.AsyncClient, shard: int, since: int) -> None:
     """
-    end_timestamp = datetime.now()
-    events = fetch_events(start_timestamp, end_timestamp)
-    for event in events:
-        # remove internal id from data provider
-        event.id = None
-        # TODO: make this batch processable
-        crud.create_event(db=db, event=event)
-    return end_timestamp
+    Continuously applies the changes of the change log of a shard of the data_provider after a sequence number.
+
+    Each request is a long-poll which returns as soon as the data_provider committed new changes.
+    If the long-poll is disabled, not supported by the data_provider or an exception occurs,
+    the function falls back to polling and waits for the poll interval before the next update.
+
+    Args:
+        db (Session): The database session.
+        client (httpx.AsyncClient): The HTTP client.
+        shard (int): The shard of the data provider.
+        since (int): The seq of the last change of the shard already applied.
+    """
+    while True:
+        started = time.monotonic()
+        try:
+            page = await update_data(
+                db=db, client=client, since=since, wait=config.LONG_POLL_WAIT, shard=shard
+            )
+        except httpx.HTTPError as e:
+            print(f"Failed to update event data of shard {shard}: {e!r}")
+            sync_monitor.record_error(shard, e)
+            await asyncio.sleep(config.POLL_INTERVAL)
+            continue
+
+        since = page.last_seq
+        if page.last_seq < page.head_seq:
+            # more changes are pending, fetch the next page right away
+            continue
+        if not page.changes and time.monotonic() - started < config.LONG_POLL_WAIT:
+            # the data_provider answered without holding the request, fall back to polling
+            await asyncio.sleep(config.POLL_INTERVAL)
+        elif config.LONG_POLL_WAIT <= 0:
+            await asyncio.sleep(config.POLL_INTERVAL)
 
 
 async def extraction_loop() -> None:
     """
     Asynchronous function that continuously extracts data from the data_provider.
 
-    This function retrieves the latest event timestamp from the database and starts extracting data from that point onwards.
-    If there are no events in the database, it starts from the beginning of the current year.
-    The function then enters an infinite loop where it continuously updates the data by calling the `update_data` function.
-    If an exception occurs during the data update, an error message is printed.
-    The function waits for 5 seconds between each data update.
+    This function reads the seq of the last applied change of every shard of the data_provider from the sync
+    checkpoints and follows the change log of every shard from that point onwards, so bookings as well as
+    cancellations are synchronized. The number of shards is read from the data_provider on start.
+    If there is no checkpoint yet, the current state of the events is backfilled first and the change logs
+    are followed from the point the backfill started at. If the backfill is disabled or only the aggregates are
+    stored, it starts from the beginning of the change logs instead.
+    All shards are followed concurrently by `follow_changes` and share one HTTP client, so the connections
+    to the data_provider are kept alive between requests.
 
     """
     db = next(get_db())
     print("Starting data extraction loop ...")
-    # Get the latest event timestamp
-    latest_event = crud.get_newest_booking(db=db)
-    # If there are no events, start from the beginning of the year
-    epoch_year = datetime.today().year
-    latest_timestamp = datetime(epoch_year, 1, 1)
-    # If there are events, start from the latest event timestamp + 1 second
-    if latest_event:
-        latest_timestamp = latest_event.timestamp + timedelta(seconds=1)
+    checkpoint_seqs = crud.get_checkpoint_seqs(db=db)
 
-    while True:
-        try:
-            latest_timestamp = update_data(db=db, start_timestamp=latest_timestamp)
-        except requests.RequestException as e:
-            print(f"Failed to update event data: {e}")
-        await asyncio.sleep(5)
+    async with create_client() as client:
+        while True:
+            try:
+                head_seqs = await fetch_head_seqs(client)
+                # the loaded events can only absorb the changes already contained in them if they are stored
+                if not checkpoint_seqs and config.BACKFILL_PARTITIONS > 0 and config.STORE_RAW_EVENTS:
+                    await backfill(db=db, client=client, head_seqs=head_seqs)
+                    checkpoint_seqs = head_seqs
+                break
+            except httpx.HTTPError as e:
+                print(f"Failed to start the data extraction: {e!r}")
+                await asyncio.sleep(config.POLL_INTERVAL)
+
+        sync_monitor.start(list(head_seqs))
+
+        await asyncio.gather(
+            *(
+                follow_changes(db=db, client=client, shard=shard, since=checkpoint_seqs.get(shard, 0))
+                for shard in head_seqs
+            )
+        )
@@ -19,10 +19,13 @@ class DashboardPeriod(str, Enum):
     Enum representing the period of the dashboard.
 
     Attributes:
+        QUARTER (str): Represents the quarter period.
         MONTH (str): Represents the month period.
+        WEEK (str): Represents the week period, starting on Monday.
         DAY (str): Represents the day period.
     """
 
+    QUARTER = "quarter"
     MONTH = "month"
+    WEEK = "week"
     DAY = "day"
-    
\ No newline at end of file
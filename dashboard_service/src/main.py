@@ -1,13 +1,19 @@
 import asyncio
 import uvicorn
 
-from src import models
+from src import crud
 from src.data_fetcher import extraction_loop
-from src.database import engine
+from src.database import SessionLocal, engine
+from src.migrations import upgrade_schema
 from src.rest_api import app
 
-# Create/Ensure the database tables
-models.Base.metadata.create_all(bind=engine)
+# Create/Ensure the database tables and upgrade the tables of an earlier version
+upgrade_schema(engine)
+
+# Seed the aggregate table of a database created before it existed
+with SessionLocal() as db:
+    if not crud.has_booking_counts(db):
+        crud.rebuild_booking_counts(db)
 
 def start_rest_api():
     uvicorn.run(app, host="0.0.0.0", port=8001, loop="asyncio")
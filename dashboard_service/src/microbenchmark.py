@@ -0,0 +1,117 @@
+import asyncio
+import json
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+import httpx
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from src import config, crud, enums, models, service
+from src.data_fetcher import update_data
+from src.database import Base
+from src.enums import RPGStatus
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the harness shared with the microbenchmarks of the other service
+sys.path.insert(0, os.path.join(os.path.dirname(SERVICE_DIR), "benchmark"))
+from microbenchmark import Case, main, time_case  # noqa: E402
+
+# the stored timings of the previous run the timings are compared to
+BASELINE_PATH = os.path.join(SERVICE_DIR, "microbenchmark_baseline.json")
+
+YEAR = 2024
+HOTELS = 10
+
+
+def generate_events(size: int) -> list[dict]:
+    """
+    Generate the column values of `size` bookings of the year, spread evenly over HOTELS hotels.
+    """
+    rng = random.Random(size)
+    return [
+        {
+            "hotel_id": i % HOTELS,
+            "timestamp": datetime(YEAR - 1, 1, 1),
+            "rpg_status": RPGStatus.BOOKING,
+            "room_id": str(i),
+            "night_of_stay": date(YEAR, 1, 1) + timedelta(days=rng.randrange(366)),
+        }
+        for i in range(size)
+    ]
+
+
+def create_db(events: list[dict] | None = None) -> Session:
+    """
+    Create an in-memory database holding the given events.
+    """
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    if events:
+        db.execute(insert(models.Event), events)
+        db.commit()
+    return db
+
+
+def setup_booking_counts(size: int) -> Session:
+    db = create_db(generate_events(size))
+    crud.rebuild_booking_counts(db)
+    return db
+
+
+def setup_daily_counts(size: int) -> list[tuple[date, int]]:
+    # every booking as a count of its night, so the days repeat like the counts of several sources
+    return [(event["night_of_stay"], 1) for event in generate_events(size)]
+
+
+def setup_update_data(size: int) -> tuple[Session, httpx.AsyncClient]:
+    changes = [
+        {
+            **event,
+            "seq": seq,
+            "event_id": seq,
+            "timestamp": event["timestamp"].isoformat(),
+            "night_of_stay": event["night_of_stay"].isoformat(),
+            "recorded_at": event["timestamp"].isoformat(),
+        }
+        for seq, event in enumerate(generate_events(size), 1)
+    ]
+    content = json.dumps({"changes": changes, "last_seq": size, "head_seq": size}).encode()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=content, headers={"content-type": "application/json"})
+
+    client = httpx.AsyncClient(base_url=config.DATA_PROVIDER_URL, transport=httpx.MockTransport(handler))
+    return create_db(), client
+
+
+CASES = [
+    Case(
+        "crud.get_booking_counts",
+        setup_booking_counts,
+        lambda db: crud.get_booking_counts(db, hotel_id=1, start_date=date(YEAR, 1, 1), end_date=date(YEAR, 12, 31)),
+    ),
+    Case(
+        "service.count_by_period",
+        setup_daily_counts,
+        lambda counts: service.count_by_period(
+            counts, date(YEAR, 1, 1), date(YEAR, 12, 31), enums.DashboardPeriod.WEEK
+        ),
+    ),
+    Case(
+        "data_fetcher.update_data",
+        setup_update_data,
+        lambda state: asyncio.run(update_data(*state, since=0)),
+        fresh_setup=True,
+    ),
+]
+
+
+if __name__ == "__main__":
+    main(
+        CASES,
+        BASELINE_PATH,
+        "Time the hot paths of the dashboard_service and compare the timings to the stored baseline.",
+    )
@@ -0,0 +1,45 @@
+from sqlalchemy import Connection, inspect, text
+from sqlalchemy.engine import Engine
+from src import models
+
+
+def drop_room_unique_constraint(conn: Connection) -> None:
+    """
+    Rebuild an events table created with a unique constraint on the room ID, on which the upsert of a booking for
+    the partial index fails. SQLite can't drop a constraint, so the events are copied into a new table with the
+    schema of the model.
+    """
+    if not inspect(conn).get_unique_constraints("events"):
+        return
+    conn.execute(text("ALTER TABLE events RENAME TO events_old"))
+    # the indexes keep their names on the renamed table and would clash with the new ones
+    for index in inspect(conn).get_indexes("events_old"):
+        conn.execute(text(f"DROP INDEX {index['name']}"))
+    models.Event.__table__.create(bind=conn)
+    columns = ", ".join(column.name for column in models.Event.__table__.columns)
+    conn.execute(text(f"INSERT INTO events ({columns}) SELECT {columns} FROM events_old"))
+    conn.execute(text("DROP TABLE events_old"))
+
+
+def create_missing_indexes(conn: Connection) -> None:
+    """
+    Create the indexes of the events added after the table was created, `create_all` skips existing tables.
+    """
+    for index in models.Event.__table__.indexes:
+        index.create(bind=conn, checkfirst=True)
+
+
+def upgrade_schema(engine: Engine) -> None:
+    """
+    Create the tables of the database and upgrade the tables created by an earlier version in place.
+    Every step checks the current schema first, so the upgrade runs on every start.
+
+    Args:
+        engine (Engine): The engine of the database.
+    """
+    with engine.begin() as conn:
+        existing_tables = set(inspect(conn).get_table_names())
+        models.Base.metadata.create_all(bind=conn)
+        if "events" in existing_tables:
+            drop_room_unique_constraint(conn)
+            create_missing_indexes(conn)
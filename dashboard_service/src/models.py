@@ -1,4 +1,4 @@
-from sqlalchemy import  Column, Date, DateTime, Enum, Integer, String
+from sqlalchemy import  Column, Date, DateTime, Enum, Index, Integer, String, text
 from src.enums import RPGStatus
 from src.database import Base
 
@@ -16,10 +16,55 @@ class Event(Base):
         night_of_stay (date): The date of the night of stay for the event.
     """
     __tablename__ = "events"
+    # covers the per hotel booking queries on a night of stay range
+    __table_args__ = (
+        Index("ix_events_hotel_status_night", "hotel_id", "rpg_status", "night_of_stay"),
+        # a room can only be booked once per night, the same index as in the data provider
+        Index(
+            "ux_events_booked_room_night",
+            "hotel_id",
+            "room_id",
+            "night_of_stay",
+            unique=True,
+            sqlite_where=text("rpg_status = 'BOOKING'"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True)
-    hotel_id = Column(Integer, index=True)
+    hotel_id = Column(Integer)
     timestamp = Column(DateTime(timezone=True))
     rpg_status = Column(Enum(RPGStatus))
-    room_id = Column(String, unique=True)
+    room_id = Column(String, index=True)
     night_of_stay = Column(Date)
+
+
+class DailyBookingCount(Base):
+    """
+    Represents the number of active bookings of a hotel for a night of stay, maintained incrementally from the events.
+
+    Attributes:
+        hotel_id (int): The ID of the hotel.
+        night_of_stay (date): The date of the night of stay.
+        booking_count (int): The number of active bookings for the night of stay.
+    """
+    __tablename__ = "daily_booking_counts"
+
+    hotel_id = Column(Integer, primary_key=True)
+    night_of_stay = Column(Date, primary_key=True)
+    booking_count = Column(Integer, nullable=False, default=0)
+
+
+class SyncCheckpoint(Base):
+    """
+    Represents the position of the data fetcher in the change log of a shard of the data provider.
+
+    Attributes:
+        shard (int): The index of the shard of the data provider.
+        change_seq (int): The seq of the last change of the shard applied to the database.
+        last_cycle_at (datetime): The time of the last successful synchronization cycle of the shard.
+    """
+    __tablename__ = "sync_checkpoints"
+
+    shard = Column(Integer, primary_key=True)
+    change_seq = Column(Integer, nullable=False)
+    last_cycle_at = Column(DateTime(timezone=True), nullable=False)
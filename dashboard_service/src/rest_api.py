@@ -1,22 +1,197 @@
+import json
 from datetime import date
-from fastapi import Depends, FastAPI
+from typing import Iterator
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from sqlalchemy.orm import Session
-from src import crud, enums, service
-from src.database import get_db
+from src import crud, enums, schemas, service
+from src.cache import dashboard_cache
+from src.database import engine, get_db
+from src.metrics import MetricsMiddleware, register_table_rows
+from src.sync_monitor import sync_monitor
 
 
 app = FastAPI()
+app.add_middleware(MetricsMiddleware)
+register_table_rows(engine)
+
+# maximum number of days of a dashboard date range
+MAX_RANGE_DAYS = 3660
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Check if an If-None-Match header matches an entity tag, using the weak comparison of RFC 9110.
+
+    Args:
+        if_none_match (str | None): The value of the If-None-Match header.
+        etag (str): The current entity tag.
+
+    Returns:
+        bool: True if the client already has the current representation.
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def get_date_range(year: int | None, start: date | None, end: date | None) -> tuple[date, date]:
+    """
+    Resolve the date range of a dashboard request, given either as a year or as start and end date.
+
+    Args:
+        year (int | None): The year of the dashboard.
+        start (date | None): The first day of the dashboard.
+        end (date | None): The last day of the dashboard.
+
+    Raises:
+        HTTPException: If neither or both are given, or the range is empty or too long.
+
+    Returns:
+        tuple[date, date]: The first and the last day of the range.
+    """
+    if year is not None and start is None and end is None:
+        return date(year, 1, 1), date(year, 12, 31)
+    if year is not None or start is None or end is None:
+        raise HTTPException(status_code=422, detail="Provide either year or start and end.")
+    if not 0 <= (end - start).days < MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=422, detail=f"end must be within {MAX_RANGE_DAYS} days after start."
+        )
+    return start, end
 
 
 @app.get("/dashboard", response_model=dict[date, int], summary="Retrieve the dashboard data")
 def get_dashboard(
     hotel_id: int,
     period: enums.DashboardPeriod,
-    year: int,
+    response: Response,
+    year: int | None = Query(default=None, ge=date.min.year, le=date.max.year),
+    start: date | None = None,
+    end: date | None = None,
+    if_none_match: str | None = Header(default=None),
+    db: Session = Depends(get_db),  # dependency injection
+):
+    """
+    Retrieve the number of bookings of a hotel per period, either for a whole year or for a date range.
+    The keys are the first days of the periods overlapping the range, e.g. the Monday of a week or the first day
+    of a month, and the values the number of bookings within the range. Periods without bookings are included.
+    The daily counts are rolled up, so the cost depends on the number of days and not the number of bookings.
+
+    Args:
+        hotel_id (int): The ID of the hotel.
+        period (enums.DashboardPeriod): The period to group the bookings by.
+        year (int | None, optional): The year of the dashboard. Defaults to None.
+        start (date | None, optional): The first day of the dashboard, requires end. Defaults to None.
+        end (date | None, optional): The last day of the dashboard, requires start. Defaults to None.
+
+    Returns:
+        dict[date, int]: The number of bookings per period.
+    """
+    start_date, end_date = get_date_range(year, start, end)
+
+    # read the versions before the data, so a concurrent update prevents caching the result
+    versions = dashboard_cache.get_versions(hotel_id, start_date, end_date)
+    etag = dashboard_cache.get_etag(versions)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    key = (hotel_id, start_date, end_date, period)
+    cached = dashboard_cache.get(key)
+    if cached is not None:
+        return cached
+    counts = crud.get_booking_counts(db, hotel_id=hotel_id, start_date=start_date, end_date=end_date)
+    result = service.count_by_period(counts.items(), start_date, end_date, period)
+    dashboard_cache.put(key, result, versions)
+    return result
+
+
+@app.get("/dashboard/cache", response_model=schemas.CacheStats, summary="Retrieve the dashboard cache counters")
+def get_dashboard_cache_stats():
+    return dashboard_cache.stats()
+
+
+def stream_bulk_dashboards(db: Session, query: schemas.BulkDashboardQuery) -> Iterator[str]:
+    """
+    Stream the dashboards of many hotels as newline delimited JSON, one hotel per line.
+
+    Args:
+        db (Session): The database session, closed once the stream is exhausted.
+        query (schemas.BulkDashboardQuery): The hotels, years and period of the dashboards.
+
+    Yields:
+        str: A JSON object with the hotel_id and its dashboards keyed by year.
+    """
+    try:
+        hotel_counts = crud.iter_booking_counts_for_hotels(
+            db,
+            hotel_ids=query.hotel_ids,
+            start_date=date(query.start_year, 1, 1),
+            end_date=date(query.end_year, 12, 31),
+        )
+        for hotel_id, counts in hotel_counts:
+            dashboards = {
+                year: service.count_by_period(
+                    counts.items(), date(year, 1, 1), date(year, 12, 31), query.period
+                )
+                for year in range(query.start_year, query.end_year + 1)
+            }
+            yield json.dumps({"hotel_id": hotel_id, "dashboards": dashboards}) + "\n"
+    finally:
+        # the session outlives the request dependency while the response is streamed
+        db.close()
+
+
+@app.post("/dashboard/bulk", summary="Retrieve the dashboard data of many hotels and years")
+def get_bulk_dashboard(
+    query: schemas.BulkDashboardQuery,
     db: Session = Depends(get_db),  # dependency injection
 ):
-    events = crud.get_booking_events_for_year(db, hotel_id=hotel_id, year=year)
-    if period == enums.DashboardPeriod.MONTH:
-        return service.group_events_by_month(events=events, year=year)
-    elif period == enums.DashboardPeriod.DAY:
-        return service.group_events_by_day(events=events, year=year)
+    """
+    Retrieve the dashboards of many hotels and years with one query per 500 hotels.
+    The response is streamed as newline delimited JSON with one line per hotel in ascending order of the hotel IDs,
+    e.g. `{"hotel_id": 1, "dashboards": {"2024": {"2024-01-01": 4, ...}}}`.
+
+    Args:
+        query (schemas.BulkDashboardQuery): The hotels, years and period of the dashboards.
+
+    Returns:
+        StreamingResponse: The dashboards of each hotel.
+    """
+    return StreamingResponse(
+        stream_bulk_dashboards(db, query), media_type="application/x-ndjson"
+    )
+
+
+@app.get("/sync", response_model=schemas.SyncStatus, summary="Retrieve the freshness of the synchronized data")
+def get_sync_status():
+    """
+    Retrieve the watermark and lag of every shard of the data_provider and the recent sync cycles with the time
+    of fetching, decoding and applying their page of changes.
+    """
+    return sync_monitor.status()
+
+
+@app.get("/ready", response_model=schemas.SyncStatus, summary="Check whether the dashboards are up to date")
+def get_readiness(response: Response):
+    """
+    Readiness check, answers 503 until every shard of the data_provider is synchronized and while a shard lags
+    more than SYNC_MAX_LAG_SECONDS behind or its sync stopped.
+    """
+    status = sync_monitor.status(history=False)
+    if not status.ready:
+        response.status_code = 503
+    return status
+
+
+@app.get("/metrics", summary="Retrieve the metrics in the Prometheus text format")
+def read_metrics():
+    """
+    Expose the request latencies, database query times and table row counts for Prometheus.
+    The row counts are counted when the metrics are read.
+    """
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,6 +1,6 @@
 from datetime import datetime, date
-from pydantic import BaseModel, ConfigDict
-from src.enums import RPGStatus
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from src.enums import DashboardPeriod, RPGStatus
 
 
 class CreateEvent(BaseModel):
@@ -33,7 +33,160 @@ class ReadEvent(CreateEvent):
         rpg_status (RPGStatus): The RPG status of the event.
         room_id (int): The ID of the room associated with the event.
         night_of_stay (date): The date of the night of stay for the event.
+        seq (int | None): The ingestion sequence number of the event in the data provider.
     """
 
     model_config = ConfigDict(from_attributes=True)
     id: int
+    seq: int | None = None
+
+
+class ReadChange(BaseModel):
+    """
+    Represents an entry of the change log of the data provider.
+
+    Attributes:
+        seq (int): The sequence number of the change.
+        event_id (int): The ID of the changed event in the data provider.
+        hotel_id (int): The ID of the hotel associated with the event.
+        timestamp (datetime): The timestamp of the event.
+        rpg_status (RPGStatus): The RPG status of the event after the change.
+        room_id (str): The ID of the room associated with the event.
+        night_of_stay (date): The date of the night of stay for the event.
+        recorded_at (datetime): The time the change was written.
+    """
+
+    seq: int
+    event_id: int
+    hotel_id: int
+    timestamp: datetime
+    rpg_status: RPGStatus
+    room_id: str
+    night_of_stay: date
+    recorded_at: datetime
+
+
+class ChangePage(BaseModel):
+    """
+    Represents a page of the change log of the data provider.
+
+    Attributes:
+        changes (list[ReadChange]): The changes of the page in sequence order.
+        last_seq (int): The seq of the last change of the page, to be passed as since for the next page.
+        head_seq (int): The seq of the newest change in the change log.
+        shard_count (int): The number of shards, each of them has its own change log.
+    """
+
+    changes: list[ReadChange]
+    last_seq: int
+    head_seq: int
+    shard_count: int = 1
+
+
+class SyncCycle(BaseModel):
+    """
+    Represents a sync cycle of the data fetcher, which fetched and applied a page of the change log of a shard.
+
+    Attributes:
+        shard (int): The shard of the data provider.
+        started_at (datetime): The start of the cycle.
+        fetch_seconds (float): The time of the request, including the time the long-poll was held open.
+        decode_seconds (float): The time of decoding the page.
+        apply_seconds (float): The time of writing the page to the database, including waiting for the write lock.
+        changes (int): The number of changes of the page.
+        last_seq (int): The seq up to which the change log is applied after the cycle, the watermark.
+        head_seq (int): The seq of the newest change in the change log of the data provider.
+        lag_seconds (float): The time from recording the last change of the page in the data provider until it was
+            applied, 0 if the page was empty.
+    """
+
+    shard: int
+    started_at: datetime
+    fetch_seconds: float
+    decode_seconds: float
+    apply_seconds: float
+    changes: int
+    last_seq: int
+    head_seq: int
+    lag_seconds: float
+
+
+class ShardSyncStatus(BaseModel):
+    """
+    Represents the current sync state of a shard of the data provider.
+
+    Attributes:
+        shard (int): The shard of the data provider.
+        last_seq (int | None): The watermark, the seq up to which the change log is applied.
+        head_seq (int | None): The seq of the newest change in the change log at the last cycle.
+        lag_seconds (float | None): How far the dashboard is behind the data provider, 0 if all changes known at
+            the last cycle are applied, otherwise the age of the last applied change. None before the first cycle.
+        last_cycle_at (datetime | None): The end of the last successful cycle.
+        errors (int): The number of failed cycles.
+        last_error (str | None): The error of the last failed cycle.
+    """
+
+    shard: int
+    last_seq: int | None = None
+    head_seq: int | None = None
+    lag_seconds: float | None = None
+    last_cycle_at: datetime | None = None
+    errors: int = 0
+    last_error: str | None = None
+
+
+class SyncStatus(BaseModel):
+    """
+    Represents the freshness of the synchronized data.
+
+    Attributes:
+        ready (bool): Whether every shard synced recently and is at most max_lag_seconds behind.
+        max_lag_seconds (float): The tolerated lag.
+        shards (list[ShardSyncStatus]): The state of every shard.
+        history (list[SyncCycle]): The most recent cycles, oldest first.
+    """
+
+    ready: bool
+    max_lag_seconds: float
+    shards: list[ShardSyncStatus]
+    history: list[SyncCycle] = []
+
+
+class CacheStats(BaseModel):
+    """
+    Represents the counters of the dashboard cache.
+
+    Attributes:
+        hits (int): The number of requests answered from the cache.
+        misses (int): The number of requests which had to be computed.
+        entries (int): The number of cached responses.
+        max_entries (int): The maximum number of cached responses.
+    """
+
+    hits: int
+    misses: int
+    entries: int
+    max_entries: int
+
+
+class BulkDashboardQuery(BaseModel):
+    """
+    Represents a query for the dashboards of many hotels and years.
+
+    Attributes:
+        hotel_ids (list[int]): The IDs of the hotels.
+        start_year (int): The first year of the dashboards.
+        end_year (int): The last year of the dashboards.
+        period (DashboardPeriod): The period of the dashboards.
+    """
+
+    hotel_ids: list[int] = Field(min_length=1, max_length=10000)
+    start_year: int = Field(ge=date.min.year, le=date.max.year)
+    end_year: int = Field(ge=date.min.year, le=date.max.year)
+    period: DashboardPeriod
+
+    @model_validator(mode="after")
+    def check_years(self) -> "BulkDashboardQuery":
+        if not 0 <= self.end_year - self.start_year < 10:
+            raise ValueError("end_year must be within 10 years after start_year")
+        return self
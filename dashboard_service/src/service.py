@@ -1,54 +1,62 @@
-from typing import List
-from src import schemas
+from typing import Iterable
+from src import enums
 from datetime import date, timedelta
 
 
-def group_events_by_month(events: List[schemas.ReadEvent], year: int) -> dict[str, int]:
+def get_period_start(day: date, period: enums.DashboardPeriod) -> date:
     """
-    Groups the events by month and returns a dictionary with the number of events for each month.
+    Returns the first day of the period containing a day.
 
     Args:
-        events (List[schemas.ReadEvent]): A list of events.
-        year (int): The year for which to group the events.
+        day (date): The day.
+        period (enums.DashboardPeriod): The period.
 
     Returns:
-        dict[date, int]: A dictionary where the keys are dates representing the start of each month
-        and the values are the number of events for that month.
+        date: The day itself, the Monday of its week, or the first day of its month or quarter.
     """
-
-    result_months = {}
-    for month in range(1, 13):
-        current_date = date(year, month, 1)
-        # Filter events for the current month
-        month_events = [event for event in events if event.night_of_stay.month == month]
-        # Store the number of events for the current month
-        result_months[current_date.isoformat()] = len(month_events)
-
-    return result_months
-
-
-def group_events_by_day(events: List[schemas.ReadEvent], year: int) -> dict[str, int]:
+    if period == enums.DashboardPeriod.WEEK:
+        return day - timedelta(days=day.weekday())
+    if period == enums.DashboardPeriod.MONTH:
+        return day.replace(day=1)
+    if period == enums.DashboardPeriod.QUARTER:
+        return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+    return day
+
+
+def count_by_period(
+    counts: Iterable[tuple[date, int]],
+    start_date: date,
+    end_date: date,
+    period: enums.DashboardPeriod,
+) -> dict[str, int]:
     """
-    Groups events by day for a given year.
+    Sums up counts per day into periods within a date range in a single pass.
+
+    The counts are first added into an array indexed by the day offset from the start date,
+    the days are then walked once and added to the period they belong to.
+    This costs O(number of counts + days in range) instead of rescanning the counts for every period.
 
     Args:
-        events (List[schemas.ReadEvent]): A list of events.
-        year (int): The year for which to group the events.
+        counts (Iterable[tuple[date, int]]): Pairs of a day and a count, days may repeat and may be outside the range.
+        start_date (date): The first day of the range.
+        end_date (date): The last day of the range.
+        period (enums.DashboardPeriod): The period to group the days by.
 
     Returns:
-        dict[date, int]: A dictionary where the keys are dates and the values are the number of events on that day.
+        dict[str, int]: A dictionary where the keys are the ISO dates of the first day of each period
+        overlapping the range, in ascending order and including periods without counts,
+        and the values are the sums of the counts of the days of that period within the range.
     """
-    result_days = {}
-    end_date = date(year, 12, 31)
-    start_date = date(year, 1, 1)
-    # Calculate the number of days between the start and end date
     days = (end_date - start_date).days + 1
-
-    for day in range(1, days + 1):
-        # Filter events for the current day
-        day_events = [event for event in events if event.night_of_stay == start_date]
-        # Store the number of events for the current day
-        result_days[start_date.isoformat()] = len(day_events)
-        # Move to the next day
-        start_date += timedelta(days=1)
-    return result_days
+    daily_counts = [0] * days
+    for day, count in counts:
+        offset = (day - start_date).days
+        if 0 <= offset < days:
+            daily_counts[offset] += count
+
+    result = {}
+    for offset, count in enumerate(daily_counts):
+        # the day is derived from the offset, stepping past the last day would overflow at date.max
+        key = get_period_start(start_date + timedelta(days=offset), period).isoformat()
+        result[key] = result.get(key, 0) + count
+    return result
@@ -0,0 +1,149 @@
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Iterator
+from prometheus_client.core import REGISTRY, GaugeMetricFamily
+from prometheus_client.registry import Collector
+from src import config, schemas
+
+
+def as_utc(timestamp: datetime) -> datetime:
+    # SQLite drops the offset, the data_provider records its times in UTC
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+class SyncMonitor:
+    """
+    Keeps the state of the last sync cycle of every shard and a rolling history of the recent cycles.
+
+    The lag of a shard is 0 while all changes known at its last cycle are applied. Otherwise it is the age of the
+    last applied change, which is an upper bound of the age of the oldest pending change. A shard whose last
+    successful cycle is older than a long-poll plus the tolerated lag is considered stuck and not ready either.
+    The monitor is written by the data fetcher and read by the REST API and therefore guarded by a lock.
+
+    Attributes:
+        history_size (int): The number of recent cycles kept.
+        max_lag_seconds (float): The tolerated lag of a shard.
+    """
+
+    def __init__(self, history_size: int, max_lag_seconds: float) -> None:
+        self.history_size = history_size
+        self.max_lag_seconds = max_lag_seconds
+        self._shards: dict[int, schemas.ShardSyncStatus] = {}
+        # recorded_at of the last applied change by shard
+        self._last_recorded_at: dict[int, datetime] = {}
+        self._history: deque[schemas.SyncCycle] = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+
+    def start(self, shards: list[int]) -> None:
+        """
+        Registers the shards which are followed, a shard without a cycle yet is not ready.
+        """
+        with self._lock:
+            for shard in shards:
+                self._shards.setdefault(shard, schemas.ShardSyncStatus(shard=shard))
+
+    def record_cycle(
+        self,
+        shard: int,
+        page: schemas.ChangePage,
+        started_at: datetime,
+        fetch_seconds: float,
+        decode_seconds: float,
+        apply_seconds: float,
+    ) -> None:
+        """
+        Records a successful cycle, which applied a page of the change log of a shard.
+        """
+        now = datetime.now(timezone.utc)
+        lag_seconds = 0.0
+        with self._lock:
+            if page.changes:
+                self._last_recorded_at[shard] = as_utc(page.changes[-1].recorded_at)
+                lag_seconds = (now - self._last_recorded_at[shard]).total_seconds()
+            self._history.append(
+                schemas.SyncCycle(
+                    shard=shard,
+                    started_at=started_at,
+                    fetch_seconds=fetch_seconds,
+                    decode_seconds=decode_seconds,
+                    apply_seconds=apply_seconds,
+                    changes=len(page.changes),
+                    last_seq=page.last_seq,
+                    head_seq=page.head_seq,
+                    lag_seconds=lag_seconds,
+                )
+            )
+            status = self._shards.setdefault(shard, schemas.ShardSyncStatus(shard=shard))
+            status.last_seq = page.last_seq
+            status.head_seq = page.head_seq
+            status.last_cycle_at = now
+
+    def record_error(self, shard: int, error: Exception) -> None:
+        """
+        Records a failed cycle of a shard.
+        """
+        with self._lock:
+            status = self._shards.setdefault(shard, schemas.ShardSyncStatus(shard=shard))
+            status.errors += 1
+            status.last_error = repr(error)
+
+    def _get_lag_seconds(self, status: schemas.ShardSyncStatus, now: datetime) -> float | None:
+        if status.last_cycle_at is None:
+            return None
+        if status.last_seq >= status.head_seq or status.shard not in self._last_recorded_at:
+            return 0.0
+        return (now - self._last_recorded_at[status.shard]).total_seconds()
+
+    def _is_ready(self, status: schemas.ShardSyncStatus, now: datetime) -> bool:
+        if status.lag_seconds is None or status.lag_seconds > self.max_lag_seconds:
+            return False
+        # a long-poll returns at the latest after LONG_POLL_WAIT, a poll after POLL_INTERVAL
+        max_cycle_interval = max(config.LONG_POLL_WAIT, config.POLL_INTERVAL) + config.HTTP_READ_TIMEOUT
+        seconds_since_cycle = (now - status.last_cycle_at).total_seconds()
+        return seconds_since_cycle <= max_cycle_interval + self.max_lag_seconds
+
+    def status(self, history: bool = True) -> schemas.SyncStatus:
+        """
+        Returns the current state of every shard and, with history, the recent cycles.
+        The dashboard is ready if at least one shard is followed and every shard is ready.
+        """
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            shards = [
+                status.model_copy(update={"lag_seconds": self._get_lag_seconds(status, now)})
+                for _, status in sorted(self._shards.items())
+            ]
+            cycles = list(self._history) if history else []
+        return schemas.SyncStatus(
+            ready=bool(shards) and all(self._is_ready(status, now) for status in shards),
+            max_lag_seconds=self.max_lag_seconds,
+            shards=shards,
+            history=cycles,
+        )
+
+
+class SyncLagCollector(Collector):
+    """
+    Reports the lag and watermark of every shard, computed when the metrics are scraped.
+    """
+
+    def __init__(self, monitor: SyncMonitor) -> None:
+        self.monitor = monitor
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        lag = GaugeMetricFamily("sync_lag_seconds", "Lag behind the data provider.", labels=["shard"])
+        watermark = GaugeMetricFamily("sync_last_seq", "Seq up to which the change log is applied.", labels=["shard"])
+        head = GaugeMetricFamily("sync_head_seq", "Seq of the newest change of the data provider.", labels=["shard"])
+        for status in self.monitor.status(history=False).shards:
+            if status.last_cycle_at is not None:
+                lag.add_metric([str(status.shard)], status.lag_seconds)
+                watermark.add_metric([str(status.shard)], status.last_seq)
+                head.add_metric([str(status.shard)], status.head_seq)
+        yield lag
+        yield watermark
+        yield head
+
+
+sync_monitor = SyncMonitor(config.SYNC_HISTORY_SIZE, config.SYNC_MAX_LAG_SECONDS)
+REGISTRY.register(SyncLagCollector(sync_monitor))
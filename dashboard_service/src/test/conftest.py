@@ -2,9 +2,12 @@ from typing import Generator
 from fastapi.testclient import TestClient
 from mock_alchemy.mocking import UnifiedAlchemyMagicMock
 import pytest
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 
-from src.database import get_db
+from src.cache import dashboard_cache
+from src.database import Base, get_db
 from src.rest_api import app
 
 @pytest.fixture
@@ -15,5 +18,27 @@ def mock_db() -> Generator[Session, None, None]:
 @pytest.fixture
 def rest_client(mock_db: Session) -> Generator[TestClient, None, None]:
     app.dependency_overrides[get_db] = lambda: mock_db
+    dashboard_cache.clear()
+    client = TestClient(app)
+    yield client
+
+
+@pytest.fixture
+def sqlite_db() -> Generator[Session, None, None]:
+    # in-memory database for statements the mock does not support
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield db
+    db.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def sqlite_client(sqlite_db: Session) -> Generator[TestClient, None, None]:
+    app.dependency_overrides[get_db] = lambda: sqlite_db
+    dashboard_cache.clear()
     client = TestClient(app)
     yield client
@@ -0,0 +1,67 @@
+from datetime import date
+from src.cache import DashboardCache
+from src.enums import DashboardPeriod
+
+YEAR_2023 = (date(2023, 1, 1), date(2023, 12, 31))
+YEAR_2024 = (date(2024, 1, 1), date(2024, 12, 31))
+
+
+def test_cache_invalidate():
+    """
+    Test function for invalidating the cached dashboards of a hotel and year.
+
+    Returns:
+        None
+    """
+    cache = DashboardCache(max_entries=10)
+    versions = cache.get_versions(1, *YEAR_2024)
+    cache.put((1, *YEAR_2024, DashboardPeriod.DAY), {"2024-01-01": 1}, versions)
+    cache.put((1, *YEAR_2024, DashboardPeriod.MONTH), {"2024-01-01": 1}, versions)
+    cache.put((1, *YEAR_2023, DashboardPeriod.DAY), {"2023-01-01": 1}, versions)
+    # range over the turn of the year
+    range_key = (1, date(2023, 12, 1), date(2024, 1, 31), DashboardPeriod.MONTH)
+    cache.put(range_key, {"2023-12-01": 1}, cache.get_versions(1, date(2023, 12, 1), date(2024, 1, 31)))
+    assert cache.get((1, *YEAR_2024, DashboardPeriod.DAY)) == {"2024-01-01": 1}
+
+    # Invalidate a single partition
+    cache.invalidate({(1, 2024)})
+
+    # Assert only the dashboards covering the changed partition were dropped
+    assert cache.get((1, *YEAR_2024, DashboardPeriod.DAY)) is None
+    assert cache.get((1, *YEAR_2024, DashboardPeriod.MONTH)) is None
+    assert cache.get(range_key) is None
+    assert cache.get((1, *YEAR_2023, DashboardPeriod.DAY)) == {"2023-01-01": 1}
+    assert cache.stats() == {"hits": 2, "misses": 3, "entries": 1, "max_entries": 10}
+
+    # Assert a response computed before the invalidation is not stored
+    cache.put((1, *YEAR_2024, DashboardPeriod.DAY), {"2024-01-01": 1}, versions)
+    assert cache.get((1, *YEAR_2024, DashboardPeriod.DAY)) is None
+    assert cache.get_versions(1, date(2023, 12, 1), date(2024, 1, 31)) == (0, 0, 1)
+
+    # Assert clearing the cache invalidates the ETags and the responses computed before of all partitions
+    versions = cache.get_versions(1, *YEAR_2023)
+    cache.clear()
+    assert cache.get_etag(cache.get_versions(1, *YEAR_2023)) != cache.get_etag(versions)
+    cache.put((1, *YEAR_2023, DashboardPeriod.DAY), {"2023-01-01": 1}, versions)
+    assert cache.get((1, *YEAR_2023, DashboardPeriod.DAY)) is None
+
+
+def test_cache_evicts_least_recently_used():
+    """
+    Test function for evicting the least recently used dashboard once the cache is full.
+
+    Returns:
+        None
+    """
+    cache = DashboardCache(max_entries=2)
+    cache.put((1, *YEAR_2024, DashboardPeriod.DAY), {}, (0, 0))
+    cache.put((2, *YEAR_2024, DashboardPeriod.DAY), {}, (0, 0))
+    cache.get((1, *YEAR_2024, DashboardPeriod.DAY))
+
+    # Store a third dashboard
+    cache.put((3, *YEAR_2024, DashboardPeriod.DAY), {}, (0, 0))
+
+    # Assert the least recently used dashboard was evicted
+    assert cache.get((2, *YEAR_2024, DashboardPeriod.DAY)) is None
+    assert cache.get((1, *YEAR_2024, DashboardPeriod.DAY)) == {}
+    assert cache.get((3, *YEAR_2024, DashboardPeriod.DAY)) == {}
@@ -0,0 +1,221 @@
+from datetime import date, datetime
+from unittest.mock import patch
+from sqlalchemy.orm import Session
+from src import config, crud, models, schemas
+from src.enums import RPGStatus
+
+
+def create_change(
+    seq: int, room_id: str, rpg_status: RPGStatus, night_of_stay: date, hotel_id: int = 1
+) -> schemas.ReadChange:
+    """
+    Creates a change of the data provider for the given room, status and night.
+    """
+    return schemas.ReadChange(
+        seq=seq,
+        event_id=seq,
+        hotel_id=hotel_id,
+        timestamp=datetime(2024, 1, 1),
+        rpg_status=rpg_status,
+        room_id=room_id,
+        night_of_stay=night_of_stay,
+        recorded_at=datetime(2024, 1, 1),
+    )
+
+
+def test_booking_counts(sqlite_db: Session):
+    """
+    Test function for maintaining the aggregate table while bookings are created and cancelled.
+
+    Returns:
+        None
+    """
+    # Create bookings on two nights
+    bookings = [
+        create_change(1, "0", RPGStatus.BOOKING, date(2024, 1, 5)),
+        create_change(2, "1", RPGStatus.BOOKING, date(2024, 1, 5)),
+        create_change(3, "2", RPGStatus.BOOKING, date(2024, 3, 1)),
+    ]
+    assert crud.apply_changes(sqlite_db, bookings, last_seq=3) == {(1, 2024)}
+
+    # Cancel one booking twice, the second cancellation must not be counted
+    cancellation = create_change(4, "0", RPGStatus.CANCELLATION, date(2024, 1, 5))
+    assert crud.apply_changes(sqlite_db, [cancellation], last_seq=4) == {(1, 2024)}
+    cancellation = create_change(5, "0", RPGStatus.CANCELLATION, date(2024, 1, 5))
+    assert crud.apply_changes(sqlite_db, [cancellation], last_seq=5) == set()
+
+    # Assert the counts of the hotel and year
+    assert crud.get_booking_counts_for_year(sqlite_db, hotel_id=1, year=2024) == {
+        date(2024, 1, 5): 1,
+        date(2024, 3, 1): 1,
+    }
+    assert crud.get_booking_counts_for_year(sqlite_db, hotel_id=1, year=2023) == {}
+    assert crud.get_booking_counts_for_year(sqlite_db, hotel_id=2, year=2024) == {}
+
+
+def test_rebuild_booking_counts(sqlite_db: Session):
+    """
+    Test function for rebuilding the aggregate table from the bookings with a grouped query.
+
+    Returns:
+        None
+    """
+    # Create bookings of two hotels around the turn of the year and cancel one of them
+    changes = [
+        create_change(1, "0", RPGStatus.BOOKING, date(2023, 12, 31)),
+        create_change(2, "1", RPGStatus.BOOKING, date(2024, 1, 1)),
+        create_change(3, "2", RPGStatus.BOOKING, date(2024, 1, 1)),
+        create_change(4, "3", RPGStatus.BOOKING, date(2024, 12, 31)),
+        create_change(5, "4", RPGStatus.BOOKING, date(2024, 1, 1), hotel_id=2),
+        create_change(6, "2", RPGStatus.CANCELLATION, date(2024, 1, 1)),
+    ]
+    crud.apply_changes(sqlite_db, changes, last_seq=6)
+
+    # Assert the bookings within the year
+    expected_counts = {date(2024, 1, 1): 1, date(2024, 12, 31): 1}
+
+    # Assert the rebuilt aggregate table matches the incrementally maintained one
+    assert crud.get_booking_counts_for_year(sqlite_db, hotel_id=1, year=2024) == expected_counts
+    crud.rebuild_booking_counts(sqlite_db)
+    assert crud.get_booking_counts_for_year(sqlite_db, hotel_id=1, year=2024) == expected_counts
+    assert crud.get_booking_counts_for_year(sqlite_db, hotel_id=2, year=2024) == {date(2024, 1, 1): 1}
+
+
+def test_apply_changes_redelivered(sqlite_db: Session):
+    """
+    Test function for applying a page of changes twice, the second time must not change anything.
+
+    Returns:
+        None
+    """
+
+    def change(seq: int, room_id: str, rpg_status: RPGStatus, night_of_stay: date) -> schemas.ReadChange:
+        return schemas.ReadChange(
+            seq=seq,
+            event_id=seq,
+            hotel_id=1,
+            timestamp=datetime(2024, 1, 1),
+            rpg_status=rpg_status,
+            room_id=room_id,
+            night_of_stay=night_of_stay,
+            recorded_at=datetime(2024, 1, 1),
+        )
+
+    # Create an existing booking
+    crud.apply_changes(sqlite_db, [change(1, "0", RPGStatus.BOOKING, date(2024, 1, 5))], last_seq=1)
+
+    changes = [
+        change(2, "1", RPGStatus.BOOKING, date(2024, 1, 5)),
+        change(3, "2", RPGStatus.BOOKING, date(2025, 3, 1)),
+        change(4, "0", RPGStatus.CANCELLATION, date(2024, 1, 5)),
+        change(5, "2", RPGStatus.CANCELLATION, date(2025, 3, 1)),
+        change(6, "3", RPGStatus.CANCELLATION, date(2024, 1, 5)),  # unknown room
+    ]
+
+    # Apply the page and assert the changed partitions
+    assert crud.apply_changes(sqlite_db, changes, last_seq=6) == set()  # the changes of both years net out to zero
+    new_booking = change(7, "4", RPGStatus.BOOKING, date(2025, 3, 1))
+    assert crud.apply_changes(sqlite_db, [new_booking], last_seq=7) == {(1, 2025)}
+
+    # Redeliver the pages, the changes up to the checkpoint must be skipped
+    assert crud.apply_changes(sqlite_db, changes, last_seq=6) == set()
+    assert crud.apply_changes(sqlite_db, [new_booking], last_seq=7) == set()
+
+    # Assert the events and counts
+    db_data = {event.room_id: event.rpg_status for event in sqlite_db.query(models.Event).all()}
+    assert db_data == {
+        "0": RPGStatus.CANCELLATION,
+        "1": RPGStatus.BOOKING,
+        "2": RPGStatus.CANCELLATION,
+        "4": RPGStatus.BOOKING,
+    }
+    assert crud.get_booking_counts_for_year(sqlite_db, hotel_id=1, year=2024) == {date(2024, 1, 5): 1}
+    assert crud.get_booking_counts_for_year(sqlite_db, hotel_id=1, year=2025) == {date(2025, 3, 1): 1}
+    assert crud.get_checkpoint(sqlite_db).change_seq == 7
+
+    # Assert the changes of another shard of the data provider are tracked by their own checkpoint
+    crud.apply_changes(sqlite_db, [change(3, "5", RPGStatus.BOOKING, date(2024, 1, 5))], last_seq=3, shard=1)
+    assert crud.get_checkpoint_seqs(sqlite_db) == {0: 7, 1: 3}
+    assert crud.get_booking_counts_for_year(sqlite_db, hotel_id=1, year=2024) == {date(2024, 1, 5): 2}
+
+
+def test_apply_changes_room_nights(sqlite_db: Session):
+    """
+    Test function for applying the bookings of a room on several nights, a cancelled night can be booked again.
+
+    Returns:
+        None
+    """
+    changes = [
+        schemas.ReadChange(
+            seq=seq,
+            event_id=seq,
+            hotel_id=1,
+            timestamp=datetime(2024, 1, 1),
+            rpg_status=rpg_status,
+            room_id="0",
+            night_of_stay=night_of_stay,
+            recorded_at=datetime(2024, 1, 1),
+        )
+        for seq, rpg_status, night_of_stay in [
+            (1, RPGStatus.BOOKING, date(2024, 1, 5)),
+            (2, RPGStatus.BOOKING, date(2024, 1, 6)),
+            (3, RPGStatus.CANCELLATION, date(2024, 1, 5)),
+            (4, RPGStatus.BOOKING, date(2024, 1, 5)),
+            (5, RPGStatus.BOOKING, date(2024, 1, 6)),  # the night is booked already
+        ]
+    ]
+
+    # Apply the first changes and the rest in a second page
+    crud.apply_changes(sqlite_db, changes[:2], last_seq=2)
+    crud.apply_changes(sqlite_db, changes[2:], last_seq=5)
+
+    # Assert the cancelled booking is kept next to the new booking of the night
+    db_data = sorted(
+        (event.night_of_stay, event.rpg_status) for event in sqlite_db.query(models.Event).all()
+    )
+    assert db_data == [
+        (date(2024, 1, 5), RPGStatus.BOOKING),
+        (date(2024, 1, 5), RPGStatus.CANCELLATION),
+        (date(2024, 1, 6), RPGStatus.BOOKING),
+    ]
+    assert crud.get_booking_counts_for_year(sqlite_db, hotel_id=1, year=2024) == {
+        date(2024, 1, 5): 1,
+        date(2024, 1, 6): 1,
+    }
+
+
+def test_apply_changes_without_raw_events(sqlite_db: Session):
+    """
+    Test function for maintaining only the aggregate table from the changes when the raw events are not stored.
+
+    Returns:
+        None
+    """
+    changes = [
+        schemas.ReadChange(
+            seq=seq,
+            event_id=seq,
+            hotel_id=1,
+            timestamp=datetime(2024, 1, 1),
+            rpg_status=rpg_status,
+            room_id=room_id,
+            night_of_stay=date(2024, 1, 5),
+            recorded_at=datetime(2024, 1, 1),
+        )
+        for seq, room_id, rpg_status in [
+            (1, "0", RPGStatus.BOOKING),
+            (2, "1", RPGStatus.BOOKING),
+            (3, "0", RPGStatus.CANCELLATION),
+        ]
+    ]
+
+    # Apply the page twice
+    with patch.object(config, "STORE_RAW_EVENTS", False):
+        assert crud.apply_changes(sqlite_db, changes, last_seq=3) == {(1, 2024)}
+        assert crud.apply_changes(sqlite_db, changes, last_seq=3) == set()
+
+    # Assert only the counts and the checkpoint were stored
+    assert sqlite_db.query(models.Event).count() == 0
+    assert crud.get_booking_counts_for_year(sqlite_db, hotel_id=1, year=2024) == {date(2024, 1, 5): 1}
+    assert crud.get_checkpoint(sqlite_db).change_seq == 3
@@ -1,60 +1,65 @@
+import asyncio
 from datetime import date, datetime
-from unittest.mock import Mock, patch
-from src import config, schemas
-from src.data_fetcher import fetch_events
+from typing import Callable
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+import httpx
+import msgpack
+from sqlalchemy.orm import Session
+from src import config, crud, models, schemas
+from src.data_fetcher import backfill, create_client, fetch_event_page, fetch_head_seqs, update_data
 from src.enums import RPGStatus
 
 
-@patch("src.data_fetcher.requests.get")
-def test_fetch_events(mock_get: Mock):
+def mock_client(handler: Callable[[httpx.Request], httpx.Response]) -> httpx.AsyncClient:
     """
-    Test case for the fetch_events function. Mocks the requests.get method to return a list of events.
+    Creates a client for the data provider API which answers the requests with the given handler.
     """
-
-    # Mock the response from the requests.get method
-    mock_response = Mock()
-    mock_response.ok = True
-    mock_response.json.return_value = [
-        {
-            "id": 1,
-            "hotel_id": 0,
-            "rpg_status": 1,
-            "room_id": "0",
-            "night_of_stay": date(2022, 1, 6).isoformat(),
-            "timestamp": datetime(2022, 1, 1).isoformat(),
-        },
-        {
-            "id": 2,
-            "hotel_id": 0,
-            "rpg_status": 1,
-            "room_id": "1",
-            "night_of_stay": date(2022, 1, 7).isoformat(),
-            "timestamp": datetime(2022, 1, 1).isoformat(),
-        },
-    ]
-    mock_get.return_value = mock_response
-
-    # Define the expected start and end timestamps
-    start_timestamp = datetime(2022, 1, 1)
-    end_timestamp = datetime(2022, 1, 2)
-
-    # Call the fetch_events function
-    events = fetch_events(start_timestamp, end_timestamp)
-
-    # Assert the requests.get method was called with the correct parameters
-    mock_get.assert_called_once_with(
-        f"{config.DATA_PROVIDER_URL}/events",
-        params={
-            "updated__gte": "2022-01-01T00:00:00",
-            "updated__lte": "2022-01-02T00:00:00",
-        },
-        timeout=5,    
+    return httpx.AsyncClient(
+        base_url=config.DATA_PROVIDER_URL, transport=httpx.MockTransport(handler)
     )
 
+
+def test_fetch_event_page_msgpack():
+    """
+    Test case for the fetch_event_page function. Mocks the data provider API to return the events as MessagePack
+    encoded columns and asserts they are decoded to the same events as the JSON response.
+    """
+    requests = []
+
+    # Mock the response of the data provider API
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        columns = {
+            "id": [1, 2],
+            "seq": [1, 2],
+            "hotel_id": [0, 0],
+            "timestamp": [datetime(2022, 1, 1).isoformat()] * 2,
+            "rpg_status": [1, 2],
+            "room_id": ["0", "1"],
+            "night_of_stay": [date(2022, 1, 6).toordinal(), date(2022, 1, 7).toordinal()],
+        }
+        return httpx.Response(
+            200, content=msgpack.packb(columns), headers={"content-type": "application/x-msgpack"}
+        )
+
+    # Call the fetch_event_page function with the headers of the production client
+    async def fetch() -> list[schemas.ReadEvent]:
+        async with mock_client(handler) as client:
+            client.headers.update(create_client().headers)
+            return await fetch_event_page(client, after_seq=0, limit=2)
+
+    events = asyncio.run(fetch())
+
+    # Assert the columnar encoding of the page was requested
+    assert requests[0].headers["Accept"].startswith("application/x-msgpack")
+    assert dict(requests[0].url.params) == {"after_seq": "0", "limit": "2", "shard": "0"}
+
     # Assert the returned events match the expected events
-    expected_events = [
+    assert events == [
         schemas.ReadEvent(
             id=1,
+            seq=1,
             hotel_id=0,
             rpg_status=RPGStatus.BOOKING,
             room_id="0",
@@ -63,11 +68,128 @@ def test_fetch_events(mock_get: Mock):
         ),
         schemas.ReadEvent(
             id=2,
+            seq=2,
             hotel_id=0,
-            rpg_status=RPGStatus.BOOKING,
+            rpg_status=RPGStatus.CANCELLATION,
             room_id="1",
             night_of_stay=date(2022, 1, 7),
             timestamp=datetime(2022, 1, 1),
         ),
     ]
-    assert events == expected_events
+
+
+@patch("src.data_fetcher.config.HTTP_RETRY_BACKOFF", 0)
+def test_update_data(sqlite_db: Session):
+    """
+    Test case for the update_data function. Mocks the data provider API to fail once and then return a page
+    of the change log with a booking and its cancellation, and asserts that both are applied.
+    """
+    requests = []
+    change = {
+        "event_id": 1,
+        "hotel_id": 0,
+        "room_id": "0",
+        "night_of_stay": date(2022, 1, 6).isoformat(),
+        "timestamp": datetime(2022, 1, 1).isoformat(),
+        "recorded_at": datetime(2022, 1, 1).isoformat(),
+    }
+
+    # Mock the response of the data provider API, failing on the first request
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if len(requests) == 1:
+            return httpx.Response(503)
+        return httpx.Response(
+            200,
+            json={
+                "changes": [
+                    {**change, "seq": 3, "rpg_status": 1},
+                    {**change, "seq": 4, "rpg_status": 2},
+                ],
+                "last_seq": 4,
+                "head_seq": 4,
+            },
+        )
+
+    # Call the update_data function
+    async def update() -> schemas.ChangePage:
+        async with mock_client(handler) as client:
+            return await update_data(db=sqlite_db, client=client, since=2, wait=10)
+
+    page = asyncio.run(update())
+
+    # Assert the long-poll was retried after the given seq
+    assert len(requests) == 2
+    assert requests[1].url.path == "/changes"
+    assert dict(requests[1].url.params) == {
+        "since": "2",
+        "limit": str(config.CHANGE_PAGE_SIZE),
+        "wait": "10",
+        "shard": "0",
+    }
+    assert page.last_seq == 4
+
+    # Assert the booking was created and cancelled
+    db_data = sqlite_db.query(models.Event).all()
+    assert len(db_data) == 1
+    assert db_data[0].room_id == "0"
+    assert db_data[0].rpg_status == RPGStatus.CANCELLATION
+    assert crud.get_checkpoint(sqlite_db).change_seq == 4
+
+
+@patch("src.data_fetcher.config.BACKFILL_PARTITIONS", 2)
+@patch("src.data_fetcher.config.BACKFILL_PAGE_SIZE", 2)
+def test_backfill(sqlite_client: TestClient, sqlite_db: Session):
+    """
+    Test case for the backfill function. Mocks the data provider API to return 5 events, of which one was cancelled,
+    and a change log with 6 changes, and asserts that all events are loaded in pages of two seq partitions.
+    A dashboard requested before the backfill is not answered with 304 Not Modified afterwards.
+    """
+    params = {"hotel_id": 0, "period": "month", "year": 2022}
+    etag = sqlite_client.get("/dashboard", params=params).headers["ETag"]
+    requests = []
+    events = [
+        {
+            "id": seq,
+            "seq": seq,
+            "hotel_id": 0,
+            "rpg_status": 2 if seq == 2 else 1,
+            "room_id": str(seq),
+            "night_of_stay": date(2022, 1, 6).isoformat(),
+            "timestamp": datetime(2022, 1, 1).isoformat(),
+        }
+        for seq in range(1, 6)
+    ]
+
+    # Mock the response of the data provider API
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path == "/changes":
+            return httpx.Response(200, json={"changes": [], "last_seq": 0, "head_seq": 6})
+        after_seq = int(request.url.params["after_seq"])
+        limit = int(request.url.params["limit"])
+        return httpx.Response(200, json=[event for event in events if event["seq"] > after_seq][:limit])
+
+    # Call the backfill function
+    async def run_backfill() -> dict[int, int]:
+        async with mock_client(handler) as client:
+            head_seqs = await fetch_head_seqs(client)
+            await backfill(db=sqlite_db, client=client, head_seqs=head_seqs)
+            return head_seqs
+
+    head_seqs = asyncio.run(run_backfill())
+
+    # Assert the partitions (0, 3] and (3, ...) of the single shard were paged through
+    assert head_seqs == {0: 6}
+    pages = sorted(request.url.params["after_seq"] for request in requests if request.url.path == "/events")
+    assert pages == ["0", "2", "3", "5"]
+
+    # Assert the events, counts and checkpoint
+    assert sqlite_db.query(models.Event).count() == 5
+    assert crud.get_booking_counts_for_year(sqlite_db, hotel_id=0, year=2022) == {date(2022, 1, 6): 4}
+    assert crud.get_checkpoint(sqlite_db).change_seq == 6
+
+    # Assert the dashboard of the loaded events is sent again
+    response = sqlite_client.get("/dashboard", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["2022-01-01"] == 4
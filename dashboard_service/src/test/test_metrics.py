@@ -0,0 +1,29 @@
+from fastapi.testclient import TestClient
+from prometheus_client.parser import text_string_to_metric_families
+from src.database import Base, engine
+
+
+def test_metrics(sqlite_client: TestClient):
+    """
+    Test function for the metrics of the requests, database queries and tables.
+    """
+    # the rows are counted in the database of the service
+    Base.metadata.create_all(bind=engine)
+    response = sqlite_client.get("/dashboard", params={"hotel_id": 1, "period": "month", "year": 2024})
+    assert response.status_code == 200
+
+    response = sqlite_client.get("/metrics")
+    assert response.status_code == 200
+    samples = {
+        (sample.name, tuple(sorted(sample.labels.items())))
+        for family in text_string_to_metric_families(response.text)
+        for sample in family.samples
+    }
+
+    # Assert the request is labeled with its route template
+    assert (
+        "http_request_duration_seconds_count",
+        (("method", "GET"), ("route", "/dashboard"), ("status", "200")),
+    ) in samples
+    assert ("db_query_duration_seconds_count", (("statement", "SELECT"),)) in samples
+    assert ("table_rows", (("table", "daily_booking_counts"),)) in samples
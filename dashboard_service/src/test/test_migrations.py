@@ -0,0 +1,47 @@
+from datetime import date
+from pathlib import Path
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+from src import crud, models
+from src.enums import RPGStatus
+from src.migrations import upgrade_schema
+from src.test.test_crud import create_change
+
+# the events table of the first release, before the double booking index
+LEGACY_EVENTS_DDL = (
+    "CREATE TABLE events (id INTEGER NOT NULL, hotel_id INTEGER, timestamp DATETIME, rpg_status VARCHAR(12), "
+    "room_id VARCHAR, night_of_stay DATE, PRIMARY KEY (id), UNIQUE (room_id))"
+)
+
+
+def test_upgrade_legacy_schema(tmp_path: Path):
+    """
+    Test function for upgrading a database of the first release, so the bookings of a room on two nights are applied.
+
+    Returns:
+        None
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(LEGACY_EVENTS_DDL))
+        conn.execute(text("CREATE INDEX ix_events_room_id ON events (room_id)"))
+        conn.execute(text(
+            "INSERT INTO events (id, hotel_id, timestamp, rpg_status, room_id, night_of_stay) "
+            "VALUES (1, 1, '2024-01-01 00:00:00.000000', 'BOOKING', '0', '2024-01-05')"
+        ))
+    upgrade_schema(engine)
+    # The upgrade checks the schema first, so a second start doesn't change anything
+    upgrade_schema(engine)
+
+    index_names = {index["name"] for index in inspect(engine).get_indexes("events")}
+    assert {"ix_events_hotel_status_night", "ux_events_booked_room_night"} <= index_names
+    assert inspect(engine).get_unique_constraints("events") == []
+
+    with sessionmaker(autocommit=False, autoflush=False, bind=engine)() as db:
+        changes = [
+            create_change(2, "1", RPGStatus.BOOKING, date(2024, 1, 5)),
+            create_change(3, "1", RPGStatus.BOOKING, date(2024, 1, 6)),
+        ]
+        crud.apply_changes(db, changes, last_seq=3)
+        assert db.query(models.Event).count() == 3
+    engine.dispose()
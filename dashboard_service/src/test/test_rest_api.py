@@ -1,9 +1,9 @@
-from fastapi.testclient import TestClient
-from datetime import datetime, date
+import json
+from datetime import date
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 from src import models
-from src.enums import RPGStatus
+from src.cache import dashboard_cache
 
 
 def test_get_dashboard(rest_client: TestClient, mock_db: Session) -> None:
@@ -18,34 +18,10 @@ def test_get_dashboard(rest_client: TestClient, mock_db: Session) -> None:
         mock_db (Session): The mocked database session fixture.
     """
 
-    # Create test data for bookings in a year
-    event1 = models.Event(
-        id=1,
-        hotel_id=1,
-        timestamp=datetime(2024, 1, 15),  # January
-        rpg_status=RPGStatus.BOOKING,
-        room_id="0",
-        night_of_stay=date(2024, 1, 15),
-    )
-    event2 = models.Event(
-        id=2,
-        hotel_id=1,
-        timestamp=datetime(2024, 1, 20),  # January
-        rpg_status=RPGStatus.BOOKING,
-        room_id="1",
-        night_of_stay=date(2024, 1, 20),
-    )
-    event3 = models.Event(
-        id=3,
-        hotel_id=1,
-        timestamp=datetime(2024, 2, 10),  # February
-        rpg_status=RPGStatus.BOOKING,
-        room_id="2",
-        night_of_stay=date(2024, 2, 10),
-    )
-    mock_db.add(event1)
-    mock_db.add(event2)
-    mock_db.add(event3)
+    # Create the aggregated test data for bookings in a year
+    mock_db.add(models.DailyBookingCount(hotel_id=1, night_of_stay=date(2024, 1, 15), booking_count=1))
+    mock_db.add(models.DailyBookingCount(hotel_id=1, night_of_stay=date(2024, 1, 20), booking_count=1))
+    mock_db.add(models.DailyBookingCount(hotel_id=1, night_of_stay=date(2024, 2, 10), booking_count=1))
     mock_db.commit()
 
     # Test for MONTH period
@@ -81,3 +57,146 @@ def test_get_dashboard(rest_client: TestClient, mock_db: Session) -> None:
     assert data_day["2024-01-15"] == 1  # One event on 2024-01-15
     assert data_day["2024-01-20"] == 1  # One event on 2024-01-20
     assert data_day["2024-02-10"] == 1  # One event on 2024-02-10
+
+
+def test_get_dashboard_not_modified(rest_client: TestClient) -> None:
+    """
+    Test case for the conditional request of the get_dashboard endpoint.
+
+    Args:
+        rest_client (TestClient): The test client fixture for making HTTP requests.
+    """
+    params = {"hotel_id": 1, "period": "month", "year": 2024}
+
+    # Request the dashboard
+    response = rest_client.get("/dashboard", params=params)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    # Assert the unchanged dashboard is not sent again
+    response = rest_client.get("/dashboard", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+    # Assert a change of the hotel and year results in a new version
+    dashboard_cache.invalidate({(1, 2024)})
+    response = rest_client.get("/dashboard", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_get_bulk_dashboard(sqlite_client: TestClient, sqlite_db: Session) -> None:
+    """
+    Test case for the get_bulk_dashboard endpoint.
+
+    Args:
+        sqlite_client (TestClient): The test client fixture backed by an in-memory database.
+        sqlite_db (Session): The in-memory database session fixture.
+    """
+
+    # Create the aggregated test data of two hotels
+    sqlite_db.add(models.DailyBookingCount(hotel_id=1, night_of_stay=date(2023, 3, 1), booking_count=2))
+    sqlite_db.add(models.DailyBookingCount(hotel_id=1, night_of_stay=date(2024, 1, 15), booking_count=1))
+    sqlite_db.add(models.DailyBookingCount(hotel_id=3, night_of_stay=date(2024, 2, 10), booking_count=5))
+    sqlite_db.add(models.DailyBookingCount(hotel_id=4, night_of_stay=date(2024, 2, 10), booking_count=7))
+    sqlite_db.commit()
+
+    # Request the dashboards of three hotels, one of them without bookings
+    response = sqlite_client.post(
+        "/dashboard/bulk",
+        json={"hotel_ids": [3, 1, 2], "start_year": 2023, "end_year": 2024, "period": "month"},
+    )
+
+    # Assert one line per hotel in ascending order
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.iter_lines()]
+    assert [line["hotel_id"] for line in lines] == [1, 2, 3]
+    assert lines[0]["dashboards"]["2023"]["2023-03-01"] == 2
+    assert lines[0]["dashboards"]["2024"]["2024-01-01"] == 1
+    assert sum(lines[1]["dashboards"]["2024"].values()) == 0
+    assert lines[2]["dashboards"]["2024"]["2024-02-01"] == 5
+    assert len(lines[2]["dashboards"]["2023"]) == 12
+
+    # Assert invalid year ranges are rejected
+    response = sqlite_client.post(
+        "/dashboard/bulk",
+        json={"hotel_ids": [1], "start_year": 2024, "end_year": 2023, "period": "month"},
+    )
+    assert response.status_code == 422
+    response = sqlite_client.post(
+        "/dashboard/bulk",
+        json={"hotel_ids": [1], "start_year": 9999, "end_year": 10000, "period": "month"},
+    )
+    assert response.status_code == 422
+
+
+def test_get_dashboard_date_range(rest_client: TestClient, mock_db: Session) -> None:
+    """
+    Test case for the get_dashboard endpoint with a date range instead of a year.
+
+    Args:
+        rest_client (TestClient): The test client fixture for making HTTP requests.
+        mock_db (Session): The mocked database session fixture.
+    """
+
+    # Create the aggregated test data within the range
+    mock_db.add(models.DailyBookingCount(hotel_id=1, night_of_stay=date(2023, 12, 30), booking_count=2))
+    mock_db.add(models.DailyBookingCount(hotel_id=1, night_of_stay=date(2024, 1, 2), booking_count=1))
+    mock_db.commit()
+
+    # Test for QUARTER period over the turn of the year
+    response = rest_client.get(
+        "/dashboard",
+        params={"hotel_id": 1, "period": "quarter", "start": "2023-12-15", "end": "2024-01-14"},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"2023-10-01": 2, "2024-01-01": 1}
+
+    # Test for WEEK period
+    response = rest_client.get(
+        "/dashboard",
+        params={"hotel_id": 1, "period": "week", "start": "2023-12-15", "end": "2024-01-14"},
+    )
+    assert response.status_code == 200
+    data_week = response.json()
+    assert len(data_week) == 5  # the weeks starting 2023-12-11 to 2024-01-08
+    assert data_week["2023-12-25"] == 2
+    assert data_week["2024-01-01"] == 1
+
+    # Assert the range has to be given either as year or as start and end
+    response = rest_client.get(
+        "/dashboard", params={"hotel_id": 1, "period": "day", "start": "2023-12-15"}
+    )
+    assert response.status_code == 422
+    response = rest_client.get(
+        "/dashboard",
+        params={"hotel_id": 1, "period": "day", "start": "2024-01-14", "end": "2023-12-15"},
+    )
+    assert response.status_code == 422
+
+
+def test_get_dashboard_calendar_bounds(rest_client: TestClient) -> None:
+    """
+    Test case for the get_dashboard endpoint at the first and last days of the calendar.
+
+    Args:
+        rest_client (TestClient): The test client fixture for making HTTP requests.
+    """
+
+    # Assert a year outside of the calendar is rejected
+    response = rest_client.get("/dashboard", params={"hotel_id": 1, "period": "day", "year": 10000})
+    assert response.status_code == 422
+    response = rest_client.get("/dashboard", params={"hotel_id": 1, "period": "day", "year": 0})
+    assert response.status_code == 422
+
+    # Assert the ranges at the first and the last days of the calendar are counted
+    response = rest_client.get(
+        "/dashboard",
+        params={"hotel_id": 1, "period": "week", "start": "0001-01-01", "end": "0001-01-03"},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"0001-01-01": 0}
+    response = rest_client.get("/dashboard", params={"hotel_id": 1, "period": "quarter", "year": 9999})
+    assert response.status_code == 200
+    assert len(response.json()) == 4
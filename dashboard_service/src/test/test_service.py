@@ -1,160 +1,40 @@
-from datetime import date, datetime
-from src import schemas
-from src.enums import RPGStatus
-from src.service import group_events_by_day, group_events_by_month
+from datetime import date
+from src.enums import DashboardPeriod
+from src.service import count_by_period
 
 
-def test_group_events_by_month():
+def test_count_by_period():
     """
-    Test function for grouping events by month.
-
-    This function creates sample events and calls the `group_events_by_month` function
-    to group the events by month. It then asserts that the result matches the expected
-    output.
+    Test function for summing up counts per day by week and quarter.
 
     Returns:
         None
     """
-    # Create sample events
-    events = [
-        schemas.ReadEvent(
-            id=0,
-            hotel_id=0,
-            timestamp=datetime.now(),
-            rpg_status=RPGStatus.BOOKING,
-            room_id="0",
-            night_of_stay=date(2022, 1, 5),
-        ),
-        schemas.ReadEvent(
-            id=1,
-            hotel_id=0,
-            timestamp=datetime.now(),
-            rpg_status=RPGStatus.BOOKING,
-            room_id="0",
-            night_of_stay=date(2022, 1, 10),
-        ),
-        schemas.ReadEvent(
-            id=2,
-            hotel_id=0,
-            timestamp=datetime.now(),
-            rpg_status=RPGStatus.BOOKING,
-            room_id="0",
-            night_of_stay=date(2022, 2, 15),
-        ),
-        schemas.ReadEvent(
-            id=3,
-            hotel_id=0,
-            timestamp=datetime.now(),
-            rpg_status=RPGStatus.BOOKING,
-            room_id="0",
-            night_of_stay=date(2022, 3, 20),
-        ),
-        schemas.ReadEvent(
-            id=4,
-            hotel_id=0,
-            timestamp=datetime.now(),
-            rpg_status=RPGStatus.BOOKING,
-            room_id="0",
-            night_of_stay=date(2022, 3, 25),
-        ),
-        schemas.ReadEvent(
-            id=5,
-            hotel_id=0,
-            timestamp=datetime.now(),
-            rpg_status=RPGStatus.BOOKING,
-            room_id="0",
-            night_of_stay=date(2022, 4, 1),
-        ),
+    counts = [
+        (date(2022, 1, 1), 1),  # Saturday of the week starting 2021-12-27
+        (date(2022, 1, 3), 2),  # Monday
+        (date(2022, 1, 9), 1),  # Sunday
+        (date(2022, 4, 1), 4),
+        (date(2022, 4, 1), 1),  # repeated day
+        (date(2023, 1, 1), 9),  # outside of the range
     ]
 
-    # Call the function
-    result = group_events_by_month(events, 2022)
+    # Call the function for weeks
+    result = count_by_period(counts, date(2022, 1, 1), date(2022, 12, 31), DashboardPeriod.WEEK)
+    # Assert the result
+    assert len(result) == 53
+    assert list(result)[:3] == ["2021-12-27", "2022-01-03", "2022-01-10"]
+    assert result["2021-12-27"] == 1
+    assert result["2022-01-03"] == 3
+    assert result["2022-01-10"] == 0
+    assert result["2022-03-28"] == 5
+
+    # Call the function for quarters
+    result = count_by_period(counts, date(2022, 1, 1), date(2022, 12, 31), DashboardPeriod.QUARTER)
     # Assert the result
     assert result == {
-        date(2022, 1, 1).isoformat(): 2,
-        date(2022, 2, 1).isoformat(): 1,
-        date(2022, 3, 1).isoformat(): 2,
-        date(2022, 4, 1).isoformat(): 1,
-        date(2022, 5, 1).isoformat(): 0,
-        date(2022, 6, 1).isoformat(): 0,
-        date(2022, 7, 1).isoformat(): 0,
-        date(2022, 8, 1).isoformat(): 0,
-        date(2022, 9, 1).isoformat(): 0,
-        date(2022, 10, 1).isoformat(): 0,
-        date(2022, 11, 1).isoformat(): 0,
-        date(2022, 12, 1).isoformat(): 0,
+        "2022-01-01": 4,
+        "2022-04-01": 5,
+        "2022-07-01": 0,
+        "2022-10-01": 0,
     }
-
-
-def test_group_events_by_day():
-    """
-    Test function for grouping events by day.
-
-    This function creates sample events and calls the `group_events_by_day` function
-    to group the events by day. It then asserts that the result matches the expected
-    output.
-
-    Returns:
-        None
-    """
-    # Create sample events
-    events = [
-        schemas.ReadEvent(
-            id=0,
-            hotel_id=0,
-            timestamp=datetime.now(),
-            rpg_status=RPGStatus.BOOKING,
-            room_id="0",
-            night_of_stay=date(2022, 1, 5),
-        ),
-        schemas.ReadEvent(
-            id=1,
-            hotel_id=0,
-            timestamp=datetime.now(),
-            rpg_status=RPGStatus.BOOKING,
-            room_id="0",
-            night_of_stay=date(2022, 1, 10),
-        ),
-        schemas.ReadEvent(
-            id=2,
-            hotel_id=0,
-            timestamp=datetime.now(),
-            rpg_status=RPGStatus.BOOKING,
-            room_id="0",
-            night_of_stay=date(2022, 2, 15),
-        ),
-        schemas.ReadEvent(
-            id=3,
-            hotel_id=0,
-            timestamp=datetime.now(),
-            rpg_status=RPGStatus.BOOKING,
-            room_id="0",
-            night_of_stay=date(2022, 3, 20),
-        ),
-        schemas.ReadEvent(
-            id=4,
-            hotel_id=0,
-            timestamp=datetime.now(),
-            rpg_status=RPGStatus.BOOKING,
-            room_id="0",
-            night_of_stay=date(2022, 3, 25),
-        ),
-        schemas.ReadEvent(
-            id=5,
-            hotel_id=0,
-            timestamp=datetime.now(),
-            rpg_status=RPGStatus.BOOKING,
-            room_id="0",
-            night_of_stay=date(2022, 4, 1),
-        ),
-    ]
-    # Call the function
-    result = group_events_by_day(events, 2022)
-
-    # Assert the result
-    assert result[date(2022, 1, 5).isoformat()] == 1
-    assert result[date(2022, 1, 10).isoformat()] == 1
-    assert result[date(2022, 2, 15).isoformat()] == 1
-    assert result[date(2022, 3, 20).isoformat()] == 1
-    assert result[date(2022, 3, 25).isoformat()] == 1
-    assert result[date(2022, 4, 1).isoformat()] == 1
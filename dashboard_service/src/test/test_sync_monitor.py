@@ -0,0 +1,73 @@
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from src import schemas
+from src.enums import RPGStatus
+from src.sync_monitor import SyncMonitor
+
+
+def change_page(seq: int, head_seq: int, recorded_at: datetime) -> schemas.ChangePage:
+    change = schemas.ReadChange(
+        seq=seq,
+        event_id=seq,
+        hotel_id=1,
+        timestamp=datetime(2024, 1, 1),
+        rpg_status=RPGStatus.BOOKING,
+        room_id=str(seq),
+        night_of_stay=date(2024, 1, 5),
+        recorded_at=recorded_at,
+    )
+    return schemas.ChangePage(changes=[change], last_seq=seq, head_seq=head_seq)
+
+
+def record_cycle(monitor: SyncMonitor, shard: int, page: schemas.ChangePage) -> None:
+    monitor.record_cycle(
+        shard, page, datetime.now(timezone.utc), fetch_seconds=0.1, decode_seconds=0.01, apply_seconds=0.02
+    )
+
+
+def test_sync_monitor():
+    """
+    Test function for the lag and readiness of the followed shards.
+    """
+    monitor = SyncMonitor(history_size=2, max_lag_seconds=60)
+    assert not monitor.status().ready
+
+    # Shard 0 is up to date, shard 1 has no cycle yet
+    monitor.start([0, 1])
+    record_cycle(monitor, 0, change_page(5, 5, datetime.now(timezone.utc)))
+    assert not monitor.status().ready
+
+    # Shard 1 applied a change recorded two minutes ago and more changes are pending
+    record_cycle(monitor, 1, change_page(3, 10, datetime.now(timezone.utc) - timedelta(minutes=2)))
+    status = monitor.status()
+    assert not status.ready
+    assert status.shards[0].lag_seconds == 0
+    assert status.shards[1].lag_seconds >= 120
+    assert (status.shards[1].last_seq, status.shards[1].head_seq) == (3, 10)
+
+    # Shard 1 caught up, a failed cycle doesn't change the watermark
+    monitor.record_error(1, TimeoutError())
+    record_cycle(monitor, 1, change_page(10, 10, datetime.now(timezone.utc)))
+    status = monitor.status()
+    assert status.ready
+    assert status.shards[1].errors == 1
+    assert [cycle.last_seq for cycle in status.history] == [3, 10]
+
+
+def test_ready(sqlite_client: TestClient):
+    """
+    Test function for the readiness check, which fails until the shards are synchronized.
+    """
+    monitor = SyncMonitor(history_size=10, max_lag_seconds=60)
+    with patch("src.rest_api.sync_monitor", monitor):
+        monitor.start([0])
+        assert sqlite_client.get("/ready").status_code == 503
+
+        record_cycle(monitor, 0, change_page(1, 1, datetime.now(timezone.utc)))
+        response = sqlite_client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["shards"][0]["last_seq"] == 1
+
+        response = sqlite_client.get("/sync")
+        assert response.json()["history"][0]["changes"] == 1
@@ -0,0 +1,39 @@
+from typing import Iterable
+import msgpack
+from src import models
+
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+
+def encode_events(events: Iterable[models.Event]) -> bytes:
+    """
+    Encode events as one MessagePack map of columns, so every field name is sent once per response
+    instead of once per event.
+
+    The columns hold the values of the events in the same order. Timestamps are ISO 8601 strings,
+    nights of stay are proleptic Gregorian ordinals and the RPG status is its enum value.
+
+    Args:
+        events (Iterable[models.Event]): The events to encode.
+
+    Returns:
+        bytes: The MessagePack encoded column batch.
+    """
+    columns = {
+        "id": [],
+        "seq": [],
+        "hotel_id": [],
+        "timestamp": [],
+        "rpg_status": [],
+        "room_id": [],
+        "night_of_stay": [],
+    }
+    for event in events:
+        columns["id"].append(event.id)
+        columns["seq"].append(event.seq)
+        columns["hotel_id"].append(event.hotel_id)
+        columns["timestamp"].append(event.timestamp.isoformat())
+        columns["rpg_status"].append(event.rpg_status.value)
+        columns["room_id"].append(event.room_id)
+        columns["night_of_stay"].append(event.night_of_stay.toordinal())
+    return msgpack.packb(columns)
@@ -0,0 +1,17 @@
+import os
+
+
+# number of SQLite databases the events and the change log are distributed over by hotel_id,
+# changing it requires moving the existing events with `python -m src.rebalance`
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+
+# journal mode and synchronous setting of the SQLite connections, WAL lets readers run next to the writer
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "FULL")
+
+# apply POST /events through one writer per shard, which commits the queued events in groups
+GROUP_COMMIT = os.getenv("GROUP_COMMIT", "false").lower() == "true"
+# maximum number of events per group commit
+GROUP_COMMIT_MAX_SIZE = int(os.getenv("GROUP_COMMIT_MAX_SIZE", "500"))
+# seconds the writer waits for more events after the first one of a group
+GROUP_COMMIT_MAX_DELAY = float(os.getenv("GROUP_COMMIT_MAX_DELAY", "0.002"))
@@ -1,16 +1,25 @@
-from datetime import datetime, date
+from datetime import datetime, date, timezone
+import heapq
+from operator import attrgetter
 import sqlite3
+from typing import Iterator
 import sqlalchemy
 import sqlalchemy.exc
-from sqlalchemy.orm import Session
-from . import models, schemas
+from sqlalchemy.ext.horizontal_shard import set_shard_id
+from sqlalchemy.orm import Query, Session
+from . import config, models, schemas
+from .database import get_shard
+from .enums import BatchEventStatus
+
+# SQLite limits the number of bound parameters per statement
+IN_CLAUSE_CHUNK_SIZE = 500
 
 
 class DuplicateError(Exception):
     pass
 
 
-def get_events(
+def query_events(
     db: Session,
     hotel_id: int | None = None,
     updated__gte: datetime | None = None,
@@ -19,11 +28,16 @@ def get_events(
     room_id: int | None = None,
     night_of_stay__gte: date | None = None,
     night_of_stay__lte: date | None = None,
-) -> list[models.Event]:
+    after_seq: int | None = None,
+    limit: int | None = None,
+    shard: int | None = None,
+) -> Query:
     """
-    Retrieve events from the database based on the provided filters and return them sorted by timestamp in ascending order.
-    The function works by compositing a query based on the provided filters and then executing it.
-    Each filter is added to the query if it is not None and the query is then executed to retrieve the events.
+    Compose the query for events based on the provided filters, sorted by timestamp in ascending order.
+    Each filter is added to the query if it is not None.
+    If a page is requested via after_seq or limit, the events are sorted by their ingestion sequence instead,
+    so the query seeks on the seq index and the last seq of a page can be used as cursor for the next page.
+    The sequence is counted per shard, so with more than one shard a page has to be requested from a shard.
 
     Args:
         db (Session): The database session.
@@ -34,12 +48,17 @@ def get_events(
         room_id (int | None, optional): The ID of the room to filter events by. Defaults to None.
         night_of_stay__gte (date | None, optional): The minimum night of stay for events to include. Defaults to None.
         night_of_stay__lte (date | None, optional): The maximum night of stay for events to include. Defaults to None.
+        after_seq (int | None, optional): Only include events ingested after this sequence number. Defaults to None.
+        limit (int | None, optional): The maximum number of events to return. Defaults to None.
+        shard (int | None, optional): The shard to query, by default the shard of the hotel or all shards. Defaults to None.
 
     Returns:
-        List[models.Event]: A list of events matching the provided filters.
+        Query: The query for the events matching the provided filters.
     """
     query = db.query(models.Event)
-    if hotel_id:
+    if shard is not None:
+        query = query.options(set_shard_id(shard))
+    if hotel_id is not None:
         query = query.filter(models.Event.hotel_id == hotel_id)
 
     if updated__gte:
@@ -60,7 +79,97 @@ def get_events(
     if night_of_stay__lte:
         query = query.filter(models.Event.night_of_stay <= night_of_stay__lte)
 
-    return query.order_by(models.Event.timestamp.asc()).all()
+    if after_seq is None and limit is None:
+        return query.order_by(models.Event.timestamp.asc())
+
+    if after_seq is not None:
+        query = query.filter(models.Event.seq > after_seq)
+
+    return query.order_by(models.Event.seq.asc()).limit(limit)
+
+
+def get_events(
+    db: Session,
+    hotel_id: int | None = None,
+    updated__gte: datetime | None = None,
+    updated__lte: datetime | None = None,
+    rpg_status: schemas.RPGStatus | None = None,
+    room_id: int | None = None,
+    night_of_stay__gte: date | None = None,
+    night_of_stay__lte: date | None = None,
+    after_seq: int | None = None,
+    limit: int | None = None,
+    shard: int | None = None,
+) -> list[models.Event]:
+    """
+    Retrieve events from the database based on the provided filters and return them sorted by timestamp in ascending order.
+    The function works by compositing a query based on the provided filters and then executing it.
+    Each filter is added to the query if it is not None and the query is then executed to retrieve the events.
+    A page requested via after_seq or limit is sorted by the ingestion sequence instead, see `query_events`.
+    A query filtered by a hotel runs on the shard of the hotel, a query spanning several shards runs on each of them
+    and the sorted results are merged, see `iter_events`.
+
+    Args:
+        db (Session): The database session.
+        hotel_id (int): The ID of the hotel to filter events by.
+        updated__gte (datetime | None, optional): The minimum timestamp for events to include. Defaults to None.
+        updated__lte (datetime | None, optional): The maximum timestamp for events to include. Defaults to None.
+        rpg_status (schemas.RPGStatus | None, optional): The RPG status to filter events by. Defaults to None.
+        room_id (int | None, optional): The ID of the room to filter events by. Defaults to None.
+        night_of_stay__gte (date | None, optional): The minimum night of stay for events to include. Defaults to None.
+        night_of_stay__lte (date | None, optional): The maximum night of stay for events to include. Defaults to None.
+        after_seq (int | None, optional): Only include events ingested after this sequence number. Defaults to None.
+        limit (int | None, optional): The maximum number of events to return. Defaults to None.
+        shard (int | None, optional): The shard to query, by default the shard of the hotel or all shards. Defaults to None.
+
+    Returns:
+        List[models.Event]: A list of events matching the provided filters.
+    """
+    if shard is None and hotel_id is not None:
+        shard = get_shard(hotel_id)
+    query = query_events(
+        db,
+        hotel_id=hotel_id,
+        updated__gte=updated__gte,
+        updated__lte=updated__lte,
+        rpg_status=rpg_status,
+        room_id=room_id,
+        night_of_stay__gte=night_of_stay__gte,
+        night_of_stay__lte=night_of_stay__lte,
+        after_seq=after_seq,
+        limit=limit,
+        shard=shard,
+    )
+    return list(iter_events(query, shard=shard))
+
+
+def iter_events(
+    query: Query, shard: int | None = None, batch_size: int | None = None
+) -> Iterator[models.Event]:
+    """
+    Iterate the events of a query composed by `query_events`.
+    Without a shard and with more than one shard configured, the query runs on every shard and the results,
+    each sorted by timestamp, are merged into one sorted sequence while they are read.
+
+    Args:
+        query (Query): The query for the events.
+        shard (int | None, optional): The shard the query is restricted to. Defaults to None.
+        batch_size (int | None, optional): Read the events from the database cursor in batches of this size
+            instead of loading all of them at once. Defaults to None.
+
+    Returns:
+        Iterator[models.Event]: The events of the query.
+    """
+
+    def execute(query: Query) -> Iterator[models.Event]:
+        return iter(query.yield_per(batch_size) if batch_size else query.all())
+
+    if shard is not None or config.SHARD_COUNT == 1:
+        return execute(query)
+    return heapq.merge(
+        *(execute(query.options(set_shard_id(shard))) for shard in range(config.SHARD_COUNT)),
+        key=attrgetter("timestamp"),
+    )
 
 
 def create_event(db: Session, event: schemas.CreateEvent) -> models.Event:
@@ -76,6 +185,7 @@ def create_event(db: Session, event: schemas.CreateEvent) -> models.Event:
     """
     db_event = models.Event(**event.model_dump())
     db.add(db_event)
+    db.add(record_change(db_event))
     try:
         db.commit()
     except sqlalchemy.exc.IntegrityError as e:
@@ -86,19 +196,495 @@ def create_event(db: Session, event: schemas.CreateEvent) -> models.Event:
     return db_event
 
 
-def cancel_event(db: Session, event_id: int) -> models.Event:
+def cancel_bookings(
+    db: Session,
+    hotel_id: int | None = None,
+    room_ids: list[str] | None = None,
+    night_of_stay__gte: date | None = None,
+    night_of_stay__lte: date | None = None,
+) -> list[sqlalchemy.Row]:
     """
-    Cancel an event in the database.
+    Cancel the active bookings matching the filters and log their changes in a single transaction per shard.
+
+    The bookings are cancelled with one conditional UPDATE ... RETURNING per shard and chunk of room IDs, so
+    neither the bookings are loaded before nor the cancelled events read again afterwards. Bookings which are
+    already cancelled don't match, so repeating a cancellation cancels nothing.
+    Each filter is added if it is not None. Without a hotel the bookings are cancelled on all shards, one shard
+    after the other, so the write lock of a shard is never held while waiting for the lock of another.
 
     Parameters:
     - db (Session): The database session.
-    - event_id (int): The ID of the event to be cancelled.
+    - hotel_id (int | None): The ID of the hotel of the bookings.
+    - room_ids (list[str] | None): The IDs of the booked rooms.
+    - night_of_stay__gte (date | None): The first night of stay of the bookings.
+    - night_of_stay__lte (date | None): The last night of stay of the bookings.
 
     Returns:
-    - Event: The cancelled event object.
+    - list[Row]: The cancelled events.
     """
-    db_event = db.query(models.Event).filter(models.Event.id == event_id).first()
-    db_event.rpg_status = schemas.RPGStatus.CANCELLATION
-    db.commit()
-    db.refresh(db_event)
-    return db_event
+    statement = cancellation_statement(hotel_id, night_of_stay__gte, night_of_stay__lte)
+    if room_ids:
+        statements = [
+            statement.where(models.Event.room_id.in_(room_ids[i : i + IN_CLAUSE_CHUNK_SIZE]))
+            for i in range(0, len(room_ids), IN_CLAUSE_CHUNK_SIZE)
+        ]
+    else:
+        statements = [statement]
+
+    shards = [get_shard(hotel_id)] if hotel_id is not None else range(config.SHARD_COUNT)
+    cancelled_events = []
+    for shard in shards:
+        shard_events = []
+        for shard_statement in statements:
+            shard_events += db.execute(
+                shard_statement,
+                execution_options={"synchronize_session": False},
+                bind_arguments={"shard_id": shard},
+            ).all()
+        if shard_events:
+            # a Core insert, the ORM bulk insert does not support sharded sessions
+            db.execute(
+                sqlalchemy.insert(models.Change.__table__),
+                [change_values(db_event, BatchEventStatus.CANCELLED) for db_event in shard_events],
+                bind_arguments={"shard_id": shard},
+            )
+        db.commit()
+        cancelled_events += shard_events
+    return cancelled_events
+
+
+def cancellation_statement(
+    hotel_id: int | None = None,
+    night_of_stay__gte: date | None = None,
+    night_of_stay__lte: date | None = None,
+) -> sqlalchemy.Update:
+    """
+    Build the conditional UPDATE ... RETURNING which cancels the active bookings matching the filters.
+    Each filter is added if it is not None, further filters can be added with `where`.
+
+    Parameters:
+    - hotel_id (int | None): The ID of the hotel of the bookings.
+    - night_of_stay__gte (date | None): The first night of stay of the bookings.
+    - night_of_stay__lte (date | None): The last night of stay of the bookings.
+
+    Returns:
+    - Update: The statement returning the cancelled events.
+    """
+    statement = sqlalchemy.update(models.Event).where(
+        models.Event.rpg_status == schemas.RPGStatus.BOOKING
+    )
+    if hotel_id is not None:
+        statement = statement.where(models.Event.hotel_id == hotel_id)
+    if night_of_stay__gte:
+        statement = statement.where(models.Event.night_of_stay >= night_of_stay__gte)
+    if night_of_stay__lte:
+        statement = statement.where(models.Event.night_of_stay <= night_of_stay__lte)
+    return statement.values(rpg_status=schemas.RPGStatus.CANCELLATION).returning(
+        models.Event.id,
+        models.Event.hotel_id,
+        models.Event.timestamp,
+        models.Event.rpg_status,
+        models.Event.room_id,
+        models.Event.night_of_stay,
+        models.Event.seq,
+    )
+
+
+def stage_cancellation(
+    db: Session, event: schemas.CreateEvent, shard: int | None = None
+) -> tuple[BatchEventStatus, sqlalchemy.Row | models.Event | None]:
+    """
+    Cancel the booking of a cancellation event and log its change without committing.
+
+    The booking is cancelled with one conditional UPDATE ... RETURNING, see `cancellation_statement`, so it is
+    neither loaded before nor read again afterwards. Only if nothing was cancelled, the events of the room night
+    are looked up to tell an unknown booking from an already cancelled one.
+
+    Parameters:
+    - db (Session): The database session.
+    - event (CreateEvent): The cancellation.
+    - shard (int | None): The shard of the hotel of the event. Defaults to the shard of the hotel.
+
+    Returns:
+    - tuple[BatchEventStatus, Row | Event | None]: The outcome and the cancelled event, for a duplicate the
+      already cancelled booking.
+    """
+    if shard is None:
+        shard = get_shard(event.hotel_id)
+    statement = cancellation_statement(event.hotel_id, event.night_of_stay, event.night_of_stay)
+    cancelled_events = db.execute(
+        statement.where(models.Event.room_id == event.room_id),
+        execution_options={"synchronize_session": False},
+        bind_arguments={"shard_id": shard},
+    ).all()
+    if cancelled_events:
+        db.execute(
+            sqlalchemy.insert(models.Change.__table__),
+            [change_values(db_event, BatchEventStatus.CANCELLED) for db_event in cancelled_events],
+            bind_arguments={"shard_id": shard},
+        )
+        # a room has at most one active booking per night
+        return BatchEventStatus.CANCELLED, cancelled_events[0]
+    matched_events = get_events(
+        db,
+        hotel_id=event.hotel_id,
+        room_id=event.room_id,
+        night_of_stay__gte=event.night_of_stay,
+        night_of_stay__lte=event.night_of_stay,
+        shard=shard,
+    )
+    if not matched_events:
+        return BatchEventStatus.NOT_FOUND, None
+    return BatchEventStatus.DUPLICATE, matched_events[-1]
+
+
+def change_values(db_event: models.Event, status: BatchEventStatus) -> dict:
+    """
+    Build the change log values for an event created or cancelled by a batch.
+
+    Parameters:
+    - db_event (Event | Row): The flushed event or the row returned for it.
+    - status (BatchEventStatus): The outcome of the batch item, either created or cancelled.
+
+    Returns:
+    - dict: The column values of the change.
+    """
+    return {
+        "event_id": db_event.id,
+        "hotel_id": db_event.hotel_id,
+        "timestamp": db_event.timestamp,
+        # an event booked and cancelled within the batch is logged with both statuses
+        "rpg_status": (
+            schemas.RPGStatus.CANCELLATION
+            if status == BatchEventStatus.CANCELLED
+            else schemas.RPGStatus.BOOKING
+        ),
+        "room_id": db_event.room_id,
+        "night_of_stay": db_event.night_of_stay,
+        "recorded_at": datetime.now(timezone.utc),
+    }
+
+
+def record_change(db_event: models.Event) -> models.Change:
+    """
+    Build the change log entry for the current state of an event.
+    The entry has to be added to the session in the same transaction as the change of the event.
+
+    Parameters:
+    - db_event (Event): The created or cancelled event.
+
+    Returns:
+    - Change: The change log entry.
+    """
+    return models.Change(
+        event=db_event,
+        hotel_id=db_event.hotel_id,
+        timestamp=db_event.timestamp,
+        rpg_status=db_event.rpg_status,
+        room_id=db_event.room_id,
+        night_of_stay=db_event.night_of_stay,
+    )
+
+
+def get_changes(
+    db: Session, since: int = 0, limit: int | None = None, shard: int = 0
+) -> list[models.Change]:
+    """
+    Retrieve the changes written after a sequence number in sequence order.
+    Every shard has its own change log with its own sequence.
+
+    Parameters:
+    - db (Session): The database session.
+    - since (int): The seq of the last change already read.
+    - limit (int | None): The maximum number of changes to return.
+    - shard (int): The shard of the change log.
+
+    Returns:
+    - list[Change]: The changes after the given sequence number.
+    """
+    query = db.query(models.Change).options(set_shard_id(shard)).filter(models.Change.seq > since)
+    return query.order_by(models.Change.seq.asc()).limit(limit).all()
+
+
+def get_head_change_seq(db: Session, shard: int = 0) -> int:
+    """
+    Retrieve the sequence number of the newest change.
+
+    Parameters:
+    - db (Session): The database session.
+    - shard (int): The shard of the change log.
+
+    Returns:
+    - int: The seq of the newest change, 0 if the change log is empty.
+    """
+    query = db.query(sqlalchemy.func.max(models.Change.seq)).options(set_shard_id(shard))
+    return query.scalar() or 0
+
+
+def get_shard_id(db_event: models.Event) -> int | None:
+    """
+    Get the shard an event was loaded from or flushed to.
+
+    Parameters:
+    - db_event (Event): The persistent event.
+
+    Returns:
+    - int | None: The index of the shard, None if the session is not sharded.
+    """
+    return sqlalchemy.inspect(db_event).identity_token
+
+
+def get_booking(
+    db: Session, hotel_id: int, room_id: str, night_of_stay: date
+) -> models.Event | None:
+    """
+    Retrieve the active booking of a room for a night, served by the unique booking index.
+
+    Parameters:
+    - db (Session): The database session.
+    - hotel_id (int): The ID of the hotel.
+    - room_id (str): The ID of the room.
+    - night_of_stay (date): The night of stay.
+
+    Returns:
+    - Event | None: The booking, None if the room is not booked for the night.
+    """
+    return (
+        db.query(models.Event)
+        .filter(
+            models.Event.hotel_id == hotel_id,
+            models.Event.room_id == room_id,
+            models.Event.night_of_stay == night_of_stay,
+            models.Event.rpg_status == schemas.RPGStatus.BOOKING,
+        )
+        .first()
+    )
+
+
+def get_events_by_room_ids(
+    db: Session, room_ids: set[str], shard: int | None = None
+) -> dict[str, list[models.Event]]:
+    """
+    Retrieve the events for a set of room IDs with as few queries as possible.
+
+    Parameters:
+    - db (Session): The database session.
+    - room_ids (set[str]): The room IDs to look up.
+    - shard (int | None): The shard to look up the events in, by default all shards.
+
+    Returns:
+    - dict[str, list[Event]]: The matched events of every night and hotel keyed by their room ID.
+    """
+    room_id_list = list(room_ids)
+    query = db.query(models.Event)
+    if shard is not None:
+        query = query.options(set_shard_id(shard))
+    matched_events: dict[str, list[models.Event]] = {}
+    for i in range(0, len(room_id_list), IN_CLAUSE_CHUNK_SIZE):
+        chunk = room_id_list[i : i + IN_CLAUSE_CHUNK_SIZE]
+        for db_event in query.filter(models.Event.room_id.in_(chunk)):
+            matched_events.setdefault(db_event.room_id, []).append(db_event)
+    return matched_events
+
+
+def insert_events(db: Session, new_events: list[models.Event]) -> None:
+    """
+    Insert new events with two INSERT statements per shard and set their IDs and seqs.
+
+    The SQL default of `Event.seq` makes the ORM insert the events one by one. Instead the first event of a
+    shard is inserted alone and its seq is drawn by the SQL default, while the INSERT holds the write lock of
+    the shard. The lock is kept until the commit, so the following seqs are assigned in Python and the
+    remaining events are inserted with one executemany. Their IDs are read back by seq with one query.
+    The events are not added to the session.
+
+    Parameters:
+    - db (Session): The database session.
+    - new_events (list[Event]): The new events in insertion order.
+    """
+    columns = ("hotel_id", "timestamp", "rpg_status", "room_id", "night_of_stay")
+    events_by_shard: dict[int, list[models.Event]] = {}
+    for db_event in new_events:
+        events_by_shard.setdefault(get_shard(db_event.hotel_id), []).append(db_event)
+    for shard, (first_event, *other_events) in events_by_shard.items():
+        first_event.id, first_event.seq = db.execute(
+            sqlalchemy.insert(models.Event.__table__).returning(models.Event.id, models.Event.seq),
+            [{column: getattr(first_event, column) for column in columns}],
+            bind_arguments={"shard_id": shard},
+        ).one()
+        if not other_events:
+            continue
+        for offset, db_event in enumerate(other_events, 1):
+            db_event.seq = first_event.seq + offset
+        db.execute(
+            sqlalchemy.insert(models.Event.__table__),
+            [{column: getattr(db_event, column) for column in (*columns, "seq")} for db_event in other_events],
+            bind_arguments={"shard_id": shard},
+        )
+        ids_by_seq = dict(
+            db.execute(
+                sqlalchemy.select(models.Event.seq, models.Event.id).where(
+                    models.Event.seq.between(other_events[0].seq, other_events[-1].seq)
+                ),
+                bind_arguments={"shard_id": shard},
+            ).all()
+        )
+        for db_event in other_events:
+            db_event.id = ids_by_seq[db_event.seq]
+
+
+def stage_events_batch(
+    db: Session, events: list[schemas.CreateEvent], shard: int | None = None
+) -> list[tuple[str, BatchEventStatus, models.Event | None]]:
+    """
+    Write a batch of bookings and cancellations and their changes to the session without committing.
+
+    The existing events of all submitted rooms are loaded with one query, the items are then resolved in
+    submission order against that state (so a booking followed by its cancellation within the same batch works)
+    and finally all cancellations are applied with one statement and all new bookings are inserted with two,
+    see `insert_events`.
+    The outcome of each item follows the semantics of the single event endpoint:
+    a booking of a room already booked for the night is a duplicate, a cancellation of an unknown booking
+    is not found and a cancellation of an already cancelled booking is a duplicate.
+
+    Parameters:
+    - db (Session): The database session.
+    - events (list[CreateEvent]): The events to be applied in submission order.
+    - shard (int | None): The shard of the hotels of all events, by default the events are looked up on all shards.
+
+    Raises:
+    - IntegrityError: If a new booking collides with a concurrently created booking.
+
+    Returns:
+    - list[tuple[str, BatchEventStatus, Event | None]]: The room ID, outcome and created or cancelled event
+      of each submitted event in submission order, for a duplicate the conflicting event.
+    """
+    known_events = get_events_by_room_ids(db, {event.room_id for event in events}, shard=shard)
+    # status of the known events including the changes of this batch
+    event_status = {
+        db_event: db_event.rpg_status for room_events in known_events.values() for db_event in room_events
+    }
+
+    new_events: list[models.Event] = []
+    cancelled_ids: dict[int | None, set[int]] = {}
+    outcomes: list[tuple[str, BatchEventStatus, models.Event | None]] = []
+    for event in events:
+        room_events = known_events.setdefault(event.room_id, [])
+        matched_events = [
+            db_event
+            for db_event in room_events
+            if db_event.night_of_stay == event.night_of_stay and db_event.hotel_id == event.hotel_id
+        ]
+        booking = next(
+            (
+                db_event
+                for db_event in matched_events
+                if event_status[db_event] == schemas.RPGStatus.BOOKING
+            ),
+            None,
+        )
+        if event.rpg_status == schemas.RPGStatus.CANCELLATION:
+            if booking is None:
+                if matched_events:
+                    outcomes.append((event.room_id, BatchEventStatus.DUPLICATE, matched_events[-1]))
+                else:
+                    outcomes.append((event.room_id, BatchEventStatus.NOT_FOUND, None))
+                continue
+            event_status[booking] = schemas.RPGStatus.CANCELLATION
+            if booking.id is None:
+                # booked and cancelled within this batch
+                booking.rpg_status = schemas.RPGStatus.CANCELLATION
+            else:
+                cancelled_ids.setdefault(get_shard_id(booking), set()).add(booking.id)
+            outcomes.append((event.room_id, BatchEventStatus.CANCELLED, booking))
+            continue
+        if booking is not None:
+            outcomes.append((event.room_id, BatchEventStatus.DUPLICATE, booking))
+            continue
+        db_event = models.Event(**event.model_dump())
+        new_events.append(db_event)
+        room_events.append(db_event)
+        event_status[db_event] = event.rpg_status
+        outcomes.append((event.room_id, BatchEventStatus.CREATED, db_event))
+
+    # the cancellations first, a room night cancelled by the batch can be booked again within it
+    # the IDs are counted per shard, so the statements are sent to the shard of the events
+    for shard, shard_cancelled_ids in cancelled_ids.items():
+        cancelled_id_list = list(shard_cancelled_ids)
+        for i in range(0, len(cancelled_id_list), IN_CLAUSE_CHUNK_SIZE):
+            db.execute(
+                sqlalchemy.update(models.Event)
+                .where(models.Event.id.in_(cancelled_id_list[i : i + IN_CLAUSE_CHUNK_SIZE]))
+                .values(rpg_status=schemas.RPGStatus.CANCELLATION),
+                execution_options={"synchronize_session": False},
+                bind_arguments={"shard_id": shard},
+            )
+    insert_events(db, new_events)
+    # one change per applied item, in submission order
+    changes: dict[int | None, list[dict]] = {}
+    for _, status, db_event in outcomes:
+        if status in (BatchEventStatus.CREATED, BatchEventStatus.CANCELLED):
+            shard = get_shard_id(db_event)
+            if shard is None:
+                # the new events are not added to the session, they are written to the shard of their hotel
+                shard = get_shard(db_event.hotel_id)
+            changes.setdefault(shard, []).append(change_values(db_event, status))
+    for shard, shard_changes in changes.items():
+        # a Core insert, the ORM bulk insert does not support sharded sessions
+        db.execute(
+            sqlalchemy.insert(models.Change.__table__),
+            shard_changes,
+            bind_arguments={"shard_id": shard},
+        )
+    return outcomes
+
+
+def apply_events_batch(
+    db: Session, events: list[schemas.CreateEvent]
+) -> list[schemas.BatchEventResult]:
+    """
+    Apply a batch of bookings and cancellations, see `stage_events_batch`.
+
+    The events are grouped by the shard of their hotel and every shard commits its part of the batch in its own
+    transaction, one shard after the other in shard order. A session never holds the write lock of one shard
+    while waiting for the lock of another, so concurrent batches spanning several shards can't deadlock.
+    If a part collides with a concurrently created booking, it is rolled back and staged once more against the
+    committed state, which reports the colliding booking as duplicate.
+
+    Parameters:
+    - db (Session): The database session.
+    - events (list[CreateEvent]): The events to be applied in submission order.
+
+    Raises:
+    - DuplicateError: If a part of the batch collided again, the parts of the shards before are committed.
+
+    Returns:
+    - list[BatchEventResult]: The outcome of each submitted event in submission order.
+    """
+    # the positions of the events of each shard in the batch
+    positions: dict[int, list[int]] = {}
+    for position, event in enumerate(events):
+        positions.setdefault(get_shard(event.hotel_id), []).append(position)
+
+    results: list[schemas.BatchEventResult | None] = [None] * len(events)
+    for shard, shard_positions in sorted(positions.items()):
+        shard_events = [events[position] for position in shard_positions]
+        for attempt in range(2):
+            try:
+                outcomes = stage_events_batch(db, shard_events, shard=shard)
+                # collect the ids before the commit expires the instances
+                shard_results = [
+                    schemas.BatchEventResult(
+                        room_id=room_id, status=status, id=db_event.id if db_event else None
+                    )
+                    for room_id, status, db_event in outcomes
+                ]
+                db.commit()
+                break
+            except sqlalchemy.exc.IntegrityError as e:
+                print(f"Error applying event batch: {e}")
+                db.rollback()
+                if attempt:
+                    raise DuplicateError("Duplicate data")
+        for position, result in zip(shard_positions, shard_results):
+            results[position] = result
+    return results
@@ -1,16 +1,129 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import BindParameter, BinaryExpression, BooleanClauseList, create_engine, event
+from sqlalchemy.sql import operators
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import ORMExecuteState, Mapper, declarative_base, sessionmaker
+from src import config
 
-# use local sqlite db 
+# use local sqlite db, shard 0 keeps the database of an unsharded setup
 SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"
+SHARD_DATABASE_URL = "sqlite:///./sql_app_shard{shard}.db"
+# the IDs of the events of a shard start after shard * SHARD_ID_RANGE, so they are unique across the shards
+SHARD_ID_RANGE = 2**40
 
-# setup engine
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
 
-# create session class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def get_shard(hotel_id: int, shard_count: int | None = None) -> int:
+    """
+    Get the shard which stores the events of a hotel.
+
+    Args:
+        hotel_id (int): The ID of the hotel.
+        shard_count (int | None, optional): The number of shards. Defaults to config.SHARD_COUNT.
+
+    Returns:
+        int: The index of the shard.
+    """
+    return hotel_id % (shard_count or config.SHARD_COUNT)
+
+
+def create_shard_engine(shard: int, read_only: bool = False) -> Engine:
+    """
+    Create the engine of the database of a shard.
+    The connections use the journal mode and synchronous setting of the config,
+    the connections of a read-only engine reject all writes.
+
+    Args:
+        shard (int): The index of the shard.
+        read_only (bool, optional): Create an engine for read-only connections. Defaults to False.
+
+    Returns:
+        Engine: The engine of the shard.
+    """
+    url = SQLALCHEMY_DATABASE_URL if shard == 0 else SHARD_DATABASE_URL.format(shard=shard)
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+        else:
+            cursor.execute(f"PRAGMA journal_mode = {config.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {config.SQLITE_SYNCHRONOUS}")
+        cursor.close()
+
+    return engine
+
+
+def choose_shard(mapper: Mapper, instance: object | None, **kw) -> int:
+    """
+    Choose the shard an instance is written to by its hotel, statements without one run on shard 0.
+    """
+    hotel_id = getattr(instance, "hotel_id", None)
+    return 0 if hotel_id is None else get_shard(hotel_id)
+
+
+def choose_identity_shards(mapper: Mapper, primary_key, *, lazy_loaded_from=None, **kw) -> list[int]:
+    """
+    Choose the shards to look up a primary key in, the shard of the parent of a lazy load or all shards.
+    """
+    if lazy_loaded_from is not None:
+        return [lazy_loaded_from.identity_token]
+    return list(range(config.SHARD_COUNT))
+
+
+def choose_query_shards(orm_context: ORMExecuteState) -> list[int]:
+    """
+    Choose the shards a statement runs on, the shard of the hotel if it filters by `hotel_id == <value>`,
+    otherwise all shards.
+    """
+    whereclause = getattr(orm_context.statement, "whereclause", None)
+    criteria = []
+    if isinstance(whereclause, BooleanClauseList) and whereclause.operator is operators.and_:
+        criteria = whereclause.clauses
+    elif whereclause is not None:
+        criteria = [whereclause]
+    for criterion in criteria:
+        if (
+            isinstance(criterion, BinaryExpression)
+            and criterion.operator is operators.eq
+            and getattr(criterion.left, "key", None) == "hotel_id"
+            and isinstance(criterion.right, BindParameter)
+        ):
+            return [get_shard(criterion.right.effective_value)]
+    return list(range(config.SHARD_COUNT))
+
+
+# setup one engine per shard, and one for the read-only connections of the read requests
+engines = {shard: create_shard_engine(shard) for shard in range(config.SHARD_COUNT)}
+read_engines = {shard: create_shard_engine(shard, read_only=True) for shard in range(config.SHARD_COUNT)}
+engine = engines[0]
+
+
+def create_session_factory(shards: dict[int, Engine]) -> sessionmaker:
+    """
+    Create a session class routing the statements to the given shards.
+
+    Args:
+        shards (dict[int, Engine]): The engines by shard.
+
+    Returns:
+        sessionmaker: The session class.
+    """
+    return sessionmaker(
+        class_=ShardedSession,
+        autocommit=False,
+        autoflush=False,
+        shards=shards,
+        shard_chooser=choose_shard,
+        identity_chooser=choose_identity_shards,
+        execute_chooser=choose_query_shards,
+    )
+
+
+# create session classes
+SessionLocal = create_session_factory(engines)
+ReadSessionLocal = create_session_factory(read_engines)
 
 # create base class
 Base = declarative_base()
@@ -21,4 +134,12 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Handle for dependency injection of read-only database session
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
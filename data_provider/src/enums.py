@@ -1,4 +1,4 @@
-from enum import IntEnum
+from enum import Enum, IntEnum
 
 
 class RPGStatus(IntEnum):
@@ -11,4 +11,21 @@ class RPGStatus(IntEnum):
     """
 
     BOOKING = 1
-    CANCELLATION = 2
\ No newline at end of file
+    CANCELLATION = 2
+
+
+class BatchEventStatus(str, Enum):
+    """
+    Enum representing the outcome of a single item of a batch ingest.
+
+    Attributes:
+        CREATED (str): The booking was created.
+        CANCELLED (str): The booking was cancelled.
+        DUPLICATE (str): The event already exists and was not applied.
+        NOT_FOUND (str): The cancellation refers to an unknown booking.
+    """
+
+    CREATED = "created"
+    CANCELLED = "cancelled"
+    DUPLICATE = "duplicate"
+    NOT_FOUND = "not_found"
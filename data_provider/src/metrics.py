@@ -0,0 +1,120 @@
+import time
+from typing import Iterator
+from prometheus_client import Counter, Histogram
+from prometheus_client.core import REGISTRY, GaugeMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from src import models
+from src.enums import BatchEventStatus
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time until a request was answered, by route template and status.",
+    ["method", "route", "status"],
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Time of the database statements, by statement type.",
+    ["statement"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+EVENTS_INGESTED = Counter(
+    "events_ingested_total",
+    "Submitted bookings and cancellations, by outcome.",
+    ["outcome"],
+)
+
+
+class MetricsMiddleware:
+    """
+    Records the duration of every request in REQUEST_DURATION.
+
+    A plain ASGI middleware, which only wraps `send`, so the response is not buffered and the overhead
+    is a clock read and a histogram update per request. The route template is used as label, so the number of
+    series doesn't grow with the path parameters.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # the router stores the matched route in the scope
+            route = scope.get("route")
+            REQUEST_DURATION.labels(
+                scope["method"], route.path if route else "unmatched", status
+            ).observe(time.perf_counter() - started)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def observe_query_duration(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info["query_started"].pop()
+    # the first keyword, e.g. SELECT or INSERT
+    DB_QUERY_DURATION.labels(statement[:16].split(None, 1)[0].upper()).observe(time.perf_counter() - started)
+
+
+@event.listens_for(Engine, "handle_error")
+def discard_query_timer(context) -> None:
+    if context.connection is not None and context.connection.info.get("query_started"):
+        context.connection.info["query_started"].pop()
+
+
+def count_ingested(outcome: BatchEventStatus, count: int = 1) -> None:
+    """
+    Count submitted events by their outcome.
+    """
+    if count:
+        EVENTS_INGESTED.labels(outcome.value).inc(count)
+
+
+class TableRowCollector(Collector):
+    """
+    Reports the number of rows of the tables of every shard, counted when the metrics are scraped.
+
+    Args:
+        engines (dict[int, Engine]): The engines of the shards.
+    """
+
+    def __init__(self, engines: dict[int, Engine]) -> None:
+        self.engines = engines
+
+    def describe(self) -> Iterator[GaugeMetricFamily]:
+        # registering the collector doesn't count the rows
+        yield self.create_family()
+
+    def create_family(self) -> GaugeMetricFamily:
+        return GaugeMetricFamily("table_rows", "Number of rows of a table.", labels=["table", "shard"])
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        rows = self.create_family()
+        for shard, engine in self.engines.items():
+            with engine.connect() as conn:
+                for table in (models.Event.__table__, models.Change.__table__):
+                    count = conn.execute(select(func.count()).select_from(table)).scalar()
+                    rows.add_metric([table.name, str(shard)], count)
+        yield rows
+
+
+def register_table_rows(engines: dict[int, Engine]) -> None:
+    REGISTRY.register(TableRowCollector(engines))
@@ -0,0 +1,76 @@
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from src import crud, models
+from src.database import Base
+from src.enums import RPGStatus
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the harness shared with the microbenchmarks of the other service
+sys.path.insert(0, os.path.join(os.path.dirname(SERVICE_DIR), "benchmark"))
+from microbenchmark import Case, main, time_case  # noqa: E402
+
+# the stored timings of the previous run the timings are compared to
+BASELINE_PATH = os.path.join(SERVICE_DIR, "microbenchmark_baseline.json")
+
+YEAR = 2024
+HOTELS = 10
+
+
+def generate_events(size: int) -> list[dict]:
+    """
+    Generate the column values of `size` bookings of the year, spread evenly over HOTELS hotels.
+    """
+    rng = random.Random(size)
+    return [
+        {
+            "hotel_id": i % HOTELS,
+            "timestamp": datetime(YEAR - 1, 1, 1) + timedelta(seconds=i),
+            "rpg_status": RPGStatus.BOOKING,
+            "room_id": str(i),
+            "night_of_stay": date(YEAR, 1, 1) + timedelta(days=rng.randrange(366)),
+            "seq": i + 1,
+        }
+        for i in range(size)
+    ]
+
+
+def create_db(events: list[dict]) -> Session:
+    """
+    Create an in-memory database holding the given events.
+    """
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    db.execute(insert(models.Event), events)
+    db.commit()
+    return db
+
+
+CASES = [
+    Case(
+        "crud.get_events",
+        lambda size: create_db(generate_events(size)),
+        lambda db: crud.get_events(
+            db, hotel_id=1, night_of_stay__gte=date(YEAR, 1, 1), night_of_stay__lte=date(YEAR, 12, 31)
+        ),
+    ),
+    Case(
+        # a page from the middle of the table, as read by a backfill
+        "crud.get_events.page",
+        lambda size: (create_db(generate_events(size)), size // 2),
+        lambda state: crud.get_events(state[0], after_seq=state[1], limit=1000),
+    ),
+]
+
+
+if __name__ == "__main__":
+    main(
+        CASES,
+        BASELINE_PATH,
+        "Time the hot paths of the data_provider and compare the timings to the stored baseline.",
+    )
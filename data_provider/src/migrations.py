@@ -0,0 +1,93 @@
+from sqlalchemy import Connection, inspect, text
+from sqlalchemy.engine import Engine
+from src import models
+from src.database import SHARD_ID_RANGE
+
+
+def add_event_seq(conn: Connection) -> None:
+    """
+    Add the seq column to an events table created before the ingestion sequence existed.
+    The existing events are numbered by their ID, which is their insertion order.
+    """
+    if "seq" in {column["name"] for column in inspect(conn).get_columns("events")}:
+        return
+    conn.execute(text("ALTER TABLE events ADD COLUMN seq INTEGER"))
+    conn.execute(text("UPDATE events SET seq = id"))
+
+
+def rebuild_events_table(conn: Connection) -> None:
+    """
+    Rebuild an events table created with a unique constraint on the room ID, which rejected a second booking of a
+    room for another night, or without AUTOINCREMENT, which the ID ranges of the shards rely on. SQLite can't change
+    the constraints of a table, so the events are copied into a new table with the schema of the model.
+    """
+    table_sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'events'")).scalar()
+    if not inspect(conn).get_unique_constraints("events") and "AUTOINCREMENT" in table_sql:
+        return
+    # keeps the foreign key of the change log pointing to "events" while the old table is renamed
+    conn.exec_driver_sql("PRAGMA legacy_alter_table = ON")
+    try:
+        conn.execute(text("ALTER TABLE events RENAME TO events_old"))
+        # the indexes keep their names on the renamed table and would clash with the new ones
+        for index in inspect(conn).get_indexes("events_old"):
+            conn.execute(text(f"DROP INDEX {index['name']}"))
+        models.Event.__table__.create(bind=conn)
+        columns = ", ".join(column.name for column in models.Event.__table__.columns)
+        conn.execute(text(f"INSERT INTO events ({columns}) SELECT {columns} FROM events_old"))
+        conn.execute(text("DROP TABLE events_old"))
+    finally:
+        conn.exec_driver_sql("PRAGMA legacy_alter_table = OFF")
+
+
+def reserve_shard_ids(conn: Connection, shard: int) -> None:
+    """
+    Let the IDs of the events of a shard start after shard * SHARD_ID_RANGE, so they are unique across the shards.
+    The events a shard stored before are moved into its range together with the changes referring to them.
+    """
+    if shard == 0:
+        return
+    id_offset = shard * SHARD_ID_RANGE
+    conn.execute(
+        text("UPDATE changes SET event_id = event_id + :id_offset WHERE event_id <= :id_offset"),
+        {"id_offset": id_offset},
+    )
+    conn.execute(text("UPDATE events SET id = id + :id_offset WHERE id <= :id_offset"), {"id_offset": id_offset})
+    # AUTOINCREMENT continues from the larger of the highest ID and the sqlite_sequence entry
+    conn.execute(
+        text("UPDATE sqlite_sequence SET seq = :id_offset WHERE name = 'events' AND seq < :id_offset"),
+        {"id_offset": id_offset},
+    )
+    conn.execute(
+        text(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT 'events', :id_offset "
+            "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'events')"
+        ),
+        {"id_offset": id_offset},
+    )
+
+
+def create_missing_indexes(conn: Connection) -> None:
+    """
+    Create the indexes of the events added after the table was created, `create_all` skips existing tables.
+    """
+    for index in models.Event.__table__.indexes:
+        index.create(bind=conn, checkfirst=True)
+
+
+def upgrade_schema(engine: Engine, shard: int = 0) -> None:
+    """
+    Create the tables of a database and upgrade the tables created by an earlier version in place.
+    Every step checks the current schema first, so the upgrade runs on every start.
+
+    Args:
+        engine (Engine): The engine of the database of a shard.
+        shard (int, optional): The index of the shard. Defaults to 0.
+    """
+    with engine.begin() as conn:
+        existing_tables = set(inspect(conn).get_table_names())
+        models.Base.metadata.create_all(bind=conn)
+        if "events" in existing_tables:
+            add_event_seq(conn)
+            rebuild_events_table(conn)
+            create_missing_indexes(conn)
+        reserve_shard_ids(conn, shard)
@@ -1,4 +1,6 @@
-from sqlalchemy import  Column, Date, DateTime, Enum, Integer, String
+from datetime import datetime, timezone
+from sqlalchemy import  Column, Date, DateTime, Enum, ForeignKey, Index, Integer, String, text
+from sqlalchemy.orm import relationship
 
 from src.enums import RPGStatus
 from .database import Base
@@ -9,18 +11,70 @@ class Event(Base):
     Represents an event in the system.
 
     Attributes:
-        id (int): The unique identifier of the event.
+        id (int): The unique identifier of the event, unique across the shards (see SHARD_ID_RANGE).
         hotel_id (int): The ID of the hotel associated with the event.
         timestamp (datetime): The timestamp of the event.
         rpg_status (int): The RPG status of the event.
         room_id (int): The ID of the room associated with the event.
         night_of_stay (date): The date of the night of stay for the event.
+        seq (int): The server assigned ingestion sequence number of the event, strictly increasing in insertion order.
     """
     __tablename__ = "events"
+    __table_args__ = (
+        # a room can only be booked once per night, the cancelled bookings are not part of the index
+        # so the room can be booked again for the night
+        Index(
+            "ux_events_booked_room_night",
+            "hotel_id",
+            "room_id",
+            "night_of_stay",
+            unique=True,
+            sqlite_where=text("rpg_status = 'BOOKING'"),
+        ),
+        # the IDs of a shard continue from the start of its ID range in sqlite_sequence
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True)
     hotel_id = Column(Integer, index=True)
+    timestamp = Column(DateTime(timezone=True), index=True)
+    rpg_status = Column(Enum(RPGStatus))
+    room_id = Column(String, index=True)
+    night_of_stay = Column(Date)
+    # evaluated inside the INSERT statement, which already holds SQLite's write lock,
+    # so concurrent writers can't draw the same number
+    seq = Column(
+        Integer,
+        unique=True,
+        index=True,
+        default=text("(SELECT COALESCE(MAX(seq), 0) + 1 FROM events)"),
+    )
+
+
+class Change(Base):
+    """
+    Represents an entry of the append-only change log, written for every created and cancelled booking.
+
+    Attributes:
+        seq (int): The sequence number of the change, strictly increasing and never reused.
+        event_id (int): The ID of the changed event.
+        hotel_id (int): The ID of the hotel associated with the event.
+        timestamp (datetime): The timestamp of the event.
+        rpg_status (int): The RPG status of the event after the change.
+        room_id (int): The ID of the room associated with the event.
+        night_of_stay (date): The date of the night of stay for the event.
+        recorded_at (datetime): The time the change was written.
+    """
+    __tablename__ = "changes"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = Column(Integer, primary_key=True)
+    event_id = Column(Integer, ForeignKey("events.id"))
+    hotel_id = Column(Integer)
     timestamp = Column(DateTime(timezone=True))
     rpg_status = Column(Enum(RPGStatus))
-    room_id = Column(String, unique=True)
+    room_id = Column(String)
     night_of_stay = Column(Date)
+    recorded_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    event = relationship(Event)
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+
+
+class ChangeNotifier:
+    """
+    Wakes up long-poll requests waiting for new changes once a write has been committed in this process.
+    The writes are committed on threads, the long-poll requests wait on the event loop without holding a thread.
+
+    Attributes:
+        version (int): A counter increased on every notification.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self.version = 0
+
+    def notify(self) -> None:
+        """
+        Signal all waiting requests that new changes have been committed.
+        """
+        with self._lock:
+            self.version += 1
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    async def wait(self, version: int, timeout: float) -> bool:
+        """
+        Wait until a notification newer than the given version arrives or the timeout expires.
+
+        Args:
+            version (int): The version observed before checking for changes.
+            timeout (float): The maximum time to wait in seconds.
+
+        Returns:
+            bool: True if a notification arrived, False if the timeout expired.
+        """
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            if self.version != version:
+                return True
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+# notifier shared by the write endpoints and the long-poll requests
+change_notifier = ChangeNotifier()
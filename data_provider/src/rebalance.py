@@ -0,0 +1,123 @@
+import argparse
+from sqlalchemy.orm import Session
+from src import config, crud, models
+from src.database import create_shard_engine, get_shard
+from src.migrations import upgrade_schema
+
+# number of events moved per transaction
+REBALANCE_BATCH_SIZE = 1000
+
+
+def copy_key(db_event: models.Event) -> tuple:
+    """
+    Identify an event across shards, the ID and seq of a copied event differ from the original.
+    """
+    return (
+        db_event.hotel_id,
+        db_event.room_id,
+        db_event.night_of_stay,
+        db_event.timestamp,
+        db_event.rpg_status,
+    )
+
+
+def rebalance(sessions: dict[int, Session], shard_count: int) -> int:
+    """
+    Move the events stored in a shard other than the one of their hotel to the shard of their hotel.
+
+    The events are copied in batches, each batch is committed to the target shard before it is deleted from the
+    source shard, so an interrupted run can be repeated. A copied event gets a new ID and seq in the target shard.
+    No change is appended for it: the changes in the source shard are kept, the change logs are append-only,
+    and a consumer which has read them knows the event already. Another change in the target shard would make
+    it apply the booking twice. Later changes of the event are appended to the change log of the target shard.
+
+    Args:
+        sessions (dict[int, Session]): The sessions of all shards holding events, including shards to be emptied.
+        shard_count (int): The number of shards to distribute the events over.
+
+    Returns:
+        int: The number of moved events.
+    """
+    moved = 0
+    for source_shard, source_db in sessions.items():
+        while True:
+            misplaced = source_db.query(models.Event).filter(
+                models.Event.hotel_id % shard_count != source_shard
+            )
+            db_events = misplaced.order_by(models.Event.id).limit(REBALANCE_BATCH_SIZE).all()
+            if not db_events:
+                break
+            for target_shard in {get_shard(db_event.hotel_id, shard_count) for db_event in db_events}:
+                target_db = sessions[target_shard]
+                shard_events = [
+                    db_event
+                    for db_event in db_events
+                    if get_shard(db_event.hotel_id, shard_count) == target_shard
+                ]
+                # skip the events copied by an interrupted run
+                known_events = crud.get_events_by_room_ids(
+                    target_db, {db_event.room_id for db_event in shard_events}
+                )
+                copied_keys = {
+                    copy_key(known_event)
+                    for room_events in known_events.values()
+                    for known_event in room_events
+                }
+                for db_event in shard_events:
+                    if copy_key(db_event) in copied_keys:
+                        continue
+                    copied_event = models.Event(
+                        hotel_id=db_event.hotel_id,
+                        timestamp=db_event.timestamp,
+                        rpg_status=db_event.rpg_status,
+                        room_id=db_event.room_id,
+                        night_of_stay=db_event.night_of_stay,
+                    )
+                    target_db.add(copied_event)
+                target_db.commit()
+            for db_event in db_events:
+                source_db.delete(db_event)
+            source_db.commit()
+            moved += len(db_events)
+            print(f"Moved {moved} events ...")
+    return moved
+
+
+def main() -> None:
+    """
+    Move the events to the shards of their hotels after SHARD_COUNT was changed.
+    The data_provider has to be stopped while the events are moved.
+
+    The moved events are not logged again, so the dashboard_service has to apply the change logs of all shards
+    up to their head before the data_provider is stopped: wait until `GET /sync` of the dashboard_service
+    reports `last_seq == head_seq` for every shard. Otherwise the changes of shards which are no longer used
+    are never read. A dashboard_service which missed the change logs has to be reset, delete its database so
+    the events are backfilled from the shards (not possible with STORE_RAW_EVENTS=false).
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument(
+        "--previous-shard-count",
+        type=int,
+        default=config.SHARD_COUNT,
+        help="the number of shards before SHARD_COUNT was changed, to empty shards which are no longer used",
+    )
+    args = parser.parse_args()
+
+    engines = {
+        shard: create_shard_engine(shard)
+        for shard in range(max(config.SHARD_COUNT, args.previous_shard_count))
+    }
+    sessions = {}
+    for shard, engine in engines.items():
+        upgrade_schema(engine, shard)
+        sessions[shard] = Session(bind=engine)
+    try:
+        moved = rebalance(sessions, config.SHARD_COUNT)
+    finally:
+        for db in sessions.values():
+            db.close()
+    print(f"Moved {moved} events to {config.SHARD_COUNT} shards")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,87 @@
+import time
+from collections import Counter
 from datetime import date, datetime
-from fastapi import Depends, FastAPI, HTTPException
+from typing import Iterable, Iterator
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from sqlalchemy.orm import Session
-from src import crud, models, schemas
-from src.database import SessionLocal, engine, get_db
+from src import config, crud, models, schemas
+from src.columnar import MSGPACK_MEDIA_TYPE, encode_events
+from src.database import engines, get_db, get_read_db, get_shard, read_engines
+from src.enums import BatchEventStatus
+from src.metrics import MetricsMiddleware, count_ingested, register_table_rows
+from src.migrations import upgrade_schema
+from src.notifier import change_notifier
+from src.writer import event_writer
 
-models.Base.metadata.create_all(bind=engine)
+for shard, engine in engines.items():
+    upgrade_schema(engine, shard)
 
 app = FastAPI()
 
+# responses larger than this number of bytes are gzip compressed if the client accepts it
+GZIP_MINIMUM_SIZE = 1000
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+app.add_middleware(MetricsMiddleware)
+register_table_rows(read_engines)
+
+# maximum page size of the keyset pagination on GET /events
+MAX_PAGE_SIZE = 10000
+
+# maximum time a long-poll request on GET /changes is held open
+MAX_WAIT_SECONDS = 60
+# interval for re-checking the database during a long-poll, catches writes of other processes
+WAIT_RECHECK_SECONDS = 0.5
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# number of rows fetched from the cursor and written to the stream at once
+STREAM_BATCH_SIZE = 1000
+
+
+def stream_events_ndjson(db: Session, events: Iterable[models.Event]) -> Iterator[str]:
+    """
+    Stream events as newline delimited JSON while they are read from the database cursor.
+
+    Args:
+        db (Session): The database session of the events, closed once the stream is exhausted.
+        events (Iterable[models.Event]): The events, read from the database while they are iterated.
+
+    Yields:
+        str: Chunks of up to STREAM_BATCH_SIZE JSON encoded events, one per line.
+    """
+    try:
+        lines = []
+        for event in events:
+            lines.append(schemas.ReadEvent.model_validate(event).model_dump_json())
+            if len(lines) == STREAM_BATCH_SIZE:
+                yield "\n".join(lines) + "\n"
+                lines = []
+        if lines:
+            yield "\n".join(lines) + "\n"
+    finally:
+        # the session outlives the request dependency while the response is streamed
+        db.close()
+
+
+def validate_shard(shard: int | None) -> None:
+    """
+    Validate the shard parameter of a request against the configured number of shards.
+
+    Args:
+        shard (int | None): The requested shard.
+
+    Raises:
+        HTTPException: If the shard does not exist.
+    """
+    if shard is not None and shard >= config.SHARD_COUNT:
+        raise HTTPException(
+            status_code=422, detail=f"shard must be lower than the number of shards ({config.SHARD_COUNT})"
+        )
+
 
 @app.get(
     "/events",
@@ -22,10 +96,23 @@ def read_events(
     room_id: str | None = None,
     night_of_stay__gte: date | None = None,
     night_of_stay__lte: date | None = None,
-    db: Session = Depends(get_db),  # dependency injection
+    after_seq: int | None = None,
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    shard: int | None = Query(default=None, ge=0),
+    accept: str | None = Header(default=None),
+    response: Response = None,
+    db: Session = Depends(get_read_db),  # dependency injection
 ):
     """
     Retrieve events based on the provided filters.
+    If after_seq or limit is given, the events are returned as a page sorted by their ingestion sequence.
+    If the page is full, the `X-Next-Cursor` header contains the after_seq value of the next page.
+    The sequence is counted per shard, so with more than one shard a page has to be requested from a shard or for
+    a hotel. Without a shard the events of the hotel's shard, or without a hotel the merged events of all shards are returned.
+    If the `Accept` header asks for `application/x-ndjson`, the events are streamed as one JSON object per line
+    while they are read from the database instead of being collected into a JSON array first.
+    If it asks for `application/x-msgpack`, the events are returned as a MessagePack encoded batch of columns.
+    Responses are gzip compressed if the `Accept-Encoding` header allows it.
 
     Args:
         hotel_id (int): The ID of the hotel.
@@ -35,12 +122,22 @@ def read_events(
         room_id (int | None, optional): The ID of the room. Defaults to None.
         night_of_stay__gte (date | None, optional): The minimum night of stay date. Defaults to None.
         night_of_stay__lte (date | None, optional): The maximum night of stay date. Defaults to None.
+        after_seq (int | None, optional): The cursor of the page, i.e. the seq of the last event already read. Defaults to None.
+        limit (int | None, optional): The page size. Defaults to None.
+        shard (int | None, optional): The shard to read the events from. Defaults to None.
+        accept (str | None, optional): The accepted media types of the response. Defaults to None.
 
     Returns:
         List[schemas.Event]: The list of events matching the provided filters.
     """
+    validate_shard(shard)
+    if shard is None and hotel_id is not None:
+        # the events of a hotel are stored in its shard
+        shard = get_shard(hotel_id)
+    if shard is None and config.SHARD_COUNT > 1 and (after_seq is not None or limit is not None):
+        raise HTTPException(status_code=422, detail="shard is required to read a page of events")
 
-    events = crud.get_events(
+    query = crud.query_events(
         db,
         hotel_id=hotel_id,
         updated__gte=updated__gte,
@@ -49,9 +146,73 @@ def read_events(
         room_id=room_id,
         night_of_stay__gte=night_of_stay__gte,
         night_of_stay__lte=night_of_stay__lte,
+        after_seq=after_seq,
+        limit=limit,
+        shard=shard,
     )
 
-    return events
+    if accept and NDJSON_MEDIA_TYPE in accept:
+        events = crud.iter_events(query, shard=shard, batch_size=STREAM_BATCH_SIZE)
+        return StreamingResponse(stream_events_ndjson(db, events), media_type=NDJSON_MEDIA_TYPE)
+
+    events = list(crud.iter_events(query, shard=shard))
+    columnar = bool(accept and MSGPACK_MEDIA_TYPE in accept)
+    if columnar:
+        response = Response(content=encode_events(events), media_type=MSGPACK_MEDIA_TYPE)
+    if limit is not None and len(events) == limit:
+        response.headers["X-Next-Cursor"] = str(events[-1].seq)
+
+    return response if columnar else events
+
+
+@app.get(
+    "/changes",
+    response_model=schemas.ChangePage,
+    summary="Retrieve the change log after a sequence number",
+)
+async def read_changes(
+    since: int = Query(default=0, ge=0),
+    limit: int = Query(default=1000, ge=1, le=MAX_PAGE_SIZE),
+    wait: float = Query(default=0, ge=0, le=MAX_WAIT_SECONDS),
+    shard: int = Query(default=0, ge=0),
+    db: Session = Depends(get_read_db),  # dependency injection
+):
+    """
+    Retrieve the created and cancelled bookings from the append-only change log.
+    Every change has its own sequence number, so a consumer stays in sync by passing the last_seq
+    of the previous page as since, reading only the changes it has not seen yet.
+    Every shard has its own change log, a consumer follows each of them, their number is returned as shard_count.
+    With wait the request is held open (long-poll) until new changes are committed or the wait time expired,
+    so a consumer receives changes as soon as they are written without polling in a fixed interval.
+    The queries run in the threadpool, while waiting the request only holds the event loop, so the long-polls of
+    many consumers don't use up the threads of the other requests.
+
+    Args:
+        since (int, optional): The seq of the last change already read. Defaults to 0.
+        limit (int, optional): The maximum number of changes to return. Defaults to 1000.
+        wait (float, optional): The maximum time in seconds to wait for new changes. Defaults to 0.
+        shard (int, optional): The shard of the change log. Defaults to 0.
+
+    Returns:
+        schemas.ChangePage: The changes after since in sequence order.
+    """
+    validate_shard(shard)
+    deadline = time.monotonic() + wait
+    while True:
+        version = change_notifier.version
+        changes = await run_in_threadpool(crud.get_changes, db, since=since, limit=limit, shard=shard)
+        remaining = deadline - time.monotonic()
+        if changes or remaining <= 0:
+            break
+        # end the read transaction so the next query sees the new commits
+        await run_in_threadpool(db.rollback)
+        await change_notifier.wait(version, timeout=min(remaining, WAIT_RECHECK_SECONDS))
+    return schemas.ChangePage(
+        changes=changes,
+        last_seq=changes[-1].seq if changes else since,
+        head_seq=await run_in_threadpool(crud.get_head_change_seq, db, shard=shard),
+        shard_count=config.SHARD_COUNT,
+    )
 
 
 @app.post(
@@ -64,6 +225,10 @@ def create_event(event: schemas.CreateEvent, db: Session = Depends(get_db)):
     """
     Create a new event. If the event is a cancellation, it will cancel the booking if it exists.
     This action is idempotent, meaning that a booking can be cancelled multiple times without any side effects.
+    A room can be booked once per night, a booking of a room already booked for the night is rejected with
+    the conflicting booking in the response. Once cancelled, the room can be booked again for the night.
+    With GROUP_COMMIT the event is applied by the writer of its shard together with the concurrently submitted
+    events, see `GroupCommitWriter`, with the same outcome.
 
     Args:
         event (schemas.CreateEvent): The event data to be created.
@@ -72,28 +237,150 @@ def create_event(event: schemas.CreateEvent, db: Session = Depends(get_db)):
         schemas.CreateEvent: The created event data.
 
     """
+    if config.GROUP_COMMIT:
+        return create_event_group_commit(event)
+
     # Check if the event is a cancellation
     if event.rpg_status == schemas.RPGStatus.CANCELLATION:
-        matched_events = crud.get_events(
-            db,
-            hotel_id=event.hotel_id,
-            room_id=event.room_id,
-        )
-        if len(matched_events) > 0:
-            # room_id is unique, so there is only one matched event
-            if matched_events[0].rpg_status == schemas.RPGStatus.BOOKING:
-                # Cancel the booking
-                return crud.cancel_event(db=db, event_id=matched_events[0].id)
-        else:
+        status, db_event = crud.stage_cancellation(db, event)
+        if status == BatchEventStatus.CANCELLED:
+            db.commit()
+            change_notifier.notify()
+        count_ingested(status)
+        if status == BatchEventStatus.NOT_FOUND:
             raise HTTPException(
                 status_code=404,
                 detail="Booking not found, can't cancel unknown booking",
             )
+        if status == BatchEventStatus.DUPLICATE:
+            raise conflict_error(db_event)
+        return db_event
     try:
         result = crud.create_event(db=db, event=event)
+        change_notifier.notify()
+        count_ingested(BatchEventStatus.CREATED)
         return result
+    except crud.DuplicateError:
+        count_ingested(BatchEventStatus.DUPLICATE)
+        raise conflict_error(
+            crud.get_booking(db, event.hotel_id, event.room_id, event.night_of_stay)
+        )
+
+
+def conflict_error(db_event: models.Event | schemas.ReadEvent | None) -> HTTPException:
+    """
+    Build the 409 response for an event conflicting with a stored event.
+
+    Args:
+        db_event (models.Event | schemas.ReadEvent | None): The booking of the room for the night, or the
+            already cancelled booking, None if the conflicting event is unknown.
+
+    Returns:
+        HTTPException: The error with the conflicting event in its detail.
+    """
+    return HTTPException(
+        status_code=409,
+        detail={
+            "message": "Conflict: duplicate error, this event already exists.",
+            "conflicting_event": (
+                jsonable_encoder(schemas.ReadEvent.model_validate(db_event)) if db_event else None
+            ),
+        },
+    )
+
+
+def create_event_group_commit(event: schemas.CreateEvent) -> schemas.ReadEvent:
+    """
+    Apply an event with the writer of its shard and wait for its outcome.
+
+    Args:
+        event (schemas.CreateEvent): The event data to be created.
+
+    Raises:
+        HTTPException: If the booking exists already or the cancelled booking is unknown.
+
+    Returns:
+        schemas.ReadEvent: The created or cancelled event.
+    """
+    try:
+        status, db_event = event_writer.submit(event).result()
+    except crud.DuplicateError:
+        status, db_event = BatchEventStatus.DUPLICATE, None
+    count_ingested(status)
+    if status == BatchEventStatus.NOT_FOUND:
+        raise HTTPException(
+            status_code=404,
+            detail="Booking not found, can't cancel unknown booking",
+        )
+    if status == BatchEventStatus.DUPLICATE:
+        raise conflict_error(db_event)
+    return db_event
+
+
+@app.post(
+    "/events/cancellations",
+    response_model=list[schemas.ReadEvent],
+    summary="Cancel the bookings of a set of rooms or of a hotel within a range of nights",
+)
+def cancel_bookings(cancellation: schemas.BulkCancellation, db: Session = Depends(get_db)):
+    """
+    Cancel all active bookings of the given rooms and/or hotel within the given range of nights in a single
+    transaction, for example the bookings of a group or of a closed hotel.
+    This action is idempotent, bookings which are already cancelled are not cancelled again.
+
+    Args:
+        cancellation (schemas.BulkCancellation): The rooms, hotel and nights of the bookings.
+
+    Returns:
+        list[schemas.ReadEvent]: The cancelled events, empty if no booking matched.
+    """
+    cancelled_events = crud.cancel_bookings(
+        db,
+        hotel_id=cancellation.hotel_id,
+        room_ids=cancellation.room_ids,
+        night_of_stay__gte=cancellation.night_of_stay__gte,
+        night_of_stay__lte=cancellation.night_of_stay__lte,
+    )
+    if cancelled_events:
+        change_notifier.notify()
+    count_ingested(BatchEventStatus.CANCELLED, len(cancelled_events))
+    return cancelled_events
+
+
+@app.post(
+    "/events/batch",
+    response_model=list[schemas.BatchEventResult],
+    summary="Create new events or cancel bookings in a single batch",
+)
+def create_events_batch(events: list[schemas.CreateEvent], db: Session = Depends(get_db)):
+    """
+    Create new events and cancel bookings in a single transaction per shard, see `crud.apply_events_batch`.
+    Each event is handled like it would be by the single event endpoint, but instead of failing the request
+    the outcome of each event is reported as its status (created, cancelled, duplicate or not_found).
+
+    Args:
+        events (list[schemas.CreateEvent]): The events to be applied in the given order.
+
+    Returns:
+        list[schemas.BatchEventResult]: The outcome of each event in the given order.
+    """
+    try:
+        results = crud.apply_events_batch(db=db, events=events)
+        change_notifier.notify()
+        for status, count in Counter(result.status for result in results).items():
+            count_ingested(status, count)
+        return results
     except crud.DuplicateError:
         raise HTTPException(
             status_code=409,
-            detail="Conflict: duplicate error, this event already exists.",
+            detail="Conflict: the batch collided with concurrently created events, retry the batch.",
         )
+
+
+@app.get("/metrics", summary="Retrieve the metrics in the Prometheus text format")
+def read_metrics():
+    """
+    Expose the request latencies, database query times, ingest outcomes and table row counts for Prometheus.
+    The row counts are counted when the metrics are read.
+    """
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
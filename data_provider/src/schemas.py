@@ -1,6 +1,6 @@
 from datetime import datetime, date
-from pydantic import BaseModel, ConfigDict
-from src.enums import RPGStatus
+from pydantic import BaseModel, ConfigDict, model_validator
+from src.enums import BatchEventStatus, RPGStatus
 
 
 class CreateEvent(BaseModel):
@@ -33,7 +33,91 @@ class ReadEvent(CreateEvent):
         rpg_status (RPGStatus): The RPG status of the event.
         room_id (int): The ID of the room associated with the event.
         night_of_stay (date): The date of the night of stay for the event.
+        seq (int | None): The ingestion sequence number of the event, used as pagination cursor.
     """
 
     model_config = ConfigDict(from_attributes=True)
     id: int
+    seq: int | None = None
+
+
+class BulkCancellation(BaseModel):
+    """
+    Represents the cancellation of all bookings of a set of rooms or of a hotel within a range of nights.
+
+    Attributes:
+        hotel_id (int | None): The ID of the hotel of the bookings, required without room_ids.
+        room_ids (list[str] | None): The IDs of the booked rooms.
+        night_of_stay__gte (date | None): The first night of stay of the bookings.
+        night_of_stay__lte (date | None): The last night of stay of the bookings.
+    """
+
+    hotel_id: int | None = None
+    room_ids: list[str] | None = None
+    night_of_stay__gte: date | None = None
+    night_of_stay__lte: date | None = None
+
+    @model_validator(mode="after")
+    def check_scope(self) -> "BulkCancellation":
+        if self.hotel_id is None and not self.room_ids:
+            raise ValueError("hotel_id or room_ids is required")
+        return self
+
+
+class BatchEventResult(BaseModel):
+    """
+    Represents the outcome of a single item of a batch ingest.
+
+    Attributes:
+        room_id (str): The ID of the room of the submitted event.
+        status (BatchEventStatus): The outcome of the submitted event.
+        id (int | None): The ID of the created or cancelled event, for a duplicate the ID of the conflicting event,
+            None if the cancelled booking is unknown.
+    """
+
+    room_id: str
+    status: BatchEventStatus
+    id: int | None = None
+
+
+class ReadChange(BaseModel):
+    """
+    Represents an entry of the change log in the data provider.
+
+    Attributes:
+        seq (int): The sequence number of the change.
+        event_id (int): The ID of the changed event.
+        hotel_id (int): The ID of the hotel associated with the event.
+        timestamp (datetime): The timestamp of the event.
+        rpg_status (RPGStatus): The RPG status of the event after the change.
+        room_id (str): The ID of the room associated with the event.
+        night_of_stay (date): The date of the night of stay for the event.
+        recorded_at (datetime): The time the change was written.
+    """
+
+    model_config = ConfigDict(from_attributes=True)
+    seq: int
+    event_id: int
+    hotel_id: int
+    timestamp: datetime
+    rpg_status: RPGStatus
+    room_id: str
+    night_of_stay: date
+    recorded_at: datetime
+
+
+class ChangePage(BaseModel):
+    """
+    Represents a page of the change log.
+
+    Attributes:
+        changes (list[ReadChange]): The changes of the page in sequence order.
+        last_seq (int): The seq of the last change of the page, to be passed as since for the next page.
+        head_seq (int): The seq of the newest change in the change log.
+        shard_count (int): The number of shards, each of them has its own change log.
+    """
+
+    changes: list[ReadChange]
+    last_seq: int
+    head_seq: int
+    shard_count: int = 1
@@ -1,10 +1,15 @@
 from typing import Generator
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 from mock_alchemy.mocking import UnifiedAlchemyMagicMock
 import pytest
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 
-from src.database import get_db
+from src.database import Base, choose_identity_shards, choose_query_shards, choose_shard, get_db, get_read_db
+from src.migrations import upgrade_schema
 from src.rest_api import app
 
 @pytest.fixture
@@ -15,5 +20,56 @@ def mock_db() -> Generator[Session, None, None]:
 @pytest.fixture
 def rest_client(mock_db: Session) -> Generator[TestClient, None, None]:
     app.dependency_overrides[get_db] = lambda: mock_db
+    app.dependency_overrides[get_read_db] = lambda: mock_db
+    client = TestClient(app)
+    yield client
+
+
+@pytest.fixture
+def sqlite_db() -> Generator[Session, None, None]:
+    # in-memory database for statements the mock does not support
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield db
+    db.close()
+    engine.dispose()
+
+@pytest.fixture
+def sqlite_client(sqlite_db: Session) -> Generator[TestClient, None, None]:
+    app.dependency_overrides[get_db] = lambda: sqlite_db
+    app.dependency_overrides[get_read_db] = lambda: sqlite_db
+    client = TestClient(app)
+    yield client
+
+
+@pytest.fixture
+def sharded_db() -> Generator[ShardedSession, None, None]:
+    # two in-memory shards
+    engines = {
+        shard: create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        for shard in range(2)
+    }
+    for shard, engine in engines.items():
+        upgrade_schema(engine, shard)
+    db = ShardedSession(
+        autoflush=False,
+        shards=engines,
+        shard_chooser=choose_shard,
+        identity_chooser=choose_identity_shards,
+        execute_chooser=choose_query_shards,
+    )
+    with patch("src.config.SHARD_COUNT", 2):
+        yield db
+    db.close()
+    for engine in engines.values():
+        engine.dispose()
+
+@pytest.fixture
+def sharded_client(sharded_db: ShardedSession) -> Generator[TestClient, None, None]:
+    app.dependency_overrides[get_db] = lambda: sharded_db
+    app.dependency_overrides[get_read_db] = lambda: sharded_db
     client = TestClient(app)
     yield client
@@ -1,4 +1,7 @@
+import time
 from datetime import datetime, date
+import httpx
+import msgpack
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 from src import models, schemas
@@ -121,27 +124,25 @@ def test_create_event(rest_client: TestClient, mock_db: Session) -> None:
     assert db_data[0].night_of_stay == date(2022, 1, 1)
 
 
-def test_cancel_event(rest_client: TestClient, mock_db: Session) -> None:
+def test_cancel_event(sqlite_client: TestClient, sqlite_db: Session) -> None:
     """
     Test case for cancelling an event.
 
     Args:
-        rest_client (TestClient): The test client fixture for making HTTP requests.
-        mock_db (Session): The mock database session fixture.
+        sqlite_client (TestClient): The test client fixture backed by an in-memory database.
+        sqlite_db (Session): The in-memory database session fixture.
     """
 
     # Create a booking event in the database
     event = models.Event(
-        id=1,
         hotel_id=1,
         timestamp=datetime(2024, 1, 1),
         rpg_status=1,
         room_id="0",
         night_of_stay=date(2024, 2, 2),
     )
-    # Insert the booking event into the mock database
-    mock_db.add(event)
-    mock_db.commit()
+    sqlite_db.add(event)
+    sqlite_db.commit()
 
     # Create a cancellation event
     cancellation_event = schemas.CreateEvent(
@@ -149,11 +150,11 @@ def test_cancel_event(rest_client: TestClient, mock_db: Session) -> None:
         timestamp=datetime(2022, 1, 2),  # Different timestamp
         rpg_status=schemas.RPGStatus.CANCELLATION,
         room_id="0",
-        night_of_stay=date(2022, 1, 1),
+        night_of_stay=date(2024, 2, 2),
     )
 
     # Test the endpoint for cancellation
-    response = rest_client.post(
+    response = sqlite_client.post(
         "/events", json=cancellation_event.model_dump(mode="json")
     )
 
@@ -161,7 +162,7 @@ def test_cancel_event(rest_client: TestClient, mock_db: Session) -> None:
     assert response.status_code == 201
 
     # Assert values in the database
-    db_data = mock_db.query(models.Event).filter(models.Event.hotel_id == 1).all()
+    db_data = sqlite_db.query(models.Event).filter(models.Event.hotel_id == 1).all()
     assert len(db_data) == 1  # Only one event should exist due to cancellation
     assert db_data[0].hotel_id == 1
     assert db_data[0].timestamp == datetime(
@@ -170,3 +171,440 @@ def test_cancel_event(rest_client: TestClient, mock_db: Session) -> None:
     assert db_data[0].rpg_status == schemas.RPGStatus.CANCELLATION
     assert db_data[0].room_id == "0"
     assert db_data[0].night_of_stay == date(2024, 2, 2)
+
+    # Assert the cancellation was logged
+    response = sqlite_client.get("/changes")
+    assert [change["rpg_status"] for change in response.json()["changes"]] == [schemas.RPGStatus.CANCELLATION]
+
+
+def test_cancel_bookings(sqlite_client: TestClient, sqlite_db: Session) -> None:
+    """
+    Test case for cancelling the bookings of a hotel within a range of nights in one request.
+
+    Args:
+        sqlite_client (TestClient): The test client fixture backed by an in-memory database.
+        sqlite_db (Session): The in-memory database session fixture.
+    """
+
+    # Create bookings of two hotels on three nights
+    for hotel_id in (1, 2):
+        for day in (1, 2, 3):
+            sqlite_db.add(
+                models.Event(
+                    hotel_id=hotel_id,
+                    timestamp=datetime(2024, 1, 1),
+                    rpg_status=schemas.RPGStatus.BOOKING,
+                    room_id=str(day),
+                    night_of_stay=date(2024, 2, day),
+                )
+            )
+    sqlite_db.commit()
+
+    cancellation = {"hotel_id": 1, "night_of_stay__gte": "2024-02-02", "night_of_stay__lte": "2024-02-03"}
+
+    # Test the endpoint
+    response = sqlite_client.post("/events/cancellations", json=cancellation)
+
+    # Assert the cancelled bookings are returned
+    assert response.status_code == 200
+    assert sorted(event["room_id"] for event in response.json()) == ["2", "3"]
+    assert all(event["rpg_status"] == schemas.RPGStatus.CANCELLATION for event in response.json())
+
+    # Assert the cancellation is idempotent
+    response = sqlite_client.post("/events/cancellations", json=cancellation)
+    assert response.status_code == 200
+    assert response.json() == []
+
+    # Assert the bookings of the rooms are cancelled in every hotel
+    response = sqlite_client.post("/events/cancellations", json={"room_ids": ["1"]})
+    assert sorted(event["hotel_id"] for event in response.json()) == [1, 2]
+
+    # Assert a cancellation of all bookings is rejected
+    assert sqlite_client.post("/events/cancellations", json={}).status_code == 422
+
+    # Assert values in the database and the change log
+    db_data = sqlite_db.query(models.Event).filter(models.Event.rpg_status == schemas.RPGStatus.BOOKING).all()
+    assert [(event.hotel_id, event.room_id) for event in db_data] == [(2, "2"), (2, "3")]
+    assert len(sqlite_client.get("/changes").json()["changes"]) == 4
+
+
+def test_create_events_batch(sqlite_client: TestClient, sqlite_db: Session) -> None:
+    """
+    Test case for applying a batch of bookings and cancellations.
+
+    Args:
+        sqlite_client (TestClient): The test client fixture backed by an in-memory database.
+        sqlite_db (Session): The in-memory database session fixture.
+    """
+
+    # Create an existing booking in the database
+    sqlite_db.add(
+        models.Event(
+            hotel_id=1,
+            timestamp=datetime(2024, 1, 1),
+            rpg_status=schemas.RPGStatus.BOOKING,
+            room_id="0",
+            night_of_stay=date(2024, 2, 2),
+        )
+    )
+    sqlite_db.commit()
+
+    def event(room_id: str, rpg_status: schemas.RPGStatus) -> dict:
+        return schemas.CreateEvent(
+            hotel_id=1,
+            timestamp=datetime(2024, 1, 2),
+            rpg_status=rpg_status,
+            room_id=room_id,
+            night_of_stay=date(2024, 2, 2),
+        ).model_dump(mode="json")
+
+    # Test the endpoint
+    response = sqlite_client.post(
+        "/events/batch",
+        json=[
+            event("0", schemas.RPGStatus.CANCELLATION),  # cancel the existing booking
+            event("0", schemas.RPGStatus.CANCELLATION),  # already cancelled
+            event("1", schemas.RPGStatus.BOOKING),  # new booking
+            event("1", schemas.RPGStatus.BOOKING),  # duplicate within the batch
+            event("2", schemas.RPGStatus.BOOKING),  # new booking
+            event("2", schemas.RPGStatus.CANCELLATION),  # cancelled within the batch
+            event("3", schemas.RPGStatus.CANCELLATION),  # unknown booking
+            event("0", schemas.RPGStatus.BOOKING),  # booking the cancelled night again
+        ],
+    )
+
+    # Assert the response
+    assert response.status_code == 200
+    assert [item["status"] for item in response.json()] == [
+        "cancelled",
+        "duplicate",
+        "created",
+        "duplicate",
+        "created",
+        "cancelled",
+        "not_found",
+        "created",
+    ]
+    # the duplicate is reported with the ID of the conflicting booking
+    assert response.json()[3]["id"] == response.json()[2]["id"]
+
+    # Assert values in the database
+    db_data = sorted((event.room_id, event.rpg_status) for event in sqlite_db.query(models.Event).all())
+    assert db_data == [
+        ("0", schemas.RPGStatus.BOOKING),
+        ("0", schemas.RPGStatus.CANCELLATION),
+        ("1", schemas.RPGStatus.BOOKING),
+        ("2", schemas.RPGStatus.CANCELLATION),
+    ]
+
+    # Assert the new events continue the seq and their changes refer to them
+    events_by_id = {event.id: event for event in sqlite_db.query(models.Event)}
+    assert sorted(event.seq for event in events_by_id.values()) == [1, 2, 3, 4]
+    changes = sqlite_db.query(models.Change).order_by(models.Change.seq).all()
+    assert [(events_by_id[change.event_id].room_id, change.rpg_status) for change in changes] == [
+        ("0", schemas.RPGStatus.CANCELLATION),
+        ("1", schemas.RPGStatus.BOOKING),
+        ("2", schemas.RPGStatus.BOOKING),
+        ("2", schemas.RPGStatus.CANCELLATION),
+        ("0", schemas.RPGStatus.BOOKING),
+    ]
+
+
+def test_double_booking(sqlite_client: TestClient) -> None:
+    """
+    Test case for booking a room once per night, the conflicting booking is returned with the 409 response.
+
+    Args:
+        sqlite_client (TestClient): The test client fixture backed by an in-memory database.
+    """
+
+    def post_event(rpg_status: schemas.RPGStatus, night_of_stay: date) -> httpx.Response:
+        event = schemas.CreateEvent(
+            hotel_id=1,
+            timestamp=datetime(2024, 1, 1),
+            rpg_status=rpg_status,
+            room_id="0",
+            night_of_stay=night_of_stay,
+        )
+        return sqlite_client.post("/events", json=event.model_dump(mode="json"))
+
+    booking = post_event(schemas.RPGStatus.BOOKING, date(2024, 2, 2))
+    assert booking.status_code == 201
+
+    # the room is booked for the night
+    response = post_event(schemas.RPGStatus.BOOKING, date(2024, 2, 2))
+    assert response.status_code == 409
+    conflicting_event = response.json()["detail"]["conflicting_event"]
+    assert conflicting_event["rpg_status"] == schemas.RPGStatus.BOOKING
+    assert conflicting_event["night_of_stay"] == booking.json()["night_of_stay"]
+
+    # the room is free on the next night
+    assert post_event(schemas.RPGStatus.BOOKING, date(2024, 2, 3)).status_code == 201
+
+    # the cancellation only cancels the booking of its night
+    response = post_event(schemas.RPGStatus.CANCELLATION, date(2024, 2, 2))
+    assert response.status_code == 201
+    assert response.json()["night_of_stay"] == "2024-02-02"
+    response = post_event(schemas.RPGStatus.CANCELLATION, date(2024, 2, 2))
+    assert response.status_code == 409
+    assert response.json()["detail"]["conflicting_event"]["rpg_status"] == schemas.RPGStatus.CANCELLATION
+    assert post_event(schemas.RPGStatus.CANCELLATION, date(2024, 2, 4)).status_code == 404
+
+    # the cancelled night can be booked again
+    assert post_event(schemas.RPGStatus.BOOKING, date(2024, 2, 2)).status_code == 201
+
+
+def test_cancel_hotel_0(sqlite_client: TestClient, sqlite_db: Session) -> None:
+    """
+    Test case for cancelling the bookings of hotel 0, the same room booked at another hotel is not cancelled.
+
+    Args:
+        sqlite_client (TestClient): The test client fixture backed by an in-memory database.
+        sqlite_db (Session): The in-memory database session fixture.
+    """
+
+    def event(hotel_id: int, rpg_status: schemas.RPGStatus, night_of_stay: date) -> dict:
+        return schemas.CreateEvent(
+            hotel_id=hotel_id,
+            timestamp=datetime(2024, 1, 1),
+            rpg_status=rpg_status,
+            room_id="101",
+            night_of_stay=night_of_stay,
+        ).model_dump(mode="json")
+
+    # Book the room on two nights at the hotels 0 and 1
+    for hotel_id in (0, 1):
+        for night_of_stay in (date(2024, 2, 2), date(2024, 2, 3)):
+            response = sqlite_client.post("/events", json=event(hotel_id, schemas.RPGStatus.BOOKING, night_of_stay))
+            assert response.status_code == 201
+
+    # Cancel the first night at hotel 0 with the single event endpoint
+    response = sqlite_client.post("/events", json=event(0, schemas.RPGStatus.CANCELLATION, date(2024, 2, 2)))
+    assert response.status_code == 201
+    assert response.json()["hotel_id"] == 0
+
+    # Cancel the second night at hotel 0 with a batch
+    response = sqlite_client.post(
+        "/events/batch", json=[event(0, schemas.RPGStatus.CANCELLATION, date(2024, 2, 3))]
+    )
+    assert [item["status"] for item in response.json()] == ["cancelled"]
+
+    # Assert the bookings of hotel 1 are untouched
+    db_data = sorted(
+        (event.hotel_id, event.night_of_stay.day, event.rpg_status) for event in sqlite_db.query(models.Event)
+    )
+    assert db_data == [
+        (0, 2, schemas.RPGStatus.CANCELLATION),
+        (0, 3, schemas.RPGStatus.CANCELLATION),
+        (1, 2, schemas.RPGStatus.BOOKING),
+        (1, 3, schemas.RPGStatus.BOOKING),
+    ]
+
+    # Book the room at hotel 0 again and cancel all bookings of hotel 0 at once
+    response = sqlite_client.post("/events", json=event(0, schemas.RPGStatus.BOOKING, date(2024, 2, 2)))
+    assert response.status_code == 201
+    response = sqlite_client.post("/events/cancellations", json={"hotel_id": 0})
+    assert response.status_code == 200
+    assert [(event["hotel_id"], event["night_of_stay"]) for event in response.json()] == [(0, "2024-02-02")]
+    assert sqlite_db.query(models.Event).filter(models.Event.rpg_status == schemas.RPGStatus.BOOKING).count() == 2
+
+
+def test_read_events_pages(sqlite_client: TestClient, sqlite_db: Session) -> None:
+    """
+    Test case for paging through the events with the ingestion sequence as cursor.
+
+    Args:
+        sqlite_client (TestClient): The test client fixture backed by an in-memory database.
+        sqlite_db (Session): The in-memory database session fixture.
+    """
+
+    # Create test data, ingested in reverse timestamp order
+    for i in range(5):
+        sqlite_db.add(
+            models.Event(
+                hotel_id=1,
+                timestamp=datetime(2024, 1, 10 - i),
+                rpg_status=schemas.RPGStatus.BOOKING,
+                room_id=str(i),
+                night_of_stay=date(2024, 2, 2),
+            )
+        )
+        sqlite_db.commit()
+
+    # Page through the events
+    room_ids = []
+    params = {"limit": 2}
+    while True:
+        response = sqlite_client.get("/events", params=params)
+        assert response.status_code == 200
+        room_ids += [event["room_id"] for event in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["after_seq"] = response.headers["X-Next-Cursor"]
+
+    # Assert the events are returned once in ingestion order
+    assert room_ids == ["0", "1", "2", "3", "4"]
+
+
+def test_read_events_ndjson(sqlite_client: TestClient, sqlite_db: Session) -> None:
+    """
+    Test case for streaming the events as newline delimited JSON.
+
+    Args:
+        sqlite_client (TestClient): The test client fixture backed by an in-memory database.
+        sqlite_db (Session): The in-memory database session fixture.
+    """
+
+    # Create test data
+    for i in range(3):
+        sqlite_db.add(
+            models.Event(
+                hotel_id=1,
+                timestamp=datetime(2024, 1, 1 + i),
+                rpg_status=schemas.RPGStatus.BOOKING,
+                room_id=str(i),
+                night_of_stay=date(2024, 2, 2),
+            )
+        )
+    sqlite_db.commit()
+
+    # Execute endpoint request
+    response = sqlite_client.get(
+        "/events", params={"hotel_id": 1}, headers={"Accept": "application/x-ndjson"}
+    )
+
+    # Assert the response
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    events = [schemas.ReadEvent.model_validate_json(line) for line in response.iter_lines()]
+    assert [event.room_id for event in events] == ["0", "1", "2"]
+    # The default response is unchanged
+    assert sqlite_client.get("/events", params={"hotel_id": 1}).json() == [
+        event.model_dump(mode="json") for event in events
+    ]
+
+
+def test_read_events_msgpack(sqlite_client: TestClient, sqlite_db: Session) -> None:
+    """
+    Test case for returning a page of events as MessagePack encoded columns and gzip compressed JSON.
+
+    Args:
+        sqlite_client (TestClient): The test client fixture backed by an in-memory database.
+        sqlite_db (Session): The in-memory database session fixture.
+    """
+
+    # Create test data
+    for i in range(100):
+        sqlite_db.add(
+            models.Event(
+                hotel_id=1,
+                timestamp=datetime(2024, 1, 1),
+                rpg_status=schemas.RPGStatus.BOOKING,
+                room_id=str(i),
+                night_of_stay=date(2024, 2, 2),
+            )
+        )
+    sqlite_db.commit()
+
+    # Execute endpoint request
+    response = sqlite_client.get(
+        "/events", params={"limit": 2}, headers={"Accept": "application/x-msgpack"}
+    )
+
+    # Assert the response
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-msgpack"
+    assert response.headers["X-Next-Cursor"] == "2"
+    assert msgpack.unpackb(response.content) == {
+        "id": [1, 2],
+        "seq": [1, 2],
+        "hotel_id": [1, 1],
+        "timestamp": ["2024-01-01T00:00:00", "2024-01-01T00:00:00"],
+        "rpg_status": [1, 1],
+        "room_id": ["0", "1"],
+        "night_of_stay": [date(2024, 2, 2).toordinal()] * 2,
+    }
+
+    # Assert a large JSON response is compressed
+    response = sqlite_client.get("/events", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()) == 100
+
+
+def test_read_changes(sqlite_client: TestClient) -> None:
+    """
+    Test case for reading the change log after bookings and cancellations.
+
+    Args:
+        sqlite_client (TestClient): The test client fixture backed by an in-memory database.
+    """
+
+    def event(room_id: str, rpg_status: schemas.RPGStatus) -> dict:
+        return schemas.CreateEvent(
+            hotel_id=1,
+            timestamp=datetime(2024, 1, 1),
+            rpg_status=rpg_status,
+            room_id=room_id,
+            night_of_stay=date(2024, 2, 2),
+        ).model_dump(mode="json")
+
+    # Create test data through the single and the batch endpoint
+    sqlite_client.post("/events", json=event("0", schemas.RPGStatus.BOOKING))
+    sqlite_client.post(
+        "/events/batch",
+        json=[
+            event("1", schemas.RPGStatus.BOOKING),
+            event("0", schemas.RPGStatus.CANCELLATION),
+            event("1", schemas.RPGStatus.BOOKING),  # duplicate, not logged
+        ],
+    )
+    sqlite_client.post("/events", json=event("1", schemas.RPGStatus.CANCELLATION))
+
+    # Read the change log in two pages
+    response = sqlite_client.get("/changes", params={"limit": 2})
+    assert response.status_code == 200
+    first_page = response.json()
+    response = sqlite_client.get("/changes", params={"since": first_page["last_seq"]})
+    second_page = response.json()
+
+    # Assert every change is returned once in order
+    changes = first_page["changes"] + second_page["changes"]
+    assert [(change["room_id"], change["rpg_status"]) for change in changes] == [
+        ("0", schemas.RPGStatus.BOOKING),
+        ("1", schemas.RPGStatus.BOOKING),
+        ("0", schemas.RPGStatus.CANCELLATION),
+        ("1", schemas.RPGStatus.CANCELLATION),
+    ]
+    assert first_page["head_seq"] == second_page["last_seq"] == changes[-1]["seq"]
+
+
+def test_read_changes_wait(sqlite_client: TestClient) -> None:
+    """
+    Test case for the long-poll on the change log.
+
+    Args:
+        sqlite_client (TestClient): The test client fixture backed by an in-memory database.
+    """
+
+    # Without changes the request is held until the wait time expired
+    started = time.monotonic()
+    response = sqlite_client.get("/changes", params={"since": 0, "wait": 0.3})
+    assert response.status_code == 200
+    assert response.json()["changes"] == []
+    assert time.monotonic() - started >= 0.3
+
+    # Create test data
+    event = schemas.CreateEvent(
+        hotel_id=1,
+        timestamp=datetime(2024, 1, 1),
+        rpg_status=schemas.RPGStatus.BOOKING,
+        room_id="0",
+        night_of_stay=date(2024, 2, 2),
+    )
+    sqlite_client.post("/events", json=event.model_dump(mode="json"))
+
+    # With pending changes the request returns immediately
+    started = time.monotonic()
+    response = sqlite_client.get("/changes", params={"since": 0, "wait": 30})
+    assert len(response.json()["changes"]) == 1
+    assert time.monotonic() - started < 5
@@ -0,0 +1,51 @@
+from datetime import date, datetime
+from fastapi.testclient import TestClient
+from prometheus_client.parser import text_string_to_metric_families
+from src import schemas
+
+
+def read_samples(client: TestClient) -> dict[tuple, float]:
+    """
+    Read the metrics endpoint and key the samples by their name and labels.
+    """
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(response.text)
+        for sample in family.samples
+    }
+
+
+def test_metrics(sqlite_client: TestClient) -> None:
+    """
+    Test case for the metrics of the requests, database queries and ingested events.
+
+    Args:
+        sqlite_client (TestClient): The test client fixture backed by an in-memory database.
+    """
+    created_key = ("events_ingested_total", (("outcome", "created"),))
+    request_key = (
+        "http_request_duration_seconds_count",
+        (("method", "POST"), ("route", "/events"), ("status", "201")),
+    )
+    before = read_samples(sqlite_client)
+
+    # Create a booking and submit it again
+    event = schemas.CreateEvent(
+        hotel_id=1,
+        timestamp=datetime(2024, 1, 1),
+        rpg_status=schemas.RPGStatus.BOOKING,
+        room_id="0",
+        night_of_stay=date(2024, 2, 2),
+    )
+    assert sqlite_client.post("/events", json=event.model_dump(mode="json")).status_code == 201
+    assert sqlite_client.post("/events", json=event.model_dump(mode="json")).status_code == 409
+
+    # Assert the outcomes and the request were counted
+    after = read_samples(sqlite_client)
+    assert after[created_key] == before.get(created_key, 0) + 1
+    assert after[("events_ingested_total", (("outcome", "duplicate"),))] >= 1
+    assert after[request_key] == before.get(request_key, 0) + 1
+    assert after[("db_query_duration_seconds_count", (("statement", "INSERT"),))] >= 1
+    assert ("table_rows", (("shard", "0"), ("table", "events"))) in after
@@ -0,0 +1,9 @@
+from src.microbenchmark import CASES, time_case
+
+
+def test_cases():
+    """
+    Test function for running every microbenchmark case on a few rows, so the cases keep up with the code.
+    """
+    for case in CASES:
+        assert time_case(case, size=100, repeats=2) > 0
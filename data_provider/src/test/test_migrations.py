@@ -0,0 +1,95 @@
+from datetime import datetime, date
+from pathlib import Path
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+from src import crud, schemas
+from src.database import SHARD_ID_RANGE
+from src.migrations import upgrade_schema
+
+# the events table of the first release, before the seq column and the double booking index
+LEGACY_EVENTS_DDL = (
+    "CREATE TABLE events (id INTEGER NOT NULL, hotel_id INTEGER, timestamp DATETIME, rpg_status VARCHAR(12), "
+    "room_id VARCHAR, night_of_stay DATE, PRIMARY KEY (id), UNIQUE (room_id))"
+)
+
+
+def create_legacy_database(path: Path) -> None:
+    """
+    Create a database with the schema of the first release and two bookings.
+
+    Args:
+        path (Path): The path of the database file.
+    """
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text(LEGACY_EVENTS_DDL))
+        conn.execute(text("CREATE INDEX ix_events_hotel_id ON events (hotel_id)"))
+        conn.execute(text(
+            "INSERT INTO events (id, hotel_id, timestamp, rpg_status, room_id, night_of_stay) VALUES "
+            "(1, 1, '2024-01-01 00:00:00.000000', 'BOOKING', '1', '2024-02-01'), "
+            "(2, 1, '2024-01-02 00:00:00.000000', 'BOOKING', '2', '2024-02-01')"
+        ))
+    engine.dispose()
+
+
+def test_upgrade_legacy_schema(tmp_path: Path) -> None:
+    """
+    Test case for upgrading a database of the first release: the events are numbered by their ID, new events
+    continue the sequence and a room can be booked again for another night, but not twice for the same night.
+
+    Args:
+        tmp_path (Path): The temporary directory of the database file.
+    """
+    path = tmp_path / "legacy.db"
+    create_legacy_database(path)
+    engine = create_engine(f"sqlite:///{path}")
+    upgrade_schema(engine)
+    # The upgrade checks the schema first, so a second start doesn't change anything
+    upgrade_schema(engine)
+
+    index_names = {index["name"] for index in inspect(engine).get_indexes("events")}
+    assert {"ix_events_seq", "ux_events_booked_room_night"} <= index_names
+    assert inspect(engine).get_unique_constraints("events") == []
+
+    with Session(bind=engine) as db:
+        assert [db_event.seq for db_event in crud.get_events(db, hotel_id=1)] == [1, 2]
+        event = schemas.CreateEvent(
+            hotel_id=1,
+            timestamp=datetime(2024, 1, 3),
+            rpg_status=schemas.RPGStatus.BOOKING,
+            room_id="1",
+            night_of_stay=date(2024, 2, 2),
+        )
+        db_event = crud.create_event(db, event)
+        assert db_event.seq == 3
+        with pytest.raises(crud.DuplicateError):
+            crud.create_event(db, event)
+    engine.dispose()
+
+
+def test_upgrade_legacy_shard(tmp_path: Path) -> None:
+    """
+    Test case for moving the events of a shard of an earlier version into the ID range of the shard.
+
+    Args:
+        tmp_path (Path): The temporary directory of the database file.
+    """
+    path = tmp_path / "legacy_shard1.db"
+    create_legacy_database(path)
+    engine = create_engine(f"sqlite:///{path}")
+    upgrade_schema(engine, shard=1)
+    upgrade_schema(engine, shard=1)
+
+    with Session(bind=engine) as db:
+        db_events = crud.get_events(db, hotel_id=1)
+        assert [db_event.id for db_event in db_events] == [SHARD_ID_RANGE + 1, SHARD_ID_RANGE + 2]
+        event = schemas.CreateEvent(
+            hotel_id=1,
+            timestamp=datetime(2024, 1, 3),
+            rpg_status=schemas.RPGStatus.BOOKING,
+            room_id="3",
+            night_of_stay=date(2024, 2, 1),
+        )
+        assert crud.create_event(db, event).id == SHARD_ID_RANGE + 3
+    engine.dispose()
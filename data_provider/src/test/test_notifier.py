@@ -0,0 +1,41 @@
+import asyncio
+import threading
+from src.notifier import ChangeNotifier
+
+
+def test_wait_returns_on_notify() -> None:
+    """
+    Test case for waking up a waiting request by a notification from another thread.
+    """
+    notifier = ChangeNotifier()
+    version = notifier.version
+
+    # Notify from another thread while waiting
+    timer = threading.Timer(0.05, notifier.notify)
+    timer.start()
+
+    # Assert the wait returns because of the notification and not the timeout
+    assert asyncio.run(notifier.wait(version, timeout=5))
+    timer.join()
+
+
+def test_wait_times_out() -> None:
+    """
+    Test case for waiting without any notification.
+    """
+    notifier = ChangeNotifier()
+
+    # Assert the wait returns after the timeout without a notification
+    assert not asyncio.run(notifier.wait(notifier.version, timeout=0.05))
+
+
+def test_wait_returns_on_missed_notify() -> None:
+    """
+    Test case for a notification arriving between reading the version and starting to wait.
+    """
+    notifier = ChangeNotifier()
+    version = notifier.version
+    notifier.notify()
+
+    # Assert the wait returns immediately
+    assert asyncio.run(notifier.wait(version, timeout=5))
@@ -0,0 +1,176 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date
+from pathlib import Path
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import Session
+from src import crud, models, schemas
+from src.database import SHARD_ID_RANGE, create_session_factory
+from src.enums import BatchEventStatus
+from src.migrations import upgrade_schema
+from src.rebalance import rebalance
+
+
+def test_sharded_events(sharded_client: TestClient, sharded_db: ShardedSession) -> None:
+    """
+    Test case for routing the events of two shards by hotel and reading them per shard or merged.
+
+    Args:
+        sharded_client (TestClient): The test client fixture backed by two in-memory shards.
+        sharded_db (ShardedSession): The sharded database session fixture.
+    """
+
+    # Create bookings of the hotels 1 (shard 1), 2 (shard 0) and 3 (shard 1)
+    for i, hotel_id in enumerate([1, 2, 3]):
+        event = schemas.CreateEvent(
+            hotel_id=hotel_id,
+            timestamp=datetime(2024, 1, 3 - i),
+            rpg_status=schemas.RPGStatus.BOOKING,
+            room_id=str(i),
+            night_of_stay=date(2024, 2, 2),
+        )
+        response = sharded_client.post("/events", json=event.model_dump(mode="json"))
+        assert response.status_code == 201
+
+    # Cancel the booking of hotel 3 with a batch
+    cancellation = {**event.model_dump(mode="json"), "rpg_status": schemas.RPGStatus.CANCELLATION}
+    response = sharded_client.post("/events/batch", json=[cancellation])
+    assert response.json()[0]["status"] == "cancelled"
+
+    # Assert the events of all shards are merged by timestamp
+    events = sharded_client.get("/events").json()
+    assert [event["room_id"] for event in events] == ["2", "1", "0"]
+    # Assert the IDs of the shards don't collide, shard 1 counts from the start of its ID range
+    assert sorted(event["id"] for event in events) == [1, SHARD_ID_RANGE + 1, SHARD_ID_RANGE + 2]
+    assert [event["room_id"] for event in sharded_client.get("/events", params={"hotel_id": 3}).json()] == ["2"]
+
+    # Assert the pages and change logs are read per shard
+    assert sharded_client.get("/events", params={"limit": 10}).status_code == 422
+    page = sharded_client.get("/events", params={"limit": 10, "shard": 1}).json()
+    assert [(event["room_id"], event["seq"]) for event in page] == [("0", 1), ("2", 2)]
+    changes = sharded_client.get("/changes", params={"shard": 1}).json()
+    assert [(change["room_id"], change["rpg_status"]) for change in changes["changes"]] == [
+        ("0", schemas.RPGStatus.BOOKING),
+        ("2", schemas.RPGStatus.BOOKING),
+        ("2", schemas.RPGStatus.CANCELLATION),
+    ]
+    assert changes["shard_count"] == 2
+    assert len(sharded_client.get("/changes", params={"shard": 0}).json()["changes"]) == 1
+    assert sharded_client.get("/changes", params={"shard": 2}).status_code == 422
+
+    # Cancel the bookings of rooms of both shards at once
+    response = sharded_client.post("/events/cancellations", json={"room_ids": ["0", "1", "2"]})
+    assert sorted(event["room_id"] for event in response.json()) == ["0", "1"]
+    assert len(sharded_client.get("/changes", params={"shard": 0}).json()["changes"]) == 2
+
+
+def test_hotel_queries_run_on_its_shard(sharded_client: TestClient, sharded_db: ShardedSession) -> None:
+    """
+    Test case for reading the events of a hotel from its shard only.
+
+    Args:
+        sharded_client (TestClient): The test client fixture backed by two in-memory shards.
+        sharded_db (ShardedSession): The sharded database session fixture.
+    """
+    # Store a booking of hotel 3 in its shard 1 and one in shard 0, where the hotel's queries must not look
+    for shard in range(2):
+        with Session(bind=sharded_db.get_bind(shard_id=shard)) as db:
+            db.add(
+                models.Event(
+                    hotel_id=3,
+                    timestamp=datetime(2024, 1, 1),
+                    rpg_status=schemas.RPGStatus.BOOKING,
+                    room_id=str(shard),
+                    night_of_stay=date(2024, 2, 2),
+                )
+            )
+            db.commit()
+
+    # Assert only the shard of the hotel is read, also for a page without a shard
+    assert [event.room_id for event in crud.get_events(sharded_db, hotel_id=3)] == ["1"]
+    assert [event["room_id"] for event in sharded_client.get("/events", params={"hotel_id": 3}).json()] == ["1"]
+    page = sharded_client.get("/events", params={"hotel_id": 3, "limit": 10}).json()
+    assert [event["room_id"] for event in page] == ["1"]
+
+
+def test_concurrent_sharded_batches(tmp_path: Path) -> None:
+    """
+    Test case for applying concurrent batches spanning both shards in opposite shard orders.
+
+    Args:
+        tmp_path (Path): A temporary directory for the database files of the shards.
+    """
+    engines = {
+        shard: create_engine(f"sqlite:///{tmp_path / f'shard{shard}.db'}", connect_args={"check_same_thread": False})
+        for shard in range(2)
+    }
+    for shard, engine in engines.items():
+        upgrade_schema(engine, shard)
+    session_factory = create_session_factory(engines)
+
+    def apply_batch(i: int) -> list[schemas.BatchEventResult]:
+        # every batch books a room at four hotels, half of them start on shard 0 and half on shard 1
+        events = [
+            schemas.CreateEvent(
+                hotel_id=hotel_id,
+                timestamp=datetime(2024, 1, 1),
+                rpg_status=schemas.RPGStatus.BOOKING,
+                room_id=str(i),
+                night_of_stay=date(2024, 2, 2),
+            )
+            for hotel_id in ([0, 1, 2, 3] if i % 2 else [1, 0, 3, 2])
+        ]
+        with session_factory() as db:
+            return crud.apply_events_batch(db, events)
+
+    with patch("src.config.SHARD_COUNT", 2), ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(apply_batch, range(64)))
+
+    # Assert every event of every batch is created on the shard of its hotel
+    assert all(result.status == BatchEventStatus.CREATED for batch in results for result in batch)
+    # Assert the IDs are unique across the shards
+    assert len({result.id for batch in results for result in batch}) == 256
+    for shard, engine in engines.items():
+        with Session(bind=engine) as db:
+            assert db.query(models.Event).count() == 128
+            assert {event.hotel_id % 2 for event in db.query(models.Event)} == {shard}
+            assert db.query(models.Change).count() == 128
+    for engine in engines.values():
+        engine.dispose()
+
+
+def test_rebalance(sharded_db: ShardedSession) -> None:
+    """
+    Test case for moving the events of a previously unsharded database to the shards of their hotels.
+
+    Args:
+        sharded_db (ShardedSession): The sharded database session fixture, providing the engines of two shards.
+    """
+    sessions = {shard: Session(bind=sharded_db.get_bind(shard_id=shard)) for shard in range(2)}
+
+    # Create bookings of the hotels 1 and 2 in shard 0
+    for hotel_id in [1, 2]:
+        sessions[0].add(
+            models.Event(
+                hotel_id=hotel_id,
+                timestamp=datetime(2024, 1, 1),
+                rpg_status=schemas.RPGStatus.BOOKING,
+                room_id=str(hotel_id),
+                night_of_stay=date(2024, 2, 2),
+            )
+        )
+    sessions[0].commit()
+
+    # Rebalance twice, the second run must not move anything
+    assert rebalance(sessions, shard_count=2) == 1
+    assert rebalance(sessions, shard_count=2) == 0
+
+    # Assert the events are stored in the shards of their hotels
+    assert [event.hotel_id for event in sessions[0].query(models.Event)] == [2]
+    assert [event.hotel_id for event in sessions[1].query(models.Event)] == [1]
+    # the moved event is not logged again in the change log of its new shard
+    assert sessions[1].query(models.Change).count() == 0
+    for db in sessions.values():
+        db.close()
@@ -0,0 +1,136 @@
+from datetime import datetime, date
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session, sessionmaker
+from src import crud, models, schemas
+from src.enums import BatchEventStatus
+from src.writer import GroupCommitWriter
+
+
+def create_event(room_id: str, rpg_status: schemas.RPGStatus) -> schemas.CreateEvent:
+    """
+    Creates an event of hotel 1 for the given room and status.
+    """
+    return schemas.CreateEvent(
+        hotel_id=1,
+        timestamp=datetime(2024, 1, 1),
+        rpg_status=rpg_status,
+        room_id=room_id,
+        night_of_stay=date(2024, 2, 2),
+    )
+
+
+@patch("src.writer.config.GROUP_COMMIT_MAX_DELAY", 0.2)
+def test_group_commit(sqlite_db: Session) -> None:
+    """
+    Test case for applying concurrently submitted events with one group commit and an outcome per event.
+
+    Args:
+        sqlite_db (Session): The in-memory database session fixture.
+    """
+    writer = GroupCommitWriter(sessionmaker(bind=sqlite_db.get_bind()))
+    events = [
+        create_event("0", schemas.RPGStatus.BOOKING),
+        create_event("0", schemas.RPGStatus.BOOKING),
+        create_event("1", schemas.RPGStatus.CANCELLATION),
+        create_event("2", schemas.RPGStatus.BOOKING),
+        create_event("2", schemas.RPGStatus.CANCELLATION),
+    ]
+
+    # Submit the events within the delay of the group
+    with (
+        patch.object(writer, "_apply", wraps=writer._apply) as apply,
+        patch("src.writer.crud.stage_cancellation", wraps=crud.stage_cancellation) as stage_cancellation,
+    ):
+        results = [future.result(timeout=5) for future in [writer.submit(event) for event in events]]
+
+    # Assert the outcomes and the single group, which applies each cancellation with its own UPDATE
+    assert [status for status, _ in results] == [
+        BatchEventStatus.CREATED,
+        BatchEventStatus.DUPLICATE,
+        BatchEventStatus.NOT_FOUND,
+        BatchEventStatus.CREATED,
+        BatchEventStatus.CANCELLED,
+    ]
+    assert results[4][1].room_id == "2"
+    assert results[4][1].rpg_status == schemas.RPGStatus.CANCELLATION
+    assert apply.call_count == 1
+    assert stage_cancellation.call_count == 2
+    assert sqlite_db.query(models.Change).count() == 3
+
+
+def test_create_event_group_commit(sqlite_client: TestClient, sqlite_db: Session) -> None:
+    """
+    Test case for the create_event endpoint with the group commit writer.
+
+    Args:
+        sqlite_client (TestClient): The test client fixture backed by an in-memory database.
+        sqlite_db (Session): The in-memory database session fixture.
+    """
+    writer = GroupCommitWriter(sessionmaker(bind=sqlite_db.get_bind()))
+    booking = create_event("0", schemas.RPGStatus.BOOKING).model_dump(mode="json")
+    cancellation = create_event("1", schemas.RPGStatus.CANCELLATION).model_dump(mode="json")
+
+    with patch("src.rest_api.config.GROUP_COMMIT", True), patch("src.rest_api.event_writer", writer):
+        assert sqlite_client.post("/events", json=booking).status_code == 201
+        assert sqlite_client.post("/events", json=booking).status_code == 409
+        assert sqlite_client.post("/events", json=cancellation).status_code == 404
+
+    assert sqlite_db.query(models.Event).count() == 1
+
+
+def test_group_commit_cancel_stored_booking(sqlite_client: TestClient, sqlite_db: Session) -> None:
+    """
+    Test case for cancelling a booking committed by an earlier group, the cancelled event is returned.
+
+    Args:
+        sqlite_client (TestClient): The test client fixture backed by an in-memory database.
+        sqlite_db (Session): The in-memory database session fixture.
+    """
+    writer = GroupCommitWriter(sessionmaker(bind=sqlite_db.get_bind()))
+
+    # Commit the booking in its own group
+    status, _ = writer.submit(create_event("0", schemas.RPGStatus.BOOKING)).result(timeout=5)
+    assert status == BatchEventStatus.CREATED
+
+    # Cancel it with the writer and with the endpoint
+    status, read_event = writer.submit(create_event("0", schemas.RPGStatus.CANCELLATION)).result(timeout=5)
+    assert status == BatchEventStatus.CANCELLED
+    assert read_event.rpg_status == schemas.RPGStatus.CANCELLATION
+    assert sqlite_db.query(models.Event).one().rpg_status == schemas.RPGStatus.CANCELLATION
+
+    booking = create_event("1", schemas.RPGStatus.BOOKING).model_dump(mode="json")
+    cancellation = create_event("1", schemas.RPGStatus.CANCELLATION).model_dump(mode="json")
+    with patch("src.rest_api.config.GROUP_COMMIT", True), patch("src.rest_api.event_writer", writer):
+        assert sqlite_client.post("/events", json=booking).status_code == 201
+        response = sqlite_client.post("/events", json=cancellation)
+    assert response.status_code == 201
+    assert response.json()["rpg_status"] == schemas.RPGStatus.CANCELLATION
+
+
+def test_group_commit_rebook_stored_booking(sqlite_db: Session) -> None:
+    """
+    Test case for a group which cancels a committed booking between two bookings of the same room night.
+
+    Args:
+        sqlite_db (Session): The in-memory database session fixture.
+    """
+    writer = GroupCommitWriter(sessionmaker(bind=sqlite_db.get_bind()))
+    status, _ = writer.submit(create_event("0", schemas.RPGStatus.BOOKING)).result(timeout=5)
+    assert status == BatchEventStatus.CREATED
+
+    # Submit the events within the delay of the group
+    events = [
+        create_event("0", schemas.RPGStatus.BOOKING),
+        create_event("0", schemas.RPGStatus.CANCELLATION),
+        create_event("0", schemas.RPGStatus.BOOKING),
+    ]
+    results = [future.result(timeout=5) for future in [writer.submit(event) for event in events]]
+
+    # Assert the booking loaded by the first run is not reported as active after its cancellation
+    assert [status for status, _ in results] == [
+        BatchEventStatus.DUPLICATE,
+        BatchEventStatus.CANCELLED,
+        BatchEventStatus.CREATED,
+    ]
+    assert sqlite_db.query(models.Change).count() == 3
@@ -0,0 +1,132 @@
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+import itertools
+import queue
+import threading
+import time
+import sqlalchemy
+import sqlalchemy.exc
+from sqlalchemy.orm import sessionmaker
+from src import config, crud, models, schemas
+from src.database import SessionLocal, get_shard
+from src.enums import BatchEventStatus
+from src.notifier import change_notifier
+
+
+@dataclass
+class WriteRequest:
+    """
+    Represents an event queued for the writer of its shard.
+
+    Attributes:
+        event (schemas.CreateEvent): The submitted event.
+        result (Future): Resolved with the outcome and the created, cancelled or conflicting event, if any.
+    """
+
+    event: schemas.CreateEvent
+    result: Future = field(default_factory=Future)
+
+
+class GroupCommitWriter:
+    """
+    Applies the submitted events with one writer thread per shard, which commits the queued events in groups.
+
+    A writer takes the first queued event, collects the events queued within GROUP_COMMIT_MAX_DELAY seconds up to
+    GROUP_COMMIT_MAX_SIZE events and applies them in a single transaction: the bookings with
+    `crud.stage_events_batch` and each cancellation with one conditional UPDATE, see `crud.stage_cancellation`.
+    The commit, and with it the sync of the journal, is paid once per group instead of once per event, and the
+    request threads never compete for the write lock of SQLite. Every event still gets its own outcome.
+    If a group collides with a concurrent write of another process, its events are retried one by one,
+    so only the colliding event fails.
+    """
+
+    def __init__(self, session_factory: sessionmaker) -> None:
+        self.session_factory = session_factory
+        self._queues: dict[int, queue.Queue[WriteRequest]] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, event: schemas.CreateEvent) -> Future:
+        """
+        Queue an event for the writer of its shard, the writer is started on the first event of the shard.
+
+        Args:
+            event (schemas.CreateEvent): The booking or cancellation.
+
+        Returns:
+            Future: Resolved with a (BatchEventStatus, schemas.ReadEvent | None) tuple once the event is committed,
+            or with crud.DuplicateError if it collided with a concurrent write.
+        """
+        shard = get_shard(event.hotel_id)
+        with self._lock:
+            if shard not in self._queues:
+                self._queues[shard] = queue.Queue()
+                threading.Thread(
+                    target=self._run, args=(self._queues[shard],), name=f"writer-{shard}", daemon=True
+                ).start()
+        request = WriteRequest(event)
+        self._queues[shard].put(request)
+        return request.result
+
+    def _run(self, requests: queue.Queue[WriteRequest]) -> None:
+        while True:
+            group = [requests.get()]
+            deadline = time.monotonic() + config.GROUP_COMMIT_MAX_DELAY
+            while len(group) < config.GROUP_COMMIT_MAX_SIZE:
+                try:
+                    group.append(requests.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self._commit(group)
+            except Exception as e:
+                for request in group:
+                    if not request.result.done():
+                        request.result.set_exception(e)
+            change_notifier.notify()
+
+    def _commit(self, group: list[WriteRequest]) -> None:
+        try:
+            results = self._apply(group)
+        except sqlalchemy.exc.IntegrityError as e:
+            if len(group) == 1:
+                print(f"Error creating event: {e}")
+                group[0].result.set_exception(crud.DuplicateError("Duplicate data"))
+                return
+            for request in group:
+                self._commit([request])
+            return
+        for request, result in zip(group, results):
+            request.result.set_result(result)
+
+    def _apply(
+        self, group: list[WriteRequest]
+    ) -> list[tuple[BatchEventStatus, schemas.ReadEvent | None]]:
+        # the events of a group belong to the shard of the writer
+        shard = get_shard(group[0].event.hotel_id)
+        results = []
+        # closing the session rolls back a failed group
+        with self.session_factory() as db:
+            # the runs of consecutive bookings and cancellations are applied in submission order
+            for is_cancellation, requests in itertools.groupby(
+                group, key=lambda request: request.event.rpg_status == schemas.RPGStatus.CANCELLATION
+            ):
+                events = [request.event for request in requests]
+                if is_cancellation:
+                    for event in events:
+                        status, db_event = crud.stage_cancellation(db, event, shard=shard)
+                        results.append((status, self._read_event(db_event)))
+                    # the UPDATE statements don't change the instances loaded for the bookings before
+                    db.expire_all()
+                    continue
+                outcomes = crud.stage_events_batch(db, events, shard=shard)
+                # read the events before they are expired
+                results += [(status, self._read_event(db_event)) for _, status, db_event in outcomes]
+            db.commit()
+        return results
+
+    @staticmethod
+    def _read_event(db_event: sqlalchemy.Row | models.Event | None) -> schemas.ReadEvent | None:
+        return None if db_event is None else schemas.ReadEvent.model_validate(db_event)
+
+
+event_writer = GroupCommitWriter(SessionLocal)
@@ -5,30 +5,48 @@ generate_random_date() {
   start_date="2024-01-01"
   end_date="2024-12-31"
 
-  # Convert start and end dates to seconds since epoch
-  start_sec=$(date -j -f "%Y-%m-%d" "$start_date" "+%s")
-  end_sec=$(date -j -f "%Y-%m-%d" "$end_date" "+%s")
+  # Convert start and end dates to seconds since epoch, GNU date (Linux) or BSD date (macOS)
+  if date -u -d "$start_date" "+%s" >/dev/null 2>&1; then
+    start_sec=$(date -u -d "$start_date" "+%s")
+    end_sec=$(date -u -d "$end_date" "+%s")
+  else
+    start_sec=$(date -u -j -f "%Y-%m-%d" "$start_date" "+%s")
+    end_sec=$(date -u -j -f "%Y-%m-%d" "$end_date" "+%s")
+  fi
 
   # Generate a random date in seconds since epoch using awk
   random_sec=$(awk -v min=$start_sec -v max=$end_sec 'BEGIN{srand(); print int(min+rand()*(max-min+1))}')
 
   # Convert random date in seconds since epoch to YYYY-MM-DD format
-  random_date=$(date -j -f "%s" "$random_sec" "+%Y-%m-%d")
+  if date -u -d "@$random_sec" "+%Y-%m-%d" >/dev/null 2>&1; then
+    random_date=$(date -u -d "@$random_sec" "+%Y-%m-%d")
+  else
+    random_date=$(date -u -j -f "%s" "$random_sec" "+%Y-%m-%d")
+  fi
 
   echo "$random_date"
 }
+
+# Function to generate a random room_id as UUID
+generate_room_id() {
+  if command -v uuidgen >/dev/null 2>&1; then
+    uuidgen
+  else
+    cat /proc/sys/kernel/random/uuid
+  fi
+}
 # URL to send the POST request to
 url="http://0.0.0.0:8000/events"
 
 while true; do
   # Current timestamp in the required format
-  current_timestamp=$(date -u +"%Y-%m-%dT%H:%M:%S.%3Z")
+  current_timestamp=$(date -u +"%Y-%m-%dT%H:%M:%SZ")
 
   # Generate a random date
   random_date=$(generate_random_date)
 
   # Generate a random room_id as UUID
-  room_id=$(uuidgen)
+  room_id=$(generate_room_id)
 
   # JSON payload
   json_data=$(cat <<EOF